@@ -0,0 +1,330 @@
+"""
+Contention stress test: worker processes run a random mix of add, update, mark-done, delete and
+list operations against one store at the same time, each through a Tracker of its own as
+overlapping CLI invocations would. Reports the throughput, the latency percentiles and the time
+spent waiting for the store lock, then checks the final store against the operations every
+worker logged, exiting with status 1 when an update was lost.
+
+Every task is changed by a single worker, the one that added it (or that the initial task was
+dealt to), so what the store must hold in the end follows from each log alone, whatever the
+order the workers ran in.
+
+Usage:
+    python -m benchmarks.bench_contention [--stores json ndjson journal sharded sqlite] [--workers 4]
+                                          [--operations 200] [--tasks 1000] [--seed 1]
+                                          [--mix add=30,update=25,mark-done=20,delete=10,list=15]
+                                          [--long-lived] [--output results.json]
+"""
+import asyncio
+import datetime
+import json
+import math
+import platform
+import random
+import sys
+import time
+from argparse import ArgumentParser, ArgumentTypeError
+from pathlib import Path
+from queue import Empty
+from tempfile import TemporaryDirectory
+
+from benchmarks.bench_task_index import build_tasks
+from commons import StoreJSON, StoreNDJSON, StoreJournal, StoreSharded, StoreSQLite, TaskStatus, metrics
+from commons.processes import process_context
+from tracker import Tracker
+
+STORES = {
+    "json": (StoreJSON, "tasks.json"),
+    "ndjson": (StoreNDJSON, "tasks.ndjson"),
+    "journal": (StoreJournal, "tasks.json"),
+    "sharded": (StoreSharded, "tasks.json"),
+    "sqlite": (StoreSQLite, "tasks.db"),
+}
+OPERATIONS = ("add", "update", "mark-done", "delete", "list")
+DEFAULT_MIX = {"add": 30, "update": 25, "mark-done": 20, "delete": 10, "list": 15}
+# Operations that change a task the worker owns, turned into adds while it owns none.
+_CHANGES = ("update", "mark-done", "delete")
+
+
+def parse_mix(text: str) -> dict[str, int]:
+    mix = {}
+    for item in text.split(","):
+        name, _, weight = item.partition("=")
+        name = name.strip()
+        if name not in OPERATIONS:
+            raise ArgumentTypeError(f"unknown operation {name!r}, expected one of {', '.join(OPERATIONS)}")
+        try:
+            mix[name] = int(weight)
+        except ValueError:
+            raise ArgumentTypeError(f"invalid weight {weight!r} for {name}") from None
+        if mix[name] < 0:
+            raise ArgumentTypeError(f"invalid weight {weight!r} for {name}")
+    if not any(mix.values()):
+        raise ArgumentTypeError("the mix needs an operation of positive weight")
+    return mix
+
+
+def open_store(name: str, directory: Path):
+    store_class, file_name = STORES[name]
+    return store_class(directory / file_name)
+
+
+def close_store(store) -> None:
+    close = getattr(store, "close", None)
+    if close is not None:
+        close()
+
+
+async def run_operations(
+    store_name: str,
+    directory: Path,
+    worker: int,
+    owned: list[int],
+    operations: int,
+    mix: dict[str, int],
+    seed: int,
+    long_lived: bool
+) -> dict:
+    generator = random.Random(seed * 1_000_003 + worker)
+    names, weights = list(mix), list(mix.values())
+    latencies = {name: [] for name in OPERATIONS}
+    log, errors = [], []
+    tracker = Tracker(open_store(store_name, directory)) if long_lived else None
+    started = time.time()
+    for number in range(operations):
+        operation = generator.choices(names, weights)[0]
+        if operation in _CHANGES and not owned:
+            operation = "add"
+        task_id = None
+        begun = time.perf_counter()
+        current = tracker or Tracker(open_store(store_name, directory))
+        try:
+            if operation == "add":
+                description = f"Worker {worker} task {number}"
+                task = await current.add_task(description)
+                owned.append(task.id)
+                log.append(("add", task.id, description))
+            elif operation == "update":
+                task_id = generator.choice(owned)
+                description = f"Worker {worker} update {number}"
+                await current.update_task(task_id, description)
+                log.append(("update", task_id, description))
+            elif operation == "mark-done":
+                task_id = generator.choice(owned)
+                await current.mark_done(task_id)
+                log.append(("mark-done", task_id))
+            elif operation == "delete":
+                task_id = owned.pop(generator.randrange(len(owned)))
+                await current.delete_task(task_id)
+                log.append(("delete", task_id))
+            else:
+                await current.list_tasks(TaskStatus.TODO, limit=20)
+        except Exception as error:
+            # Left out of the log: whatever it was meant to change is then checked unchanged.
+            errors.append(f"{operation}{'' if task_id is None else f' {task_id}'}: {type(error).__name__}: {error}")
+        finally:
+            if tracker is None:
+                await current.flush()
+                close_store(current.store)
+        latencies[operation].append(time.perf_counter() - begun)
+    if tracker is not None:
+        await tracker.flush()
+        close_store(tracker.store)
+    lock_wait = metrics.records.get("store.lock_wait")
+    return {
+        "worker": worker,
+        "started": started,
+        "finished": time.time(),
+        "latencies": latencies,
+        "lock_wait": lock_wait.seconds if lock_wait else 0.0,
+        "log": log,
+        "errors": errors,
+    }
+
+
+def run_worker(store_name: str, directory: str, worker: int, owned: list[int], options: dict, barrier, results) -> None:
+    # Runs in a worker process. Every worker waits for the others to be ready before starting,
+    # so they all contend from the first operation.
+    metrics.enable()
+    barrier.wait()
+    result = asyncio.run(run_operations(store_name, Path(directory), worker, owned, **options))
+    results.put(result)
+
+
+def expected_tasks(initial: dict[int, tuple[str, str]], log: list[tuple]) -> tuple[dict[int, tuple[str, str]], list[str]]:
+    """
+    Replays the log of one worker over the tasks it was dealt, and returns the description and
+    status each of its tasks must have in the end, by ID, with what the replay found wrong.
+    """
+    tasks, problems = dict(initial), []
+    for operation, task_id, *values in log:
+        if operation == "add":
+            if task_id in tasks:
+                problems.append(f"task {task_id} was returned by an add while still held")
+            tasks[task_id] = (values[0], TaskStatus.TODO.value)
+        elif operation == "update":
+            tasks[task_id] = (values[0], tasks[task_id][1])
+        elif operation == "mark-done":
+            tasks[task_id] = (tasks[task_id][0], TaskStatus.DONE.value)
+        else:
+            del tasks[task_id]
+    return tasks, problems
+
+
+def verify(store, initial: dict[int, dict], results: list[dict]) -> list[str]:
+    """
+    Compares the tasks of the store with those the logs of the workers lead to, and returns a
+    line per lost or unexpected change.
+    """
+    expected, problems = {}, []
+    for result in results:
+        tasks, replay_problems = expected_tasks(initial[result["worker"]], result["log"])
+        problems += [f"worker {result['worker']}: {problem}" for problem in replay_problems]
+        for task_id, task in tasks.items():
+            if task_id in expected:
+                problems.append(f"task {task_id} is held by two workers")
+            expected[task_id] = task
+    actual = {task.id: (task.description, task.status.value) for task in store.load()}
+    for task_id, task in sorted(expected.items()):
+        if task_id not in actual:
+            problems.append(f"task {task_id} {task} is missing")
+        elif actual[task_id] != task:
+            problems.append(f"task {task_id} is {actual[task_id]}, expected {task}")
+    problems += [f"task {task_id} {actual[task_id]} was not expected" for task_id in sorted(actual.keys() - expected.keys())]
+    return problems
+
+
+def percentile(values: list[float], fraction: float) -> float:
+    # Nearest rank of the sorted values.
+    if not values:
+        return 0.0
+    return values[max(0, math.ceil(fraction * len(values)) - 1)]
+
+
+def summarize(latencies: list[float]) -> dict:
+    latencies = sorted(latencies)
+    return {
+        "operations": len(latencies),
+        "p50_ms": percentile(latencies, 0.50) * 1000,
+        "p95_ms": percentile(latencies, 0.95) * 1000,
+        "p99_ms": percentile(latencies, 0.99) * 1000,
+    }
+
+
+def run_store(store_name: str, workers: int, tasks: int, options: dict) -> dict:
+    with TemporaryDirectory() as directory:
+        store = open_store(store_name, Path(directory))
+        store.update_file(build_tasks(tasks))
+        initial = {worker: {} for worker in range(workers)}
+        for task in store.load():
+            initial[(task.id - 1) % workers][task.id] = (task.description, task.status.value)
+        close_store(store)
+
+        context = process_context()
+        barrier, queue = context.Barrier(workers), context.Queue()
+        processes = [
+            context.Process(
+                target=run_worker,
+                args=(store_name, directory, worker, list(initial[worker]), options, barrier, queue)
+            )
+            for worker in range(workers)
+        ]
+        for process in processes:
+            process.start()
+        # Read before joining: a worker only exits once its result was taken from the queue.
+        results = []
+        while len(results) < workers:
+            if not any(process.is_alive() for process in processes) and queue.empty():
+                raise RuntimeError(f"A worker failed while running against the {store_name} store")
+            try:
+                results.append(queue.get(timeout=1))
+            except Empty:
+                continue
+        for process in processes:
+            process.join()
+
+        store = open_store(store_name, Path(directory))
+        try:
+            problems = verify(store, initial, results)
+        finally:
+            close_store(store)
+
+    elapsed = max(result["finished"] for result in results) - min(result["started"] for result in results)
+    every = [latency for result in results for latencies in result["latencies"].values() for latency in latencies]
+    summary = summarize(every)
+    return {
+        **summary,
+        "throughput": summary["operations"] / elapsed if elapsed else 0.0,
+        "seconds": elapsed,
+        "lock_wait_seconds": sum(result["lock_wait"] for result in results),
+        "busy_seconds": sum(every),
+        "by_operation": {
+            name: summarize([latency for result in results for latency in result["latencies"][name]])
+            for name in OPERATIONS
+        },
+        "errors": [error for result in results for error in result["errors"]],
+        "problems": problems,
+    }
+
+
+def format_result(store_name: str, result: dict) -> str:
+    share = result["lock_wait_seconds"] / result["busy_seconds"] if result["busy_seconds"] else 0.0
+    return (
+        f"{store_name:<10}{result['operations']:>7}{result['throughput']:>10.1f}"
+        f"{result['p50_ms']:>10.2f}{result['p95_ms']:>10.2f}{result['p99_ms']:>10.2f}"
+        f"{result['lock_wait_seconds']:>10.2f}{share:>7.0%}{len(result['errors']):>8}{len(result['problems']):>7}"
+    )
+
+
+def main():
+    parser = ArgumentParser(description="Run concurrent Tracker workers against each store and check no update is lost.")
+    parser.add_argument("--stores", nargs="+", choices=list(STORES), default=list(STORES))
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--operations", type=int, default=200, help="The operations run by every worker.")
+    parser.add_argument("--tasks", type=int, default=1_000, help="The tasks in the store to start with.")
+    parser.add_argument("--mix", type=parse_mix, default=DEFAULT_MIX, help="Operation weights, as add=30,list=15.")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument(
+        "--long-lived", action="store_true",
+        help="Keep a Tracker per worker instead of building one per operation like the CLI."
+    )
+    parser.add_argument("--output", type=Path, help="Write the results as JSON.")
+    args = parser.parse_args()
+    if args.workers < 1 or args.operations < 1 or args.tasks < 0:
+        parser.error("--workers and --operations must be positive and --tasks not negative")
+
+    options = {"operations": args.operations, "mix": args.mix, "seed": args.seed, "long_lived": args.long_lived}
+    print(
+        f"{'store':<10}{'ops':>7}{'ops/s':>10}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}"
+        f"{'lock s':>10}{'lock':>7}{'errors':>8}{'lost':>7}"
+    )
+    results = {}
+    for store_name in args.stores:
+        results[store_name] = run_store(store_name, args.workers, args.tasks, options)
+        print(format_result(store_name, results[store_name]), flush=True)
+
+    for store_name, result in results.items():
+        for line in result["problems"][:5] + result["errors"][:5]:
+            print(f"{store_name}: {line}", file=sys.stderr)
+    if args.output is not None:
+        args.output.write_text(json.dumps({
+            "meta": {
+                "created_at": datetime.datetime.now().isoformat(timespec="seconds"),
+                "python": platform.python_version(),
+                "platform": platform.platform(),
+                "workers": args.workers,
+                **options,
+                "tasks": args.tasks,
+            },
+            "results": results,
+        }, indent=2), encoding="utf-8")
+        print(f"Results written to {args.output}")
+    lost = [store_name for store_name, result in results.items() if result["problems"]]
+    if lost:
+        print(f"Updates lost with the {', '.join(lost)} store{'s' if len(lost) > 1 else ''}.", file=sys.stderr)
+        sys.exit(1)
+    print("No update lost.")
+
+
+if __name__ == "__main__":
+    main()
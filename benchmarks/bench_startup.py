@@ -0,0 +1,85 @@
+"""
+Measures the cold start of ``task-cli list``: a ``-X importtime`` report of the slowest imports,
+and the wall-clock time of the whole command with and without the snapshot cache.
+
+Usage:
+    python -m benchmarks.bench_startup [--tasks 20000] [--runs 5] [--top 15]
+"""
+import os
+import subprocess
+import sys
+import time
+from argparse import ArgumentParser
+from pathlib import Path
+from tempfile import TemporaryDirectory
+
+from benchmarks.bench_task_index import build_tasks
+from client import SOCKET_ENV
+from commons import StoreJSON
+
+MAIN = Path(__file__).resolve().parent.parent / "main.py"
+
+
+def run_cli(directory: str, *options: str) -> subprocess.CompletedProcess:
+    # A socket path that does not exist keeps a running daemon from answering instead.
+    environment = dict(os.environ, **{SOCKET_ENV: os.path.join(directory, "missing.sock")})
+    return subprocess.run(
+        [sys.executable, *options, str(MAIN), "list"],
+        cwd=directory, env=environment, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True, check=True
+    )
+
+
+def top_level_imports(stderr: str) -> list[tuple[int, int, str]]:
+    # Lines look like "import time:  self [us] | cumulative | imported package", with nested
+    # imports indented below the package that triggered them.
+    times = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "[us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        if not name.startswith("  "):
+            times.append((int(cumulative_us), int(self_us), name.strip()))
+    return times
+
+
+def best_time(runs: int, run) -> float:
+    timings = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        run()
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def main():
+    parser = ArgumentParser(description="Measure the cold start of the task CLI.")
+    parser.add_argument("--tasks", type=int, default=20_000)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--top", type=int, default=15)
+    args = parser.parse_args()
+
+    with TemporaryDirectory() as directory:
+        store = StoreJSON(Path(directory) / "tasks.json")
+        store.update_file(build_tasks(args.tasks))
+        cache_path = Path(directory) / "tasks.json.cache"
+
+        top_level = top_level_imports(run_cli(directory, "-X", "importtime").stderr)
+        print(f"{'cumulative':>12}{'self':>10}  import  (top-level imports of `main.py list`)")
+        for cumulative_us, self_us, name in sorted(top_level, reverse=True)[:args.top]:
+            print(f"{cumulative_us / 1000:>9.1f} ms{self_us / 1000:>7.1f} ms  {name}")
+        print(f"{sum(entry[0] for entry in top_level) / 1000:>9.1f} ms in total\n")
+
+        def without_cache():
+            cache_path.unlink(missing_ok=True)
+            run_cli(directory)
+
+        print(f"{'case':<28}{'best':>10}  ({args.tasks} tasks, best of {args.runs})")
+        interpreter = best_time(args.runs, lambda: subprocess.run([sys.executable, "-c", "pass"], check=True))
+        print(f"{'python -c pass':<28}{interpreter * 1000:>7.0f} ms")
+        print(f"{'list, no snapshot cache':<28}{best_time(args.runs, without_cache) * 1000:>7.0f} ms")
+        run_cli(directory)
+        print(f"{'list, snapshot cache':<28}{best_time(args.runs, lambda: run_cli(directory)) * 1000:>7.0f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,211 @@
+"""
+Benchmark suite for StoreJSON, every Tracker operation and the end-to-end CLI on synthetic stores
+of growing size. Results are written as JSON so two runs can be compared, and the comparison
+fails when a case got slower (or used more memory) than the baseline by more than a threshold.
+
+Usage:
+    python -m benchmarks.bench_suite run [--sizes 1000 10000 100000] [--repeat 3] [--output results.json]
+                                         [--baseline baseline.json] [--threshold 0.25] [--skip-cli]
+    python -m benchmarks.bench_suite compare baseline.json results.json [--threshold 0.25]
+"""
+import asyncio
+import datetime
+import gc
+import json
+import os
+import platform
+import subprocess
+import sys
+import tracemalloc
+from argparse import ArgumentParser
+from pathlib import Path
+from tempfile import TemporaryDirectory
+
+from benchmarks.bench_task_index import best_of, build_tasks
+from client import SOCKET_ENV
+from commons import StoreJSON, TaskStatus
+from tracker import Tracker
+
+MAIN = Path(__file__).resolve().parent.parent / "main.py"
+# Differences below this many seconds are treated as noise by the comparison.
+NOISE_SECONDS = 0.0005
+
+
+def peak_memory(function) -> int:
+    gc.collect()
+    tracemalloc.start()
+    try:
+        function()
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def bench_store(directory: Path, size: int, repeat: int) -> dict[str, dict]:
+    tasks = build_tasks(size)
+    store = StoreJSON(directory / "tasks.json")
+    uncached = StoreJSON(directory / "tasks.json", snapshot_cache=False)
+    store.update_file(tasks)
+    return {
+        "store.update_file": {"seconds": best_of(lambda: store.update_file(tasks), 1, repeat)},
+        "store.load": {"seconds": best_of(store.load, 1, repeat), "peak_bytes": peak_memory(store.load)},
+        "store.load.uncached": {"seconds": best_of(uncached.load, 1, repeat)},
+        "store.iter_tasks": {
+            "seconds": best_of(lambda: sum(1 for _ in store.iter_tasks(TaskStatus.DONE)), 1, repeat)
+        },
+    }
+
+
+def bench_tracker(directory: Path, size: int, repeat: int) -> dict[str, dict]:
+    store = StoreJSON(directory / "tasks.json")
+    store.update_file(build_tasks(size))
+    loop = asyncio.new_event_loop()
+    tracker = Tracker(store)
+    middle = size // 2 or 1
+
+    def run(operation):
+        return lambda: loop.run_until_complete(operation())
+
+    async def add_and_delete():
+        task = await tracker.add_task("Benchmark task")
+        await tracker.delete_task(task.id)
+
+    async def add_many():
+        async with tracker.batch():
+            tasks = [await tracker.add_task(f"Benchmark task {index}") for index in range(100)]
+        await tracker.delete_tasks(task.id for task in tasks)
+
+    try:
+        results = {
+            "tracker.cold_list_tasks": {
+                "seconds": best_of(run(lambda: Tracker(store).list_tasks()), 1, repeat),
+                "peak_bytes": peak_memory(run(lambda: Tracker(store).list_tasks())),
+            },
+        }
+        cases = {
+            "tracker.list_tasks": lambda: tracker.list_tasks(),
+            "tracker.list_tasks.done": lambda: tracker.list_tasks(TaskStatus.DONE),
+            "tracker.list_tasks.recent_20": lambda: tracker.list_tasks(TaskStatus.DONE, "updated_at", True, limit=20),
+            "tracker.add_and_delete_task": add_and_delete,
+            "tracker.update_task": lambda: tracker.update_task(middle, "Updated by the benchmark"),
+            "tracker.mark_in_progress": lambda: tracker.mark_in_progress(middle),
+            "tracker.mark_done": lambda: tracker.mark_done(middle),
+            "tracker.batch_of_100": add_many,
+        }
+        for name, operation in cases.items():
+            results[name] = {"seconds": best_of(run(operation), 1, repeat)}
+    finally:
+        loop.close()
+    return results
+
+
+def bench_cli(directory: Path, size: int, repeat: int) -> dict[str, dict]:
+    StoreJSON(directory / "tasks.json").update_file(build_tasks(size))
+    # A socket path that does not exist keeps a running daemon from answering instead.
+    environment = dict(os.environ, **{SOCKET_ENV: str(directory / "missing.sock")})
+
+    def run_cli(*argv: str):
+        return lambda: subprocess.run(
+            [sys.executable, str(MAIN), *argv],
+            cwd=directory, env=environment, stdout=subprocess.DEVNULL, check=True
+        )
+
+    return {
+        "cli.list": {"seconds": best_of(run_cli("list"), 1, repeat)},
+        "cli.list.done": {"seconds": best_of(run_cli("list", "done"), 1, repeat)},
+        "cli.mark_done": {"seconds": best_of(run_cli("mark-done", str(size // 2 or 1)), 1, repeat)},
+        "cli.add": {"seconds": best_of(run_cli("add", "Benchmark task"), 1, repeat)},
+    }
+
+
+def run_suite(sizes: list[int], repeat: int, skip_cli: bool = False) -> dict:
+    suites = [bench_store, bench_tracker] + ([] if skip_cli else [bench_cli])
+    results = {}
+    for size in sizes:
+        for suite in suites:
+            with TemporaryDirectory() as directory:
+                for name, measurements in suite(Path(directory), size, repeat).items():
+                    results[f"{name}[{size}]"] = measurements
+                    print(f"{name}[{size}]".ljust(44) + format_measurements(measurements), flush=True)
+    return {
+        "meta": {
+            "created_at": datetime.datetime.now().isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "sizes": sizes,
+            "repeat": repeat,
+        },
+        "results": results,
+    }
+
+
+def format_measurements(measurements: dict) -> str:
+    text = f"{measurements['seconds'] * 1000:>10.2f} ms"
+    if "peak_bytes" in measurements:
+        text += f"{measurements['peak_bytes'] / 2 ** 20:>10.1f} MiB peak"
+    return text
+
+
+def compare(baseline: dict, current: dict, threshold: float) -> list[str]:
+    """
+    Prints every case measured by both runs with its ratio to the baseline, and returns the
+    cases whose time or peak memory grew by more than ``threshold`` (0.25 meaning 25%).
+    """
+    regressions = []
+    print(f"{'case':<44}{'metric':<12}{'baseline':>12}{'current':>12}{'ratio':>8}")
+    for name, measurements in current["results"].items():
+        before = baseline["results"].get(name)
+        if before is None:
+            continue
+        for metric, value in measurements.items():
+            if metric not in before:
+                continue
+            ratio = value / before[metric] if before[metric] else float("inf")
+            regressed = ratio > 1 + threshold
+            if metric == "seconds" and value - before[metric] < NOISE_SECONDS:
+                regressed = False
+            if regressed:
+                regressions.append(f"{name} {metric}")
+            print(
+                f"{name:<44}{metric:<12}{before[metric]:>12.4g}{value:>12.4g}{ratio:>7.2f}x"
+                + ("  REGRESSED" if regressed else "")
+            )
+    return regressions
+
+
+def main():
+    parser = ArgumentParser(description="Benchmark the store, the Tracker and the CLI, and detect regressions.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    run_parser = subparsers.add_parser("run", help="Run the suite and write its results as JSON.")
+    run_parser.add_argument("--sizes", type=int, nargs="+", default=[1_000, 10_000, 100_000])
+    run_parser.add_argument("--repeat", type=int, default=3)
+    run_parser.add_argument("--output", type=Path, default=Path("benchmark-results.json"))
+    run_parser.add_argument("--baseline", type=Path, help="Compare the results with an earlier run.")
+    run_parser.add_argument("--threshold", type=float, default=0.25)
+    run_parser.add_argument("--skip-cli", action="store_true", help="Skip the subprocess CLI cases.")
+    compare_parser = subparsers.add_parser("compare", help="Compare two result files.")
+    compare_parser.add_argument("baseline", type=Path)
+    compare_parser.add_argument("current", type=Path)
+    compare_parser.add_argument("--threshold", type=float, default=0.25)
+    args = parser.parse_args()
+
+    if args.command == "run":
+        current = run_suite(args.sizes, args.repeat, args.skip_cli)
+        args.output.write_text(json.dumps(current, indent=2), encoding="utf-8")
+        print(f"Results written to {args.output}")
+        if args.baseline is None:
+            return
+        baseline = json.loads(args.baseline.read_text(encoding="utf-8"))
+    else:
+        baseline = json.loads(args.baseline.read_text(encoding="utf-8"))
+        current = json.loads(args.current.read_text(encoding="utf-8"))
+
+    regressions = compare(baseline, current, args.threshold)
+    if regressions:
+        print(f"{len(regressions)} regression(s) above {args.threshold:.0%}: " + ", ".join(regressions))
+        sys.exit(1)
+    print(f"No regression above {args.threshold:.0%}.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+"""
+Micro-benchmark comparing the linear scans Tracker used to run over ``list[Task]`` with the
+TaskIndex lookups it uses now.
+
+Usage:
+    python -m benchmarks.bench_task_index [--tasks 100000] [--repeat 5]
+"""
+import itertools
+import random
+from argparse import ArgumentParser
+from timeit import repeat
+
+from commons import Task, TaskIndex, TaskStatus
+
+STATUSES = list(TaskStatus)
+
+
+def build_tasks(count: int) -> list[Task]:
+    return [
+        Task(id=task_id, description=f"Task {task_id}", status=STATUSES[task_id % len(STATUSES)])
+        for task_id in range(1, count + 1)
+    ]
+
+
+def best_of(statement, number: int, repeats: int) -> float:
+    return min(repeat(statement, number=number, repeat=repeats)) / number
+
+
+def main():
+    parser = ArgumentParser(description="Compare linear task scans with TaskIndex lookups.")
+    parser.add_argument("--tasks", type=int, default=100_000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    tasks = build_tasks(args.tasks)
+    index = TaskIndex(tasks)
+    task_ids = itertools.cycle([random.randint(1, args.tasks) for _ in range(1000)])
+
+    def scan_lookup():
+        task_id = next(task_ids)
+        return next(task for task in tasks if task.id == task_id)
+
+    def index_lookup():
+        return index.get_task(next(task_ids))
+
+    def scan_delete():
+        task_id = next(task_ids)
+        task = next(task for task in tasks if task.id == task_id)
+        tasks.remove(task)
+        tasks.append(task)
+
+    def index_delete():
+        task = index.get_task(next(task_ids))
+        index.apply_change(task, None)
+        index.apply_change(None, task)
+
+    cases = {
+        "lookup by id": (scan_lookup, index_lookup, 20),
+        "delete": (scan_delete, index_delete, 20),
+        "list by status": (
+            lambda: [task for task in tasks if task.status == TaskStatus.DONE],
+            lambda: list(index.iter_tasks(TaskStatus.DONE)),
+            5,
+        ),
+    }
+    print(f"{'operation':<18}{'list scan':>14}{'TaskIndex':>14}{'speedup':>10}  ({args.tasks} tasks)")
+    for name, (scan, indexed, number) in cases.items():
+        scan_time = best_of(scan, number, args.repeat)
+        index_time = best_of(indexed, number, args.repeat)
+        print(f"{name:<18}{scan_time * 1e6:>11.1f} us{index_time * 1e6:>11.1f} us{scan_time / index_time:>9.1f}x")
+
+
+if __name__ == '__main__':
+    main()
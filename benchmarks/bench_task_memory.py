@@ -0,0 +1,42 @@
+"""
+Compares the memory held by ``list[Task]``, TaskIndex and TaskTable.
+
+Usage:
+    python -m benchmarks.bench_task_memory [--tasks 1000000]
+"""
+import gc
+import tracemalloc
+from argparse import ArgumentParser
+
+from benchmarks.bench_task_index import build_tasks
+from commons import TaskIndex, TaskTable
+
+
+def traced_size(build) -> tuple[int, object]:
+    gc.collect()
+    tracemalloc.start()
+    container = build()
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return size, container
+
+
+def main():
+    parser = ArgumentParser(description="Compare the memory footprint of task containers.")
+    parser.add_argument("--tasks", type=int, default=1_000_000)
+    args = parser.parse_args()
+
+    cases = {
+        "list[Task]": lambda: build_tasks(args.tasks),
+        "TaskIndex": lambda: TaskIndex(build_tasks(args.tasks)),
+        "TaskTable": lambda: TaskTable(iter(build_tasks(args.tasks)), intern_descriptions=True),
+    }
+    print(f"{'container':<20}{'total':>12}{'per task':>12}  ({args.tasks} tasks)")
+    for name, build in cases.items():
+        size, container = traced_size(build)
+        print(f"{name:<20}{size / 2 ** 20:>9.1f} MiB{size / args.tasks:>10.0f} B")
+        del container
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,58 @@
+"""
+Thin client forwarding command-line arguments to a running tracker daemon.
+
+This module is imported on every invocation of ``main.py`` before anything else, so it only
+depends on cheap standard library modules.
+"""
+import json
+import os
+import socket
+
+SOCKET_ENV = "TASK_TRACKER_SOCKET"
+DEFAULT_SOCKET = ".task-tracker.sock"
+STDIN_ACTIONS = {"batch"}
+# The options of main.py given before the command that take a value.
+VALUE_OPTIONS = {"--list", "--profile-output", "--cprofile"}
+
+
+def socket_path(path: str | os.PathLike | None = None) -> str:
+    """Returns the daemon socket path: the given one, $TASK_TRACKER_SOCKET, or the default."""
+    return os.fspath(path or os.environ.get(SOCKET_ENV) or DEFAULT_SOCKET)
+
+
+def command_arguments(argv: list[str]) -> list[str]:
+    """Returns the arguments from the command on, without the options given before it."""
+    position = 0
+    while position < len(argv) and argv[position].startswith("-") and argv[position] != "-":
+        position += 2 if argv[position] in VALUE_OPTIONS else 1
+    return argv[position:]
+
+
+def reads_stdin(argv: list[str]) -> bool:
+    """Tells whether the command reads its input from stdin, which must then be forwarded."""
+    positionals = [argument for argument in command_arguments(argv) if argument == "-" or not argument.startswith("-")]
+    return bool(positionals) and positionals[0] in STDIN_ACTIONS and positionals[1:] in ([], ["-"])
+
+
+def forward(argv: list[str], path: str | os.PathLike | None = None, stdin: str | None = None) -> dict | None:
+    """
+    Sends a command to the daemon and returns its response, a dict with ``stdout``, ``stderr``
+    and ``exit_code``, or None when no daemon is listening on the socket.
+    """
+    connection = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        try:
+            connection.connect(socket_path(path))
+        except (FileNotFoundError, ConnectionRefusedError):
+            return None
+        request = json.dumps({"argv": argv, "stdin": stdin}) + "\n"
+        connection.sendall(request.encode("utf-8"))
+        connection.shutdown(socket.SHUT_WR)
+        chunks = []
+        while chunk := connection.recv(65536):
+            chunks.append(chunk)
+    finally:
+        connection.close()
+    if not chunks:
+        raise ConnectionError("The daemon closed the connection without a response")
+    return json.loads(b"".join(chunks))
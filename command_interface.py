@@ -1,9 +1,82 @@
-from argparse import ArgumentParser
+import datetime
+import json
+from argparse import ArgumentParser, ArgumentTypeError, Namespace
+from collections.abc import Iterable
 from dataclasses import dataclass
-from sys import stderr, stdout
+from pathlib import Path
+from sys import stderr, stdin, stdout
+from time import perf_counter
+from typing import TextIO
 
-from commons import TaskStatus
+from commons import TaskStatus, metrics
+from commons.sort_index import SORT_FIELDS
+from commons.task import normalize_tags
 from tracker import Tracker
+from workspace import DEFAULT_LIST, Workspace
+
+# The number of tasks encoded and written at once by export.
+EXPORT_CHUNK = 10_000
+# Progress is reported at most this often, in seconds.
+PROGRESS_INTERVAL = 1.0
+
+
+def parse_timestamp(text: str) -> datetime.datetime:
+    """Parses an ISO 8601 time for --since and --until, as a naive local time like the task timestamps."""
+    try:
+        moment = datetime.datetime.fromisoformat(text)
+    except ValueError:
+        raise ArgumentTypeError(f"invalid ISO 8601 time: {text!r}") from None
+    return moment if moment.tzinfo is None else moment.astimezone().replace(tzinfo=None)
+
+
+def parse_count(text: str) -> int:
+    """Parses a non-negative integer for --offset and --limit."""
+    try:
+        value = int(text)
+    except ValueError:
+        value = -1
+    if value < 0:
+        raise ArgumentTypeError(f"expected a non-negative integer, got {text!r}")
+    return value
+
+
+def parse_positive(text: str) -> int:
+    """Parses a positive integer for --chunk-size and --workers."""
+    try:
+        value = int(text)
+    except ValueError:
+        value = 0
+    if value < 1:
+        raise ArgumentTypeError(f"expected a positive integer, got {text!r}")
+    return value
+
+
+def parse_duration(text: str) -> float:
+    """Parses a non-negative number of days or seconds for --older-than and --write-behind."""
+    try:
+        value = float(text)
+    except ValueError:
+        value = -1.0
+    # Also rejects NaN, which compares false with everything.
+    if not 0 <= value <= datetime.timedelta.max.days:
+        raise ArgumentTypeError(f"expected a number from 0 to {datetime.timedelta.max.days}, got {text!r}")
+    return value
+
+
+def parse_interval(text: str) -> float:
+    """Parses a positive number of seconds for --interval."""
+    value = parse_duration(text)
+    if value == 0:
+        raise ArgumentTypeError(f"expected a positive number, got {text!r}")
+    return value
+
+
+def parse_tag(text: str) -> str:
+    """Parses a tag for add, tag, untag and the list filters."""
+    try:
+        return normalize_tags([text])[0]
+    except ValueError:
+        raise ArgumentTypeError(f"invalid tag: {text!r}") from None
 
 
 @dataclass
@@ -13,19 +86,62 @@ class CommandInterface:
 
     Attributes:
         parser (ArgumentParser): The argument parser for handling command-line arguments.
-        tracker (Tracker): The task tracker for managing task operations.
+        tracker (Tracker | None): The task tracker for managing task operations, the one of the list given when there is a workspace.
+        workspace (Workspace | None): The workspace whose lists --list selects, if any.
+        input_stream (TextIO | None): The stream read instead of stdin, e.g. when serving a client.
+        output_stream (TextIO | None): The stream written instead of stdout.
+        error_stream (TextIO | None): The stream written instead of stderr.
 
     Methods:
         add_argument(): Configures the command-line arguments for task operations.
-        execute(): Executes the appropriate task operation based on the parsed arguments.
+        execute(argv: list[str] | None = None): Executes the appropriate task operation based on the parsed arguments.
+        parse_args(argv: list[str] | None = None) -> Namespace: Parses the arguments and selects the tracker of the list given.
+        dispatch(args: Namespace): Runs a parsed command, profiled when asked.
+        execute_profiled(args: Namespace): Runs a command with metrics (and cProfile) enabled and reports them.
+        run(args: Namespace): Runs the task operation selected by the parsed arguments.
+        execute_batch(lines: Iterable[str]): Applies NDJSON operations and reports failures per line.
+        execute_export(args: Namespace): Streams tasks to a file or stdout, reporting progress.
+        execute_import(args: Namespace): Adds the tasks of a file or stdin chunk by chunk, reporting progress and failures per line.
     """
     parser: ArgumentParser
-    tracker: Tracker
+    tracker: Tracker | None = None
+    workspace: Workspace | None = None
+    input_stream: TextIO | None = None
+    output_stream: TextIO | None = None
+    error_stream: TextIO | None = None
 
     def __post_init__(self):
         self.add_argument()
 
     def add_argument(self):
+        self.parser.add_argument(
+            "--profile",
+            help="Print where the command spent its time (parsing, serialization, disk I/O) to stderr",
+            action="store_true"
+        )
+        self.parser.add_argument(
+            "--profile-output",
+            help="Write the --profile breakdown as JSON to FILE instead",
+            type=Path,
+            default=None,
+            metavar="FILE"
+        )
+        self.parser.add_argument(
+            "--cprofile",
+            help="Write cProfile statistics of the command to FILE, to be read with pstats",
+            type=Path,
+            default=None,
+            metavar="FILE"
+        )
+        if self.workspace is not None:
+            self.parser.add_argument(
+                "--list",
+                help=f"Run the command on this list of the workspace (default: {DEFAULT_LIST})",
+                type=str,
+                default=DEFAULT_LIST,
+                dest="list_name",
+                metavar="NAME"
+            )
         subparsers = self.parser.add_subparsers(dest="action")
         add_parser = subparsers.add_parser("add", help="Add a new task.")
         add_parser.add_argument(
@@ -33,6 +149,26 @@ class CommandInterface:
             help="Task description",
             type=str
         )
+        add_parser.add_argument(
+            "--tag",
+            help="Tag the task, may be repeated",
+            type=parse_tag,
+            action="append",
+            default=[],
+            dest="tags"
+        )
+        add_parser.add_argument(
+            "--priority",
+            help="Priority of the task, higher is more urgent",
+            type=int,
+            default=None
+        )
+        add_parser.add_argument(
+            "--due",
+            help="ISO 8601 time the task is due",
+            type=parse_timestamp,
+            default=None
+        )
         update_parser = subparsers.add_parser("update", help="Update a task description.")
         update_parser.add_argument(
             "task_id",
@@ -44,6 +180,54 @@ class CommandInterface:
             help="New task description",
             type=str
         )
+        tag_parser = subparsers.add_parser("tag", help="Add tags to a task.")
+        tag_parser.add_argument(
+            "task_id",
+            help="Task ID",
+            type=int
+        )
+        tag_parser.add_argument(
+            "tags",
+            help="Tags to add",
+            type=parse_tag,
+            nargs="+"
+        )
+        untag_parser = subparsers.add_parser("untag", help="Remove tags from a task.")
+        untag_parser.add_argument(
+            "task_id",
+            help="Task ID",
+            type=int
+        )
+        untag_parser.add_argument(
+            "tags",
+            help="Tags to remove",
+            type=parse_tag,
+            nargs="+"
+        )
+        priority_parser = subparsers.add_parser("priority", help="Set the priority of a task, or clear it.")
+        priority_parser.add_argument(
+            "task_id",
+            help="Task ID",
+            type=int
+        )
+        priority_parser.add_argument(
+            "priority",
+            help="Priority, higher is more urgent (default: none)",
+            type=int,
+            nargs="?"
+        )
+        due_parser = subparsers.add_parser("due", help="Set the time a task is due, or clear it.")
+        due_parser.add_argument(
+            "task_id",
+            help="Task ID",
+            type=int
+        )
+        due_parser.add_argument(
+            "due",
+            help="ISO 8601 time the task is due (default: none)",
+            type=parse_timestamp,
+            nargs="?"
+        )
         delete_parser = subparsers.add_parser("delete", help="Delete a task.")
         delete_parser.add_argument(
             "task_id",
@@ -58,6 +242,166 @@ class CommandInterface:
             choices=[TaskStatus.TODO.value, TaskStatus.IN_PROGRESS.value, TaskStatus.DONE.value],
             nargs="?"
         )
+        list_parser.add_argument(
+            "--status",
+            help="Only list tasks with this status, like the positional argument",
+            type=str,
+            choices=[TaskStatus.TODO.value, TaskStatus.IN_PROGRESS.value, TaskStatus.DONE.value],
+            default=None,
+            dest="status_option"
+        )
+        list_parser.add_argument(
+            "--tag",
+            help="Only list tasks with this tag; repeated, tasks with every tag given",
+            type=parse_tag,
+            action="append",
+            default=[],
+            dest="tags"
+        )
+        list_parser.add_argument(
+            "--any-tag",
+            help="Only list tasks with at least one of the tags given this way",
+            type=parse_tag,
+            action="append",
+            default=[],
+            dest="any_tags"
+        )
+        list_parser.add_argument(
+            "--exclude-tag",
+            help="Leave out the tasks with this tag, may be repeated",
+            type=parse_tag,
+            action="append",
+            default=[],
+            dest="exclude_tags"
+        )
+        list_parser.add_argument(
+            "--sort",
+            help="Sort the tasks by this field instead of listing them in insertion order",
+            type=str,
+            choices=SORT_FIELDS,
+            default=None
+        )
+        list_parser.add_argument(
+            "--desc",
+            help="Sort in descending order, e.g. the most recently updated first",
+            action="store_true"
+        )
+        list_parser.add_argument(
+            "--since",
+            help="Only list tasks created (or, with --sort updated_at, updated) at or after this ISO 8601 time",
+            type=parse_timestamp,
+            default=None,
+            metavar="TIME"
+        )
+        list_parser.add_argument(
+            "--until",
+            help="Only list tasks created (or, with --sort updated_at, updated) at or before this ISO 8601 time",
+            type=parse_timestamp,
+            default=None,
+            metavar="TIME"
+        )
+        list_parser.add_argument(
+            "--offset",
+            help="Skip this many tasks",
+            type=parse_count,
+            default=0
+        )
+        list_parser.add_argument(
+            "--limit",
+            help="Show at most this many tasks",
+            type=parse_count,
+            default=None
+        )
+        if self.workspace is not None:
+            list_parser.add_argument(
+                "--all-lists",
+                help="List the matching tasks of every list of the workspace, skipping the lists known to have none",
+                action="store_true"
+            )
+            subparsers.add_parser("lists", help="Show the lists of the workspace and their number of tasks per status.")
+        search_parser = subparsers.add_parser("search", help="Search task descriptions, best matches first.")
+        search_parser.add_argument(
+            "query",
+            help="Words, or parts of words, that every task found must contain",
+            type=str
+        )
+        search_parser.add_argument(
+            "--status",
+            help="Only search tasks with this status",
+            type=str,
+            choices=[TaskStatus.TODO.value, TaskStatus.IN_PROGRESS.value, TaskStatus.DONE.value],
+            default=None
+        )
+        search_parser.add_argument(
+            "--limit",
+            help="Show at most this many tasks",
+            type=parse_count,
+            default=None
+        )
+        next_parser = subparsers.add_parser(
+            "next",
+            help="Show the most urgent tasks not done: highest priority, then soonest due, then oldest."
+        )
+        next_parser.add_argument(
+            "-n",
+            help="Show this many tasks",
+            type=parse_count,
+            default=1,
+            dest="count"
+        )
+        overdue_parser = subparsers.add_parser("overdue", help="Show the tasks not done past their due time.")
+        overdue_parser.add_argument(
+            "--limit",
+            help="Show at most this many tasks",
+            type=parse_count,
+            default=None
+        )
+        archive_parser = subparsers.add_parser(
+            "archive",
+            help="Move the tasks done long ago to the compressed archive, where list done still finds them."
+        )
+        archive_parser.add_argument(
+            "--older-than",
+            help="Archive the tasks done at least this many days ago (default: 30)",
+            type=parse_duration,
+            default=30.0,
+            metavar="DAYS"
+        )
+        stats_parser = subparsers.add_parser(
+            "stats",
+            help="Show the number of tasks per status, created and done per day, and the median time to done."
+        )
+        stats_parser.add_argument(
+            "--days",
+            help="Show the tasks created and done on each of the last DAYS days (default: 7)",
+            type=parse_count,
+            default=7,
+            metavar="DAYS"
+        )
+        watch_parser = subparsers.add_parser(
+            "watch",
+            help="Stream the changes made to tasks as NDJSON, one event per line, until interrupted."
+        )
+        watch_parser.add_argument(
+            "--since",
+            help="Start after the event with this sequence number (default: only new changes)",
+            type=parse_count,
+            default=None,
+            metavar="SEQ"
+        )
+        watch_parser.add_argument(
+            "--interval",
+            help="Check for new changes every this many seconds (default: 0.5)",
+            type=parse_interval,
+            default=0.5,
+            metavar="SECONDS"
+        )
+        watch_parser.add_argument(
+            "--limit",
+            help="Stop after this many events",
+            type=parse_count,
+            default=None
+        )
         mark_in_progress_parser = subparsers.add_parser("mark-in-progress", help="Mark a task as in-progress.")
         mark_in_progress_parser.add_argument(
             "task_id",
@@ -70,45 +414,394 @@ class CommandInterface:
             help="Task ID",
             type=int
         )
+        batch_parser = subparsers.add_parser(
+            "batch",
+            help="Apply operations read as NDJSON, one JSON object per line, with a single store write."
+        )
+        batch_parser.add_argument(
+            "file",
+            help='NDJSON file with operations such as {"action": "add", "description": "..."} (default: stdin)',
+            type=str,
+            nargs="?",
+            default="-"
+        )
+        export_parser = subparsers.add_parser(
+            "export",
+            help="Write every task, archived ones included, as NDJSON or CSV."
+        )
+        export_parser.add_argument(
+            "file",
+            help="File to write (default: stdout)",
+            type=str,
+            nargs="?",
+            default="-"
+        )
+        export_parser.add_argument(
+            "--format",
+            help="File format (default: csv for a .csv file, ndjson otherwise)",
+            choices=["ndjson", "csv"],
+            default=None
+        )
+        export_parser.add_argument(
+            "--status",
+            help="Only export tasks with this status",
+            type=str,
+            choices=[TaskStatus.TODO.value, TaskStatus.IN_PROGRESS.value, TaskStatus.DONE.value],
+            default=None
+        )
+        import_parser = subparsers.add_parser(
+            "import",
+            help="Add the tasks of an NDJSON or CSV file, such as one written by export, with new IDs."
+        )
+        import_parser.add_argument(
+            "file",
+            help="File to read (default: stdin)",
+            type=str,
+            nargs="?",
+            default="-"
+        )
+        import_parser.add_argument(
+            "--format",
+            help="File format (default: csv for a .csv file, ndjson otherwise)",
+            choices=["ndjson", "csv"],
+            default=None
+        )
+        import_parser.add_argument(
+            "--chunk-size",
+            help="Read, parse and write the tasks this many bytes at a time (default: 4 MiB)",
+            type=parse_positive,
+            default=4 * 1024 * 1024,
+            metavar="BYTES"
+        )
+        import_parser.add_argument(
+            "--workers",
+            help="Parse chunks in this many processes (default: the CPU count)",
+            type=parse_positive,
+            default=None
+        )
+        serve_parser = subparsers.add_parser(
+            "serve",
+            help="Keep the tracker loaded and serve commands over a Unix domain socket."
+        )
+        serve_parser.add_argument(
+            "--socket",
+            help="Socket path (default: $TASK_TRACKER_SOCKET or .task-tracker.sock)",
+            type=Path,
+            default=None
+        )
+        serve_parser.add_argument(
+            "--write-behind",
+            help="Coalesce the changes made within this many seconds into a single store write",
+            type=parse_duration,
+            default=None,
+            metavar="SECONDS"
+        )
+
+    @property
+    def _in(self) -> TextIO:
+        return self.input_stream or stdin
 
-    async def execute(self):
-        args = self.parser.parse_args()
+    @property
+    def _out(self) -> TextIO:
+        return self.output_stream or stdout
 
+    @property
+    def _err(self) -> TextIO:
+        return self.error_stream or stderr
+
+    async def execute(self, argv: list[str] | None = None):
+        await self.dispatch(self.parse_args(argv))
+
+    def parse_args(self, argv: list[str] | None = None) -> Namespace:
+        args = self.parser.parse_args(argv)
+        # Only the commands working on a single list build its tracker.
+        if self.workspace is not None and args.action != "lists" and not getattr(args, "all_lists", False):
+            try:
+                self.tracker = self.workspace.tracker(args.list_name)
+            except ValueError as error:
+                self.parser.error(str(error))
+        return args
+
+    async def dispatch(self, args: Namespace):
+        if args.profile or args.profile_output or args.cprofile:
+            await self.execute_profiled(args)
+        else:
+            await self.run(args)
+
+    async def execute_profiled(self, args: Namespace):
+        if args.cprofile is not None:
+            import cProfile
+            metrics.profiler = cProfile.Profile()
+            metrics.profiler.enable()
+        metrics.reset()
+        metrics.enable()
+        try:
+            with metrics.timed("command.execute"):
+                await self.run(args)
+        finally:
+            metrics.disable()
+            profiler, metrics.profiler = metrics.profiler, None
+            if profiler is not None:
+                profiler.disable()
+                profiler.dump_stats(args.cprofile)
+            if args.profile_output is not None:
+                args.profile_output.write_text(
+                    json.dumps({"command": args.action, "metrics": metrics.as_dict()}, indent=2),
+                    encoding="utf-8"
+                )
+            elif args.profile:
+                self._err.write(metrics.format_report())
+
+    async def run(self, args: Namespace):
         match args.action:
             case "add":
-                task = await self.tracker.add_task(args.description)
-                stdout.write(f"Task added successfully (ID: {task.id}).\n")
+                options = {"tags": args.tags} if args.tags else {}
+                if args.priority is not None:
+                    options["priority"] = args.priority
+                if args.due is not None:
+                    options["due_at"] = args.due
+                task = await self.tracker.add_task(args.description, **options)
+                self._out.write(f"Task added successfully (ID: {task.id}).\n")
             case "update":
                 try:
                     task = await self.tracker.update_task(args.task_id, args.description)
-                    stdout.write(f"Task (ID: {task.id}) updated successfully.\n")
+                    self._out.write(f"Task (ID: {task.id}) updated successfully.\n")
+                except ValueError:
+                    self._err.write(f"Task (ID: {args.task_id}) not found.\n")
+            case "tag" | "untag":
+                try:
+                    if args.action == "tag":
+                        task = await self.tracker.tag_task(args.task_id, args.tags)
+                    else:
+                        task = await self.tracker.untag_task(args.task_id, args.tags)
+                    self._out.write(f"Task (ID: {task.id}) {args.action}ged successfully.\n")
+                except ValueError:
+                    self._err.write(f"Task (ID: {args.task_id}) not found.\n")
+            case "priority" | "due":
+                try:
+                    if args.action == "priority":
+                        task = await self.tracker.set_priority(args.task_id, args.priority)
+                    else:
+                        task = await self.tracker.set_due(args.task_id, args.due)
+                    self._out.write(f"Task (ID: {task.id}) {args.action} set successfully.\n")
                 except ValueError:
-                    stderr.write(f"Task (ID: {args.task_id}) not found.\n")
+                    self._err.write(f"Task (ID: {args.task_id}) not found.\n")
             case "delete":
                 try:
                     task = await self.tracker.delete_task(args.task_id)
-                    stdout.write(f"Task (ID: {task.id}) deleted successfully.\n")
+                    self._out.write(f"Task (ID: {task.id}) deleted successfully.\n")
                 except ValueError:
-                    stderr.write(f"Task (ID: {args.task_id}) not found.\n")
+                    self._err.write(f"Task (ID: {args.task_id}) not found.\n")
             case "list":
-                tasks = await self.tracker.list_tasks(args.status)
+                if args.status and args.status_option and args.status != args.status_option:
+                    self._err.write("Give a single status.\n")
+                    return
+                status = args.status or args.status_option
+                tag_filters = {
+                    name: getattr(args, name) for name in ("tags", "any_tags", "exclude_tags") if getattr(args, name)
+                }
+                if getattr(args, "all_lists", False):
+                    options = {
+                        "sort": args.sort, "descending": args.desc, "since": args.since, "until": args.until,
+                        "offset": args.offset, "limit": args.limit, **tag_filters
+                    }
+                    listed = await self.workspace.list_all(status, **options)
+                    for name, tasks in listed.items():
+                        self._out.write(f"List: {name}\n")
+                        for task in tasks:
+                            self._out.write(task.display_details())
+                    found = bool(listed)
+                elif tag_filters or args.sort or args.since or args.until or args.offset or args.limit is not None:
+                    tasks = await self.tracker.list_tasks(
+                        status, args.sort, args.desc, args.since, args.until, args.offset, args.limit, **tag_filters
+                    )
+                    for task in tasks:
+                        self._out.write(task.display_details())
+                    found = bool(tasks)
+                else:
+                    found = False
+                    async for task in self.tracker.iter_tasks(status):
+                        self._out.write(task.display_details())
+                        found = True
+                if not found:
+                    self._err.write("No tasks found.\n")
+            case "lists":
+                for name, entry in sorted(self.workspace.lists().items()):
+                    counts = entry.get("counts")
+                    if counts is None or entry["stale"]:
+                        summary = "not counted since its last change"
+                    else:
+                        summary = ", ".join(f"{count} {status}" for status, count in counts.items())
+                    self._out.write(f"{name}: {summary} ({entry['path']})\n")
+            case "search":
+                tasks = await self.tracker.search(args.query, args.status, args.limit)
+                for task in tasks:
+                    self._out.write(task.display_details())
                 if not tasks:
-                    stderr.write("No tasks found.\n")
+                    self._err.write("No tasks found.\n")
+            case "next" | "overdue":
+                if args.action == "next":
+                    tasks = await self.tracker.next_tasks(args.count)
+                else:
+                    tasks = await self.tracker.overdue_tasks(limit=args.limit)
+                for task in tasks:
+                    self._out.write(task.display_details())
+                if not tasks:
+                    self._err.write("No tasks found.\n")
+            case "archive":
+                try:
+                    tasks = await self.tracker.archive_tasks(datetime.timedelta(days=args.older_than))
+                    self._out.write(f"Archived {len(tasks)} task(s).\n")
+                except ValueError as error:
+                    self._err.write(f"{error}.\n")
+            case "stats":
+                stats = await self.tracker.stats()
+                counts = ", ".join(f"{status.value}: {count}" for status, count in stats.status_counts.items())
+                self._out.write(f"Tasks: {sum(stats.status_counts.values())} ({counts})\n")
+                median = stats.median_time_to_done()
+                if median is not None:
+                    median -= datetime.timedelta(microseconds=median.microseconds)
+                self._out.write(f"Median time to done: {'-' if median is None else f'about {median}'}\n")
+                if args.days:
+                    self._out.write("Day         Created  Done\n")
+                today = datetime.date.today()
+                for offset in range(args.days - 1, -1, -1):
+                    day = today - datetime.timedelta(days=offset)
+                    created, done = stats.created_per_day.get(day, 0), stats.done_per_day.get(day, 0)
+                    self._out.write(f"{day.isoformat()}  {created:7}  {done:4}\n")
+            case "watch":
+                if args.limit == 0:
                     return
-                display_tasks = [task.display_details() for task in tasks]
-                stdout.writelines(display_tasks)
+                try:
+                    count = 0
+                    async for event in self.tracker.watch(args.since, args.interval):
+                        self._out.write(json.dumps(event) + "\n")
+                        self._out.flush()
+                        count += 1
+                        if count == args.limit:
+                            break
+                except ValueError as error:
+                    self._err.write(f"{error}.\n")
             case "mark-in-progress":
                 try:
                     task = await self.tracker.mark_in_progress(args.task_id)
-                    stdout.write(f"Task (ID: {task.id}) marked as in-progress successfully.\n")
+                    self._out.write(f"Task (ID: {task.id}) marked as in-progress successfully.\n")
                 except ValueError:
-                    stderr.write(f"Task (ID: {args.task_id}) not found.\n")
+                    self._err.write(f"Task (ID: {args.task_id}) not found.\n")
             case "mark-done":
                 try:
                     task = await self.tracker.mark_done(args.task_id)
-                    stdout.write(f"Task (ID: {task.id}) marked as done successfully.\n")
+                    self._out.write(f"Task (ID: {task.id}) marked as done successfully.\n")
                 except ValueError:
-                    stderr.write(f"Task (ID: {args.task_id}) not found.\n")
+                    self._err.write(f"Task (ID: {args.task_id}) not found.\n")
+            case "batch":
+                if args.file == "-":
+                    await self.execute_batch(self._in)
+                    return
+                try:
+                    with open(args.file, encoding="utf-8") as lines:
+                        await self.execute_batch(lines)
+                except FileNotFoundError:
+                    self._err.write(f"File {args.file} not found.\n")
+            case "export":
+                await self.execute_export(args)
+            case "import":
+                try:
+                    await self.execute_import(args)
+                except FileNotFoundError:
+                    self._err.write(f"File {args.file} not found.\n")
+                except ValueError as error:
+                    self._err.write(f"{error}.\n")
+            case "serve":
+                from daemon import TrackerDaemon
+                if args.write_behind is not None:
+                    if self.workspace is not None:
+                        self.workspace.write_behind = args.write_behind
+                    self.tracker.write_behind = args.write_behind
+                try:
+                    await TrackerDaemon(self, args.socket).serve()
+                except RuntimeError as error:
+                    self._err.write(f"{error}.\n")
+                    exit(1)
             case _:
-                self.parser.print_help()
+                self.parser.print_help(self._out)
                 exit(1)
+
+    async def execute_batch(self, lines: Iterable[str]):
+        operations, failures = [], []
+        for line_number, line in enumerate(lines, start=1):
+            if not line.strip():
+                continue
+            try:
+                operations.append((line_number, json.loads(line)))
+            except json.JSONDecodeError as error:
+                failures.append((line_number, f"Invalid JSON: {error.msg}"))
+
+        results = await self.tracker.apply_batch([operation for _, operation in operations])
+        succeeded = 0
+        for (line_number, _), result in zip(operations, results):
+            if isinstance(result, Exception):
+                failures.append((line_number, str(result)))
+            else:
+                succeeded += 1
+        for line_number, message in sorted(failures):
+            self._err.write(f"Line {line_number}: {message}.\n")
+        self._out.write(f"Batch applied: {succeeded} succeeded, {len(failures)} failed.\n")
+
+    async def execute_export(self, args: Namespace):
+        from commons import TaskTransfer
+        from commons.transfer import detect_format
+
+        transfer = TaskTransfer(args.format or detect_format(args.file))
+        opened = None if args.file == "-" else open(args.file, "w", encoding="utf-8", newline="")
+        output = opened or self._out
+        started = reported = perf_counter()
+        count, chunk = 0, []
+        try:
+            output.write(transfer.header())
+            async for task in self.tracker.iter_tasks(args.status):
+                chunk.append(task)
+                if len(chunk) < EXPORT_CHUNK:
+                    continue
+                output.write(transfer.encode(chunk))
+                count, chunk = count + len(chunk), []
+                if perf_counter() - reported >= PROGRESS_INTERVAL:
+                    reported = perf_counter()
+                    self._report_progress("Exported", count, started)
+            output.write(transfer.encode(chunk))
+            count += len(chunk)
+        finally:
+            if opened is not None:
+                opened.close()
+        self._report_progress("Exported", count, started)
+
+    async def execute_import(self, args: Namespace):
+        from commons import TaskTransfer
+        from commons.transfer import detect_format
+
+        transfer = TaskTransfer(args.format or detect_format(args.file), args.chunk_size, args.workers)
+        opened = None if args.file == "-" else open(args.file, "rb")
+        source = opened or getattr(self._in, "buffer", self._in)
+        started = reported = perf_counter()
+        imported = failed = 0
+        try:
+            async for tasks, errors, _ in transfer.parse(source):
+                # One store write per chunk.
+                imported += len(await self.tracker.import_tasks(tasks))
+                failed += len(errors)
+                for line_number, message in errors:
+                    self._err.write(f"Line {line_number}: {message}.\n")
+                if perf_counter() - reported >= PROGRESS_INTERVAL:
+                    reported = perf_counter()
+                    self._report_progress("Imported", imported, started)
+        finally:
+            transfer.close()
+            if opened is not None:
+                opened.close()
+        self._report_progress("Imported", imported, started)
+        self._out.write(f"Import done: {imported} imported, {failed} failed.\n")
+
+    def _report_progress(self, verb: str, count: int, started: float):
+        elapsed = perf_counter() - started
+        self._err.write(f"{verb} {count} task(s) in {elapsed:.1f}s ({count / max(elapsed, 1e-9):,.0f} tasks/s).\n")
+        self._err.flush()
@@ -1,10 +1,72 @@
-from .store import StoreJSON, StoreProtocol
+from .archive import TaskArchive
+from .change_feed import ChangeFeed
+from .metrics import Metric, Metrics, metrics
+from .search_index import SearchIndex
+from .sort_index import SortIndex
+from .store import (
+    AsyncStoreProtocol,
+    IncrementalStoreProtocol,
+    QueryStoreProtocol,
+    StoreJSON,
+    StoreProtocol,
+    StreamStoreProtocol,
+    ThreadedStoreMixin,
+    VersionedStoreProtocol,
+)
+from .tag_index import TagFilter, TagIndex
 from .task import Task
+from .task_index import TaskIndex
+from .task_queue import TaskQueue
+from .task_stats import TaskStats
 from .task_status import TaskStatus
+from .task_table import TaskTable
 
 __all__ = [
+    'AsyncStoreProtocol',
+    'ChangeFeed',
+    'IncrementalStoreProtocol',
+    'Metric',
+    'Metrics',
+    'QueryStoreProtocol',
+    'SearchIndex',
+    'SortIndex',
     'StoreJSON',
+    'StoreJournal',
+    'StoreNDJSON',
     'StoreProtocol',
+    'StoreSQLite',
+    'StoreSharded',
+    'StreamStoreProtocol',
+    'TagFilter',
+    'TagIndex',
     'Task',
-    'TaskStatus'
+    'TaskArchive',
+    'TaskIndex',
+    'TaskQueue',
+    'TaskStats',
+    'TaskStatus',
+    'TaskTable',
+    'TaskTransfer',
+    'ThreadedStoreMixin',
+    'VersionedStoreProtocol',
+    'metrics'
 ]
+
+# The other stores and TaskTransfer pull in sqlite3, mmap, array, csv and multiprocessing, so they are only
+# imported when first used.
+_LAZY = {
+    'StoreJournal': 'store_journal',
+    'StoreNDJSON': 'store_ndjson',
+    'StoreSQLite': 'store_sqlite',
+    'StoreSharded': 'store_sharded',
+    'TaskTransfer': 'transfer',
+}
+
+
+def __getattr__(name: str):
+    if name in _LAZY:
+        from importlib import import_module
+        value = getattr(import_module(f"{__name__}.{_LAZY[name]}"), name)
+        globals()[name] = value
+        return value
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
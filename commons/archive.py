@@ -0,0 +1,156 @@
+import json
+import os
+from collections.abc import Iterable, Iterator
+from dataclasses import dataclass, field
+from pathlib import Path
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - not available on Windows, appends are then not locked
+    fcntl = None
+
+from .metrics import metrics
+from .store import dump_task, load_task
+from .task import Task
+from .task_status import TaskStatus
+
+_SUFFIXES = (".gz", ".xz")
+# The bytes every gzip member and xz stream starts with.
+_MAGIC = {".gz": b"\x1f\x8b\x08", ".xz": b"\xfd7zXZ\x00"}
+_CHUNK_SIZE = 1 << 20
+
+
+@dataclass
+class TaskArchive:
+    """
+    An append-only, compressed archive of tasks that are rarely read, such as tasks done long ago.
+
+    Every append adds a gzip member (``.gz``) or an xz stream (``.xz``) holding one JSON record
+    per line, in the format of the StoreJournal records: ``{"op": "put", "task": {...}}`` or
+    ``{"op": "delete", "id": ...}``. Both formats read concatenated members back as one stream,
+    so appending never rewrites what is already archived. A member torn by a crash in the middle
+    of an append is skipped when reading, and the members appended after it are still read. The
+    archive is only decompressed when it is read, and the tasks read are kept until another
+    append changes the file. The highest ID ever archived is kept uncompressed in
+    ``<archive>.last-id``, so new IDs are allocated without reading the archive.
+
+    Attributes:
+        path (Path): The path to the archive file, ending in .gz or .xz.
+        _tasks (dict[int, Task] | None): The archived tasks read last, None until read.
+        _signature (tuple | None): The size and modification time of the file they were read from.
+
+    Methods:
+        append(tasks: Iterable[Task]) -> None: Archives the tasks.
+        remove(task_ids: Iterable[int]) -> None: Drops tasks from the archive, by appending records.
+        get_task(task_id: int) -> Task | None: Returns the archived task with the given ID, if any.
+        iter_tasks(status: TaskStatus | None = None) -> Iterator[Task]: Yields the archived tasks, in ID order.
+        last_task_id() -> int: Returns the highest ID ever archived, or 0.
+    """
+    path: Path
+    _tasks: dict[int, Task] | None = field(init=False, repr=False, default=None)
+    _signature: tuple | None = field(init=False, repr=False, default=None)
+
+    def __post_init__(self):
+        if self.path.suffix not in _SUFFIXES:
+            raise ValueError(f"Archive {self.path} must end in {' or '.join(_SUFFIXES)}")
+
+    @property
+    def _last_id_path(self) -> Path:
+        return self.path.with_name(f"{self.path.name}.last-id")
+
+    def append(self, tasks: Iterable[Task]) -> None:
+        tasks = list(tasks)
+        if tasks:
+            self._append([{"op": "put", "task": dump_task(task)} for task in tasks], max(task.id for task in tasks))
+
+    def remove(self, task_ids: Iterable[int]) -> None:
+        records = [{"op": "delete", "id": task_id} for task_id in task_ids]
+        if records:
+            self._append(records)
+
+    def get_task(self, task_id: int) -> Task | None:
+        return self._read().get(task_id)
+
+    def iter_tasks(self, status: TaskStatus | None = None) -> Iterator[Task]:
+        for task in self._read().values():
+            if status is None or task.status == status:
+                yield task
+
+    def last_task_id(self) -> int:
+        try:
+            return int(self._last_id_path.read_text(encoding="utf-8"))
+        except (FileNotFoundError, ValueError):
+            return 0
+
+    @metrics.measure("archive.append")
+    def _append(self, records: list[dict], last_id: int | None = None) -> None:
+        data = "".join(json.dumps(record) + "\n" for record in records).encode("utf-8")
+        with self.path.open("ab") as file:
+            if fcntl is not None:
+                # Released when the file is closed.
+                fcntl.flock(file, fcntl.LOCK_EX)
+            with self._open(file, "wb") as compressed:
+                compressed.write(data)
+            if last_id is not None and last_id > self.last_task_id():
+                # Under the lock, so concurrent appends never lower it.
+                temporary_path = self._last_id_path.with_name(f"{self._last_id_path.name}.{os.getpid()}.tmp")
+                temporary_path.write_text(str(last_id), encoding="utf-8")
+                os.replace(temporary_path, self._last_id_path)
+        metrics.count("archive.append", records=len(records))
+
+    @metrics.measure("archive.read")
+    def _read(self) -> dict[int, Task]:
+        try:
+            stat = self.path.stat()
+        except FileNotFoundError:
+            return {}
+        signature = (stat.st_size, stat.st_mtime_ns)
+        if self._tasks is not None and self._signature == signature:
+            return self._tasks
+        tasks = {}
+        for member in self._members(self.path.read_bytes()):
+            for line in member.decode("utf-8").splitlines():
+                record = json.loads(line)
+                if record["op"] == "put":
+                    task = load_task(record["task"])
+                    tasks[task.id] = task
+                else:
+                    tasks.pop(record["id"], None)
+        metrics.count("archive.read", tasks=len(tasks))
+        self._tasks, self._signature = dict(sorted(tasks.items())), signature
+        return self._tasks
+
+    def _members(self, data: bytes) -> Iterator[bytes]:
+        # Decompressed member by member: a torn member runs into the one appended after it and
+        # fails to decode, and reading resumes at the start of the next member.
+        if self.path.suffix == ".xz":
+            import lzma
+            decompressor, errors = lambda: lzma.LZMADecompressor(lzma.FORMAT_XZ), (lzma.LZMAError,)
+        else:
+            import zlib
+            decompressor, errors = lambda: zlib.decompressobj(31), (zlib.error,)
+        view, magic, start = memoryview(data), _MAGIC[self.path.suffix], 0
+        while start < len(data):
+            member, position, parts = decompressor(), start, []
+            try:
+                while not member.eof:
+                    chunk = view[position:position + _CHUNK_SIZE]
+                    if not chunk:
+                        raise EOFError
+                    parts.append(member.decompress(chunk))
+                    position += len(chunk)
+            except (EOFError, *errors):
+                start = data.find(magic, start + 1)
+                if start < 0:
+                    return
+                continue
+            yield b"".join(parts)
+            start = position - len(member.unused_data)
+
+    def _open(self, file, mode: str, **options):
+        # Imported on first use, which keeps them off the start-up of every other command.
+        if self.path.suffix == ".xz":
+            import lzma
+            return lzma.open(file, mode, **options)
+        import gzip
+        return gzip.open(file, mode, **options)
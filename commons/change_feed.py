@@ -0,0 +1,161 @@
+import asyncio
+import datetime
+import json
+import os
+import shutil
+from collections.abc import AsyncIterator, Iterable, Iterator
+from dataclasses import dataclass
+from pathlib import Path
+from typing import BinaryIO
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - not available on Windows, appends are then not locked
+    fcntl = None
+
+from .metrics import metrics
+from .store import dump_task
+from .task import Task
+
+OPERATIONS = ("create", "update", "delete", "archive")
+
+
+@dataclass
+class ChangeFeed:
+    """
+    An append-only log of the changes written to a store, one JSON event per line, so clients
+    can follow the changes instead of polling the whole store.
+
+    Every event holds its sequence number ``seq``, one more than the event before it, the
+    operation ``op`` (one of OPERATIONS), the task ``id``, the time ``at`` it was written and,
+    for creates and updates, the ``task``. Appends take an advisory lock on the file, so the
+    events of several processes are numbered in the order they were written.
+
+    Once the file grows past ``max_bytes``, the append that crossed it rewrites it with the
+    newer half of the events. Followers notice the new file and carry on after the last event
+    they saw; one that fell behind by more than the events kept sees a gap in the sequence.
+
+    Attributes:
+        path (Path): The path to the feed file.
+        max_bytes (int): The size in bytes above which the older half of the events is dropped.
+
+    Methods:
+        append(changes: Iterable[tuple[str, int, Task | None]]) -> int: Records (op, id, task) changes, returning the last sequence number.
+        last_sequence() -> int: Returns the sequence number of the last event, 0 if there is none.
+        follow(since: int | None = None, interval: float = 0.5) -> AsyncIterator[dict]: Yields the events after a sequence number as they are appended.
+    """
+    path: Path
+    max_bytes: int = 8 * 1024 * 1024
+
+    @metrics.measure("changes.append")
+    def append(self, changes: Iterable[tuple[str, int, Task | None]]) -> int:
+        changes = list(changes)
+        if not changes:
+            return self.last_sequence()
+        at = datetime.datetime.now().isoformat()
+        while True:
+            with self.path.open("a+b") as file:
+                if fcntl is not None:
+                    # Released when the file is closed.
+                    fcntl.flock(file, fcntl.LOCK_EX)
+                if self._replaced(file):
+                    # Rewritten by another append while this one waited for the lock.
+                    continue
+                sequence, complete = self._last_sequence(file)
+                lines = [] if complete else [""]
+                for op, task_id, task in changes:
+                    sequence += 1
+                    event = {"seq": sequence, "op": op, "id": task_id, "at": at}
+                    if task is not None:
+                        event["task"] = dump_task(task)
+                    lines.append(json.dumps(event))
+                data = ("\n".join(lines) + "\n").encode("utf-8")
+                file.write(data)
+                file.flush()
+                if file.tell() > self.max_bytes:
+                    self._trim(file)
+            metrics.count("changes.append", events=len(changes), bytes_written=len(data))
+            return sequence
+
+    def last_sequence(self) -> int:
+        try:
+            with self.path.open("rb") as file:
+                return self._last_sequence(file)[0]
+        except FileNotFoundError:
+            return 0
+
+    async def follow(self, since: int | None = None, interval: float = 0.5) -> AsyncIterator[dict]:
+        """
+        Yields the events after sequence number ``since``, then every event appended after them,
+        indefinitely; with ``since`` None, only the events appended from now on. The file is
+        polled every ``interval`` seconds, and only the bytes appended since are read.
+        """
+        file, pending = None, b""
+        try:
+            while True:
+                if file is None or self._replaced(file):
+                    if file is not None:
+                        file.close()
+                    file, pending = self._open(), b""
+                    if since is None:
+                        since = self._last_sequence(file)[0] if file is not None else 0
+                data = file.read() if file is not None else b""
+                if not data:
+                    await asyncio.sleep(interval)
+                    continue
+                *lines, pending = (pending + data).split(b"\n")
+                for event in self._decode(lines):
+                    if event["seq"] > since:
+                        since = event["seq"]
+                        yield event
+        finally:
+            if file is not None:
+                file.close()
+
+    def _open(self) -> BinaryIO | None:
+        try:
+            return self.path.open("rb")
+        except FileNotFoundError:
+            return None
+
+    def _replaced(self, file: BinaryIO) -> bool:
+        try:
+            return os.stat(self.path).st_ino != os.fstat(file.fileno()).st_ino
+        except FileNotFoundError:
+            return False
+
+    def _last_sequence(self, file: BinaryIO) -> tuple[int, bool]:
+        # Reads lines backwards from the end, leaving the file at its end. Also tells whether
+        # the file ends with a complete line, which a crash in the middle of an append may not.
+        end = file.seek(0, os.SEEK_END)
+        block = 4096
+        while True:
+            start = max(end - block, 0)
+            file.seek(start)
+            data = file.read(end - start)
+            lines = data.split(b"\n")
+            # The first line may be cut by the start of the block.
+            for event in self._decode(reversed(lines if start == 0 else lines[1:])):
+                file.seek(end)
+                return event["seq"], data.endswith(b"\n")
+            if start == 0:
+                file.seek(end)
+                return 0, not data or data.endswith(b"\n")
+            block *= 4
+
+    def _trim(self, file: BinaryIO) -> None:
+        file.seek(file.tell() // 2)
+        # Kept from the first complete line on.
+        file.readline()
+        temporary_path = self.path.with_name(f"{self.path.name}.{os.getpid()}.tmp")
+        with temporary_path.open("wb") as trimmed:
+            shutil.copyfileobj(file, trimmed)
+        os.replace(temporary_path, self.path)
+
+    def _decode(self, lines: Iterable[bytes]) -> Iterator[dict]:
+        for line in lines:
+            try:
+                yield json.loads(line)
+            except ValueError:
+                # Empty, or torn by a crash in the middle of an append.
+                continue
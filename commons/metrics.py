@@ -0,0 +1,152 @@
+import functools
+import inspect
+import time
+from collections.abc import Callable, Iterator
+from contextlib import contextmanager, nullcontext
+from dataclasses import dataclass, field
+from typing import TYPE_CHECKING, ContextManager
+
+if TYPE_CHECKING:
+    import cProfile
+
+_DISABLED = nullcontext()
+
+
+@dataclass
+class Metric:
+    """
+    The totals recorded under one metric name.
+
+    Attributes:
+        calls (int): The number of timed calls.
+        seconds (float): The total time spent in those calls.
+        counters (dict[str, int]): Other totals, such as bytes_read, bytes_written or tasks.
+    """
+    calls: int = 0
+    seconds: float = 0.0
+    counters: dict[str, int] = field(default_factory=dict)
+
+
+@dataclass
+class Metrics:
+    """
+    A registry of timings and counters for the hot paths. The instrumentation stays in place
+    but records nothing until ``enable()`` is called, so it only costs a flag check per call
+    otherwise. Per-task work is measured per phase (decoding, encoding) rather than per task.
+
+    Attributes:
+        enabled (bool): Whether timings and counters are recorded.
+        records (dict[str, Metric]): The totals recorded so far, by metric name.
+        profiler (cProfile.Profile | None): The running cProfile profiler, if any. It only sees the
+            thread it was enabled on, so work normally handed to other threads runs inline meanwhile.
+
+    Methods:
+        enable() -> None: Starts recording.
+        disable() -> None: Stops recording, keeping what was recorded.
+        reset() -> None: Drops everything recorded so far.
+        timed(name: str) -> ContextManager: Times the enclosed block under the given name.
+        count(name: str, **counters: int) -> None: Adds to the counters of the given name.
+        measure(name: str) -> Callable: Decorates a function, coroutine or generator function to time its calls.
+        as_dict() -> dict: Returns the recorded totals, ready to be written as JSON.
+        format_report() -> str: Returns the recorded totals as a table, slowest first.
+    """
+    enabled: bool = False
+    records: dict[str, Metric] = field(default_factory=dict)
+    profiler: "cProfile.Profile | None" = None
+
+    def enable(self) -> None:
+        self.enabled = True
+
+    def disable(self) -> None:
+        self.enabled = False
+
+    def reset(self) -> None:
+        self.records.clear()
+
+    def timed(self, name: str) -> ContextManager:
+        return self._timing(name) if self.enabled else _DISABLED
+
+    def count(self, name: str, **counters: int) -> None:
+        if not self.enabled:
+            return
+        totals = self._metric(name).counters
+        for counter, value in counters.items():
+            totals[counter] = totals.get(counter, 0) + value
+
+    def measure(self, name: str) -> Callable:
+        def decorate(function: Callable) -> Callable:
+            if inspect.iscoroutinefunction(function):
+                @functools.wraps(function)
+                async def wrapper(*args, **kwargs):
+                    if not self.enabled:
+                        return await function(*args, **kwargs)
+                    with self._timing(name):
+                        return await function(*args, **kwargs)
+            elif inspect.isgeneratorfunction(function):
+                @functools.wraps(function)
+                def wrapper(*args, **kwargs):
+                    generator = function(*args, **kwargs)
+                    return self._iterate(name, generator) if self.enabled else generator
+            else:
+                @functools.wraps(function)
+                def wrapper(*args, **kwargs):
+                    if not self.enabled:
+                        return function(*args, **kwargs)
+                    with self._timing(name):
+                        return function(*args, **kwargs)
+            return wrapper
+        return decorate
+
+    def as_dict(self) -> dict:
+        return {
+            name: {"calls": metric.calls, "seconds": metric.seconds, **metric.counters}
+            for name, metric in sorted(self.records.items())
+        }
+
+    def format_report(self) -> str:
+        lines = [f"{'metric':<32}{'calls':>8}{'total ms':>12}{'mean ms':>10}  counters"]
+        for name, metric in sorted(self.records.items(), key=lambda item: -item[1].seconds):
+            mean = metric.seconds / metric.calls if metric.calls else 0.0
+            counters = ", ".join(f"{counter}={value}" for counter, value in sorted(metric.counters.items()))
+            lines.append(f"{name:<32}{metric.calls:>8}{metric.seconds * 1000:>12.2f}{mean * 1000:>10.2f}  {counters}")
+        return "\n".join(lines) + "\n"
+
+    def _metric(self, name: str) -> Metric:
+        metric = self.records.get(name)
+        if metric is None:
+            metric = self.records[name] = Metric()
+        return metric
+
+    @contextmanager
+    def _timing(self, name: str) -> Iterator[None]:
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            metric = self._metric(name)
+            metric.calls += 1
+            metric.seconds += time.perf_counter() - start
+
+    def _iterate(self, name: str, iterator: Iterator) -> Iterator:
+        # Only the time spent producing items is counted, not the time the consumer spends on them.
+        metric = self._metric(name)
+        metric.calls += 1
+        items = 0
+        try:
+            while True:
+                start = time.perf_counter()
+                try:
+                    item = next(iterator)
+                except StopIteration:
+                    return
+                finally:
+                    metric.seconds += time.perf_counter() - start
+                items += 1
+                yield item
+        finally:
+            metric.counters["items"] = metric.counters.get("items", 0) + items
+            if hasattr(iterator, "close"):
+                iterator.close()
+
+
+metrics = Metrics()
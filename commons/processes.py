@@ -0,0 +1,18 @@
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing.context import BaseContext
+
+
+def process_context() -> BaseContext:
+    """
+    Returns the context worker processes are started with. Forking a process that runs threads
+    (the store I/O thread, the event loop) is unsafe, so they are started from a clean server
+    process where there is one, and spawned otherwise.
+    """
+    methods = multiprocessing.get_all_start_methods()
+    return multiprocessing.get_context("forkserver" if "forkserver" in methods else "spawn")
+
+
+def process_pool(workers: int) -> ProcessPoolExecutor:
+    """Returns a pool of at most ``workers`` worker processes started with process_context()."""
+    return ProcessPoolExecutor(workers, mp_context=process_context())
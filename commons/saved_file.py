@@ -0,0 +1,39 @@
+import marshal
+import os
+import struct
+from pathlib import Path
+
+# A saved file starts with a length-prefixed header holding the format and the signature of
+# the store contents it reflects, so a stale file is rejected without decoding the rest.
+_HEADER_LENGTH = struct.Struct("<I")
+
+
+def save_marshalled(path: Path, format: int, signature: list | None, values: tuple) -> None:
+    """
+    Atomically replaces the file at ``path`` with the header for ``format`` and ``signature``
+    followed by ``values``, marshalled.
+    """
+    header = marshal.dumps((format, signature))
+    temporary_path = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+    with temporary_path.open("wb") as file:
+        file.write(_HEADER_LENGTH.pack(len(header)) + header)
+        marshal.dump(values, file)
+    os.replace(temporary_path, path)
+
+
+def load_marshalled(path: Path, format: int, signature: list, length: int) -> tuple | None:
+    """
+    Reads the values saved by save_marshalled(). Returns None if the file is missing, unreadable,
+    saved in another format or for another signature, or does not hold ``length`` values.
+    """
+    try:
+        with path.open("rb") as file:
+            header_length = file.read(_HEADER_LENGTH.size)
+            if len(header_length) < _HEADER_LENGTH.size:
+                return None
+            if marshal.loads(file.read(*_HEADER_LENGTH.unpack(header_length))) != (format, signature):
+                return None
+            values = marshal.loads(file.read())
+    except (OSError, EOFError, ValueError, TypeError):
+        return None
+    return values if isinstance(values, tuple) and len(values) == length else None
@@ -0,0 +1,194 @@
+import heapq
+import math
+import re
+from array import array
+from collections.abc import Iterable, Iterator
+from dataclasses import InitVar, dataclass, field
+from pathlib import Path
+
+from .saved_file import load_marshalled, save_marshalled
+from .task import Task
+
+# A saved index is rejected without decoding the postings when it is stale. The postings are
+# saved as packed arrays of IDs and the trigrams as tuples of tokens, both turned back into sets
+# on first use: loading stays cheap, and a query only pays for the entries it touches.
+_FORMAT = 2
+_ID_TYPE = "q"
+_ID_SIZE = array(_ID_TYPE).itemsize
+_TOKEN = re.compile(r"\w+")
+_EMPTY = frozenset()
+
+
+def tokenize(text: str) -> set[str]:
+    """Splits a description or a query into its distinct lowercase word tokens."""
+    return set(_TOKEN.findall(text.casefold()))
+
+
+def _trigrams(token: str) -> set[str]:
+    return {token[start:start + 3] for start in range(len(token) - 2)}
+
+
+def _pack(ids: set[int] | bytes) -> bytes:
+    return ids if isinstance(ids, bytes) else array(_ID_TYPE, ids).tobytes()
+
+
+def _unpack(packed: bytes) -> array:
+    ids = array(_ID_TYPE)
+    ids.frombytes(packed)
+    return ids
+
+
+def _term_matches(term: str, token: str) -> bool:
+    return term == token if len(term) < 3 else term in token
+
+
+@dataclass
+class SearchIndex:
+    """
+    An inverted index over task descriptions for ranked full-text search.
+
+    Descriptions are split into lowercase word tokens, each mapped to the IDs of the tasks
+    containing it, and every distinct token is in turn indexed by its trigrams. A query term
+    matches the tokens it is a substring of, found by intersecting the tokens of its trigrams;
+    terms shorter than three characters only match whole tokens. A task matches when every term
+    of the query does. Matches are ranked by the IDF weights of the tokens they matched, whole
+    tokens counting twice, and come off a heap best first, so the first k of c candidates cost
+    O(c + k log c).
+
+    Attributes:
+        tasks (Iterable[Task]): The tasks to index initially.
+        signature (list | None): The signature of the store contents the index reflects, None if unknown.
+        _postings (dict[str, set[int] | bytes]): The IDs of the tasks containing each token, still packed if not used since loading.
+        _trigrams (dict[str, set[str] | tuple]): The tokens containing each trigram, still a tuple if not used since loading.
+        _size (int): The number of indexed tasks.
+
+    Methods:
+        apply_change(before: Task | None, after: Task | None) -> None: Updates the index for a created, updated or deleted task.
+        search(query: str) -> Iterator[int]: Yields the IDs of the tasks matching the query, best first.
+        matches(query: str, description: str) -> bool: Tells whether a description matches the query.
+        save(path: Path) -> None: Atomically writes the index to a file.
+        load(path: Path, signature: list) -> SearchIndex | None: Reads an index saved for the given signature.
+    """
+    tasks: InitVar[Iterable[Task]] = ()
+    signature: list | None = None
+    _postings: dict[str, set[int] | bytes] = field(init=False, repr=False, default_factory=dict)
+    _trigrams: dict[str, set[str] | tuple] = field(init=False, repr=False, default_factory=dict)
+    _size: int = field(init=False, repr=False, default=0)
+
+    def __post_init__(self, tasks: Iterable[Task]):
+        for task in tasks:
+            self.apply_change(None, task)
+
+    def apply_change(self, before: Task | None, after: Task | None) -> None:
+        old = tokenize(before.description) if before is not None else _EMPTY
+        new = tokenize(after.description) if after is not None else _EMPTY
+        task_id = before.id if after is None else after.id
+        for token in old - new:
+            self._remove(token, task_id)
+        for token in new - old:
+            self._add(token, task_id)
+        self._size += (after is not None) - (before is not None)
+
+    def search(self, query: str) -> Iterator[int]:
+        groups = []
+        for term in tokenize(query):
+            weights = {
+                token: math.log(1 + self._size / self._count(token)) * (2 if token == term else 1)
+                for token in self._matching_tokens(term)
+            }
+            if not weights:
+                return
+            groups.append(weights)
+        if not groups:
+            return
+
+        # The candidates are found with set operations; only they are scored.
+        matching = [set().union(*(self._ids(token) for token in weights)) for weights in groups]
+        matching.sort(key=len)
+        candidates = matching[0].intersection(*matching[1:])
+        if all(len(weights) == 1 for weights in groups):
+            # Every candidate matched the same tokens: they tie, and ties are broken by ID.
+            heap = list(candidates)
+            heapq.heapify(heap)
+            while heap:
+                yield heapq.heappop(heap)
+            return
+
+        scores = dict.fromkeys(candidates, 0.0)
+        for weights in groups:
+            scored = set()
+            for token, weight in sorted(weights.items(), key=lambda item: -item[1]):
+                # Only the best matching token of each term counts.
+                for task_id in (self._ids(token) & candidates) - scored:
+                    scores[task_id] += weight
+                    scored.add(task_id)
+        heap = [(-score, task_id) for task_id, score in scores.items()]
+        heapq.heapify(heap)
+        while heap:
+            yield heapq.heappop(heap)[1]
+
+    def matches(self, query: str, description: str) -> bool:
+        tokens = tokenize(description)
+        return all(any(_term_matches(term, token) for token in tokens) for term in tokenize(query))
+
+    def save(self, path: Path) -> None:
+        save_marshalled(path, _FORMAT, self.signature, (
+            self._size,
+            {token: _pack(ids) for token, ids in self._postings.items()},
+            {trigram: tuple(tokens) for trigram, tokens in self._trigrams.items()},
+        ))
+
+    @classmethod
+    def load(cls, path: Path, signature: list) -> "SearchIndex | None":
+        saved = load_marshalled(path, _FORMAT, signature, 3)
+        if saved is None:
+            return None
+        size, postings, trigrams = saved
+        index = cls(signature=signature)
+        index._postings, index._trigrams, index._size = postings, trigrams, size
+        return index
+
+    def _matching_tokens(self, term: str) -> list[str]:
+        if len(term) < 3:
+            return [term] if term in self._postings else []
+        token_sets = sorted((self._tokens(trigram) for trigram in _trigrams(term)), key=len)
+        return [token for token in token_sets[0].intersection(*token_sets[1:]) if term in token]
+
+    def _count(self, token: str) -> int:
+        ids = self._postings[token]
+        return len(ids) // _ID_SIZE if isinstance(ids, bytes) else len(ids)
+
+    def _ids(self, token: str) -> set[int]:
+        ids = self._postings[token]
+        if isinstance(ids, bytes):
+            ids = self._postings[token] = set(_unpack(ids))
+        return ids
+
+    def _tokens(self, trigram: str) -> set[str]:
+        tokens = self._trigrams.get(trigram, _EMPTY)
+        if isinstance(tokens, tuple):
+            tokens = self._trigrams[trigram] = set(tokens)
+        return tokens
+
+    def _add(self, token: str, task_id: int) -> None:
+        if token in self._postings:
+            self._ids(token).add(task_id)
+            return
+        self._postings[token] = {task_id}
+        for trigram in _trigrams(token):
+            if trigram in self._trigrams:
+                self._tokens(trigram).add(token)
+            else:
+                self._trigrams[trigram] = {token}
+
+    def _remove(self, token: str, task_id: int) -> None:
+        postings = self._ids(token)
+        postings.discard(task_id)
+        if postings:
+            return
+        del self._postings[token]
+        for trigram in _trigrams(token):
+            tokens = self._tokens(trigram)
+            tokens.discard(token)
+            if not tokens:
+                del self._trigrams[trigram]
@@ -0,0 +1,81 @@
+import bisect
+import datetime
+import heapq
+from collections.abc import Iterable, Iterator
+from dataclasses import InitVar, dataclass, field
+
+from .task import Task
+from .task_status import TaskStatus
+
+SORT_FIELDS = ("id", "created_at", "updated_at")
+
+
+@dataclass
+class SortIndex:
+    """
+    Sorted lists of the tasks' keys for one field (``id``, ``created_at`` or ``updated_at``), one
+    list per status, so ordered and ranged listings are answered by bisect instead of a scan
+    and a sort.
+
+    Timestamp keys are ``(timestamp, id)`` pairs, so equal timestamps are ordered by ID. A
+    listing over every status merges the per-status lists lazily, so the first k keys of a
+    range cost O(log N + k) whatever its size. Keeping one list per status instead of an extra
+    list over all tasks holds every key only once.
+
+    Attributes:
+        tasks (Iterable[Task]): The tasks to index initially.
+        sort_field (str): The field the tasks are ordered by.
+        _keys (dict[TaskStatus, list]): The sorted keys of the tasks with each status.
+
+    Methods:
+        apply_change(before: Task | None, after: Task | None) -> None: Updates the index for a created, updated or deleted task.
+        select(status: TaskStatus | None = None, since: datetime.datetime | None = None, until: datetime.datetime | None = None, descending: bool = False) -> Iterator[int]: Yields task IDs in order.
+    """
+    tasks: InitVar[Iterable[Task]] = ()
+    sort_field: str = "id"
+    _keys: dict[TaskStatus, list] = field(init=False, repr=False)
+
+    def __post_init__(self, tasks: Iterable[Task]):
+        if self.sort_field not in SORT_FIELDS:
+            raise ValueError(f"Cannot sort tasks by {self.sort_field!r}")
+        self._keys = {status: [] for status in TaskStatus}
+        for task in tasks:
+            self._keys[task.status].append(self._key(task))
+        for keys in self._keys.values():
+            keys.sort()
+
+    def apply_change(self, before: Task | None, after: Task | None) -> None:
+        if before is not None:
+            keys = self._keys[before.status]
+            del keys[bisect.bisect_left(keys, self._key(before))]
+        if after is not None:
+            bisect.insort(self._keys[after.status], self._key(after))
+
+    def select(
+        self,
+        status: TaskStatus | None = None,
+        since: datetime.datetime | None = None,
+        until: datetime.datetime | None = None,
+        descending: bool = False
+    ) -> Iterator[int]:
+        """
+        Yields the IDs of the tasks with the given status (any when None) in key order. ``since``
+        and ``until`` bound the indexed timestamp, both inclusive.
+        """
+        if self.sort_field == "id" and (since is not None or until is not None):
+            raise ValueError("Task IDs cannot be bounded by a timestamp")
+        ranges = []
+        for keys in ([self._keys[TaskStatus(status)]] if status is not None else self._keys.values()):
+            start = 0 if since is None else bisect.bisect_left(keys, (since,))
+            stop = len(keys) if until is None else bisect.bisect_right(keys, (until, float("inf")))
+            if descending:
+                ranges.append(map(keys.__getitem__, range(stop - 1, start - 1, -1)))
+            else:
+                ranges.append(map(keys.__getitem__, range(start, stop)))
+        for key in heapq.merge(*ranges, reverse=descending):
+            yield key if self.sort_field == "id" else key[1]
+
+    def _key(self, task: Task) -> int | tuple[datetime.datetime, int]:
+        if self.sort_field == "id":
+            return task.id
+        return getattr(task, self.sort_field), task.id
@@ -1,9 +1,27 @@
+import asyncio
 import datetime
+import io
 import json
-from dataclasses import asdict, dataclass
+import marshal
+import os
+import re
+import struct
+import threading
+import zlib
+from collections.abc import Callable, Container, Iterable, Iterator
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from dataclasses import dataclass, field, replace
+from operator import attrgetter, itemgetter
 from pathlib import Path
-from typing import Protocol
+from typing import BinaryIO, Protocol, TextIO, runtime_checkable
 
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - not available on Windows, writes are then not locked
+    fcntl = None
+
+from .metrics import metrics
 from .task import Task
 from .task_status import TaskStatus
 
@@ -34,52 +52,665 @@ class StoreProtocol(Protocol):
     def load(self) -> list[Task]: ...
 
 
+@runtime_checkable
+class IncrementalStoreProtocol(StoreProtocol, Protocol):
+    """
+    A protocol for stores that can persist individual task changes without rewriting every task.
+
+    Methods:
+        apply_changes(upserts: list[Task], deletes: list[int]) -> None:
+            Persists the created or updated tasks and removes the tasks with the given IDs.
+    """
+
+    def apply_changes(self, upserts: list[Task], deletes: list[int]) -> None: ...
+
+
+@runtime_checkable
+class StreamStoreProtocol(StoreProtocol, Protocol):
+    """
+    A protocol for stores that can decode tasks one at a time, so callers can consume them
+    without holding the whole store in memory.
+
+    Methods:
+        iter_tasks(status: TaskStatus | None = None) -> Iterator[Task]:
+            Yields the stored tasks as they are decoded, optionally filtered by status.
+    """
+
+    def iter_tasks(self, status: TaskStatus | None = None) -> Iterator[Task]: ...
+
+
+@runtime_checkable
+class QueryStoreProtocol(IncrementalStoreProtocol, StreamStoreProtocol, Protocol):
+    """
+    A protocol for stores that answer lookups and filters themselves, so the Tracker can push
+    queries down to the store instead of loading every task into memory.
+
+    Methods:
+        get_task(task_id: int) -> Task | None:
+            Returns the task with the given ID, or None if it does not exist.
+
+        last_task_id() -> int:
+            Returns the highest stored task ID, or 0 if the store is empty.
+    """
+
+    def get_task(self, task_id: int) -> Task | None: ...
+
+    def last_task_id(self) -> int: ...
+
+
+@runtime_checkable
+class VersionedStoreProtocol(StoreProtocol, Protocol):
+    """
+    A protocol for stores shared by several processes. Every write takes a short exclusive lock
+    and checks an optimistic version counter, so a writer only re-reads and merges the stored
+    tasks when another process wrote since this store instance last read or wrote them.
+
+    Methods:
+        commit(upserts: list[Task], deletes: list[int], created: Container[int] = (), tasks: list[Task] | None = None) -> dict[int, int] | None:
+            Persists the changes, rewriting the whole store with ``tasks`` when they are given
+            and nobody else wrote in between, and returns None. Otherwise the changes are merged
+            into the current contents and the new IDs of the created tasks whose ID was taken
+            meanwhile are returned, keyed by their old ID.
+    """
+
+    def commit(
+        self,
+        upserts: list[Task],
+        deletes: list[int],
+        created: Container[int] = (),
+        tasks: list[Task] | None = None
+    ) -> dict[int, int] | None: ...
+
+
+@runtime_checkable
+class AsyncStoreProtocol(StoreProtocol, Protocol):
+    """
+    A protocol for stores whose file I/O can be awaited without blocking the event loop.
+
+    Methods:
+        aload() -> list[Task]:
+            Loads and returns a list of tasks from the file.
+
+        aupdate_file(tasks: list[Task]) -> None:
+            Updates the file with the provided list of tasks.
+
+        aapply_changes(upserts: list[Task], deletes: list[int]) -> None:
+            Persists individual task changes, for stores implementing IncrementalStoreProtocol.
+
+        acommit(upserts: list[Task], deletes: list[int], created: Container[int] = (), tasks: list[Task] | None = None) -> dict[int, int] | None:
+            Persists changes with a version check, for stores implementing VersionedStoreProtocol.
+    """
+
+    async def aload(self) -> list[Task]: ...
+
+    async def aupdate_file(self, tasks: list[Task]) -> None: ...
+
+    async def aapply_changes(self, upserts: list[Task], deletes: list[int]) -> None: ...
+
+    async def acommit(
+        self,
+        upserts: list[Task],
+        deletes: list[int],
+        created: Container[int] = (),
+        tasks: list[Task] | None = None
+    ) -> dict[int, int] | None: ...
+
+
+class ThreadedStoreMixin:
+    """
+    Implements AsyncStoreProtocol on top of a store's blocking methods by running them on a
+    dedicated single-thread executor, so writes reach the file in the order they were issued.
+    They run inline while a cProfile profiler is running, so that it sees them.
+    """
+
+    async def aload(self) -> list[Task]:
+        return await self._run_blocking(self.load)
+
+    async def aupdate_file(self, tasks: list[Task]) -> None:
+        await self._run_blocking(self.update_file, tasks)
+
+    async def aapply_changes(self, upserts: list[Task], deletes: list[int]) -> None:
+        await self._run_blocking(self.apply_changes, upserts, deletes)
+
+    async def acommit(
+        self,
+        upserts: list[Task],
+        deletes: list[int],
+        created: Container[int] = (),
+        tasks: list[Task] | None = None
+    ) -> dict[int, int] | None:
+        return await self._run_blocking(self.commit, upserts, deletes, created, tasks)
+
+    async def _run_blocking(self, function: Callable, *args):
+        if metrics.profiler is not None:
+            return function(*args)
+        executor = vars(self).get("_executor")
+        if executor is None:
+            executor = vars(self)["_executor"] = ThreadPoolExecutor(max_workers=1, thread_name_prefix="store-io")
+        return await asyncio.get_running_loop().run_in_executor(executor, function, *args)
+
+
+def rebase_changes(
+    upserts: Iterable[Task],
+    deletes: Iterable[int],
+    created: Container[int],
+    existing: Container[int],
+    last_id: int
+) -> tuple[list[Task], list[int], dict[int, int]]:
+    """
+    Rebases changes made against an older version of a store onto its current contents, given
+    the IDs that currently exist and the highest one. Created tasks whose ID was taken meanwhile
+    get the next free IDs, while updates and deletes of tasks removed meanwhile are dropped.
+    Returns the rebased upserts and deletes and the new IDs, keyed by the old ones.
+    """
+    upserts = list(upserts)
+    next_id = max([last_id, *(task.id for task in upserts if task.id in created)]) + 1
+    rebased, new_ids = [], {}
+    for task in upserts:
+        if task.id in created:
+            if task.id in existing:
+                new_ids[task.id] = next_id
+                task = replace(task, id=next_id)
+                next_id += 1
+        elif task.id not in existing:
+            continue
+        rebased.append(task)
+    return rebased, [task_id for task_id in deletes if task_id in existing], new_ids
+
+
+_WHITESPACE = re.compile(r"[ \t\n\r]*")
+_STATUSES = {status.value: status for status in TaskStatus}
+_encode_string = json.encoder.encode_basestring_ascii
+_STATUS_STRINGS = {status: _encode_string(status.value) for status in TaskStatus}
+_ROW = itemgetter("id", "description", "status", "created_at", "updated_at")
+_TASK_ID = attrgetter("id")
+_FIRST, _SECOND = itemgetter(0), itemgetter(1)
+
+# The snapshot cache starts with the modification time, size and CRC-32 of the data file it
+# was built from, followed by length-prefixed marshalled lists of up to _CACHE_CHUNK task rows.
+_CACHE_HEADER = struct.Struct("<4sqqI")
+_CACHE_LENGTH = struct.Struct("<I")
+_CACHE_MAGIC = b"TSC3"
+_CACHE_CHUNK = 1024
+
+
+def iter_json_array(file: TextIO, chunk_size: int = 64 * 1024) -> Iterator[dict]:
+    """
+    Incrementally decodes the objects of a JSON array, reading the file in chunks so memory stays
+    bounded by the chunk size and the largest object instead of by the file size.
+    """
+    decoder = json.JSONDecoder()
+    buffer, position = "", 0
+    started = exhausted = False
+    while True:
+        position = _WHITESPACE.match(buffer, position).end()
+        if position < len(buffer):
+            character = buffer[position]
+            if not started:
+                if character != "[":
+                    raise json.JSONDecodeError("Expecting '['", buffer, position)
+                started = True
+                position += 1
+                continue
+            if character == "]":
+                return
+            if character == ",":
+                position += 1
+                continue
+            try:
+                item, position = decoder.raw_decode(buffer, position)
+            except json.JSONDecodeError:
+                if exhausted:
+                    raise
+            else:
+                yield item
+                continue
+        elif exhausted:
+            if started:
+                raise json.JSONDecodeError("Unterminated array", buffer, position)
+            return
+        chunk = file.read(chunk_size)
+        buffer, position, exhausted = buffer[position:] + chunk, 0, not chunk
+
+
+def dump_task(task: Task) -> dict:
+    """
+    Returns the JSON object a task is stored as. Every file holding tasks as JSON (the stores,
+    the archive, the change feed and NDJSON exports) shares this format; the optional fields
+    are only written for the tasks that have them.
+    """
+    record = {
+        "id": task.id,
+        "description": task.description,
+        "status": task.status.value,
+        "created_at": task.created_at.isoformat(),
+        "updated_at": task.updated_at.isoformat(),
+    }
+    if task.tags:
+        record["tags"] = list(task.tags)
+    if task.priority is not None:
+        record["priority"] = task.priority
+    if task.due_at is not None:
+        record["due_at"] = task.due_at.isoformat()
+    if task.done_at is not None:
+        record["done_at"] = task.done_at.isoformat()
+    return record
+
+
+def load_task(record: dict) -> Task:
+    """Returns the task stored as the given JSON object, the inverse of dump_task()."""
+    return _from_row(_to_row(record))
+
+
+def _to_row(record: dict) -> tuple:
+    # The row kept in the snapshot cache: five fields, plus the optional ones when any is set.
+    row = _ROW(record)
+    if len(record) == len(row):
+        return row
+    get = record.get
+    return row + (tuple(get("tags", ())), get("priority"), get("due_at"), get("done_at"))
+
+
+def _from_row(row: tuple) -> Task:
+    task_id, description, status, created_at, updated_at, *optional = row
+    task = Task(
+        task_id,
+        description,
+        _STATUSES.get(status) or TaskStatus(status),
+        datetime.datetime.fromisoformat(created_at),
+        datetime.datetime.fromisoformat(updated_at),
+    )
+    if optional:
+        tags, task.priority, due_at, done_at = optional
+        task.tags = tuple(tags)
+        task.due_at = None if due_at is None else datetime.datetime.fromisoformat(due_at)
+        task.done_at = None if done_at is None else datetime.datetime.fromisoformat(done_at)
+    return task
+
+
+def _checksum(descriptor: int, size: int) -> int:
+    crc = position = 0
+    while position < size:
+        chunk = os.pread(descriptor, min(size - position, 1 << 20), position)
+        if not chunk:
+            break
+        crc = zlib.crc32(chunk, crc)
+        position += len(chunk)
+    return crc
+
+
+class _SnapshotCacheWriter:
+    """
+    Writes a snapshot cache row by row into a temporary file, which only replaces the cache
+    once the rows of the whole data file were written and the file was checksummed.
+    """
+
+    def __init__(self, path: Path):
+        self.path = path
+        # Threads of one process may rebuild the cache concurrently.
+        self.temporary_path = path.with_name(f"{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+        self.file = self.temporary_path.open("wb")
+        self.file.write(bytes(_CACHE_HEADER.size))
+        self.rows = []
+
+    def add(self, row: tuple) -> None:
+        self.rows.append(row)
+        if len(self.rows) >= _CACHE_CHUNK:
+            self._flush_rows()
+
+    def finish(self, descriptor: int) -> None:
+        self._flush_rows()
+        stat = os.fstat(descriptor)
+        crc = _checksum(descriptor, stat.st_size)
+        self.file.seek(0)
+        self.file.write(_CACHE_HEADER.pack(_CACHE_MAGIC, stat.st_mtime_ns, stat.st_size, crc))
+        self.file.close()
+        os.replace(self.temporary_path, self.path)
+
+    def discard(self) -> None:
+        self.file.close()
+        self.temporary_path.unlink(missing_ok=True)
+
+    def _flush_rows(self) -> None:
+        if self.rows:
+            chunk = marshal.dumps(self.rows)
+            self.file.write(_CACHE_LENGTH.pack(len(chunk)) + chunk)
+            self.rows = []
+
+
 @dataclass
-class StoreJSON(StoreProtocol):
+class StoreJSON(ThreadedStoreMixin, StreamStoreProtocol, VersionedStoreProtocol, AsyncStoreProtocol):
     """
     A JSON-based implementation of the StoreProtocol for managing task data.
 
+    The file is always replaced atomically, so readers never see a partial write and do not
+    lock. Writers serialize on an advisory lock taken on ``<file>.lock`` for the duration of
+    the write only; the lock file also holds the version counter checked by ``commit()``,
+    together with the signature of the data files the version describes.
+
+    Reads go through a marshalled snapshot cache in ``<file>.cache`` when it was built from the
+    current file, as checked by its modification time, size and CRC-32, which skips decoding the
+    JSON. The cache is rebuilt on every write and after a read that found it out of date. The
+    optional fields (tags, priority, due and completion times) are only written for the tasks
+    that have any, both as JSON keys and as a trailing ``(tags, priority, due_at, done_at)`` in
+    the cached row, so files written before those fields existed still load and most rows stay
+    five fields long.
+
+    Every write keeps the row and the JSON text encoded for each task, by ID. ``commit()``
+    treats the upserts it is given as the only tasks changed since the previous write, which
+    the Tracker guarantees, so it encodes those alone and splices the kept text of the others
+    into the file: encoding a single change costs the same whatever the number of tasks. The
+    kept encodings are only reused while the store is still at the version this instance wrote,
+    and take about as much memory as the file.
+
     Attributes:
         file_path (Path): The path to the JSON file where tasks are stored.
+        snapshot_cache (bool): Whether to read and maintain the snapshot cache, defaults to True.
+        _version (int | None): The version last read or written by this instance, None if unknown.
+        _encoded (dict[int, tuple[tuple, str]]): The row and JSON text of every task written last, by ID.
+        _encoded_version (int | None): The version of the store those tasks were written as, None if none.
 
     Methods:
         __post_init__(): Initializes the store by creating the file if it doesn't exist.
         create_file() -> None: Creates a new JSON file for storing tasks.
         update_file(tasks: list[Task]) -> None: Updates the JSON file with the provided list of tasks.
-        _dump_task(task: Task) -> dict: Converts a Task object into a dictionary suitable for JSON serialization.
-        _load_task(response_dict: dict) -> Task: Converts a dictionary back into a Task object.
+        commit(upserts, deletes, created=(), tasks=None) -> dict[int, int] | None: Writes changes, merging if the version changed.
         load() -> list[Task]: Loads and returns a list of tasks from the JSON file.
+        iter_tasks(status: TaskStatus | None = None) -> Iterator[Task]: Yields tasks as they are decoded from the JSON file.
+        aload(), aupdate_file(tasks), acommit(...): Awaitable versions run on a worker thread.
+        _locked(exclusive: bool = True) -> Iterator[TextIO]: Holds the advisory lock, yielding the lock file.
+        _read_version(lock_file: TextIO) -> tuple[int, bool]: Reads the version and whether it matches the data files.
+        _write_version(lock_file: TextIO, version: int) -> None: Records the version of the data files just written.
+        _observe_version(signature: list) -> None: Remembers the version of the data files just read.
+        _write_tasks(tasks: list[Task], dirty: Container[int] | None = None) -> None: Atomically replaces the JSON file and rebuilds the snapshot cache.
+        _encode_task(task: Task) -> tuple[tuple, str]: Encodes a task into its row and its JSON text.
+        _read_rows(file: BinaryIO) -> list[tuple]: Reads the rows of an open data file, from the snapshot cache when it is valid.
+        _iter_file(file: BinaryIO, status: TaskStatus | None = None) -> Iterator[Task]: Streams the tasks of an open data file.
+        _open_cache(file: BinaryIO) -> BinaryIO | None: Opens the snapshot cache if it was built from the open data file.
+        _write_cache(rows: Iterable[tuple], descriptor: int) -> None: Rebuilds the snapshot cache for the given data file.
     """
     file_path: Path
+    snapshot_cache: bool = True
+    _version: int | None = field(init=False, repr=False, default=None)
+    _encoded: dict[int, tuple[tuple, str]] = field(init=False, repr=False, default_factory=dict)
+    _encoded_version: int | None = field(init=False, repr=False, default=None)
 
     def __post_init__(self):
         if not self.file_path.exists():
             self.create_file()
 
+    @property
+    def _lock_path(self) -> Path:
+        return self.file_path.with_name(f"{self.file_path.name}.lock")
+
+    @property
+    def _cache_path(self) -> Path:
+        return self.file_path.with_name(f"{self.file_path.name}.cache")
+
+    def _data_paths(self) -> tuple[Path, ...]:
+        return (self.file_path,)
+
     def create_file(self) -> None:
         self.file_path.touch()
 
+    @metrics.measure("store.update_file")
     def update_file(self, tasks: list[Task]) -> None:
-        self.file_path.write_text(
-            json.dumps([self._dump_task(task) for task in tasks]),
-            encoding="utf-8"
-        )
+        with self._locked() as lock_file:
+            version, _ = self._read_version(lock_file)
+            self._encoded = {}
+            self._write_tasks(tasks, ())
+            self._write_version(lock_file, version + 1)
+        self._version = self._encoded_version = version + 1
+
+    @metrics.measure("store.commit")
+    def commit(
+        self,
+        upserts: list[Task],
+        deletes: list[int],
+        created: Container[int] = (),
+        tasks: list[Task] | None = None
+    ) -> dict[int, int] | None:
+        with self._locked() as lock_file:
+            version, consistent = self._read_version(lock_file)
+            changed = not consistent or version != self._version
+            new_ids = {}
+            if tasks is None or changed:
+                current = {task.id: task for task in self._read_tasks()}
+                upserts, deletes, new_ids = rebase_changes(
+                    upserts, deletes, created, current, max(current, default=0)
+                )
+                current.update((task.id, task) for task in upserts)
+                for task_id in deletes:
+                    del current[task_id]
+                tasks = list(current.values())
+            if changed or version != self._encoded_version:
+                self._encoded = {}
+            self._write_tasks(tasks, {task.id for task in upserts})
+            self._write_version(lock_file, version + 1)
+        self._version = self._encoded_version = version + 1
+        return new_ids if changed else None
+
+    @contextmanager
+    def _locked(self, exclusive: bool = True) -> Iterator[TextIO]:
+        descriptor = os.open(self._lock_path, os.O_RDWR | os.O_CREAT, 0o644)
+        with open(descriptor, "r+", encoding="utf-8") as lock_file:
+            if fcntl is not None:
+                # Released when the file is closed. The wait shows how much writers contend.
+                with metrics.timed("store.lock_wait"):
+                    fcntl.flock(lock_file, fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+            yield lock_file
+
+    def _data_signature(self, stats: Iterable[os.stat_result | None] | None = None) -> list:
+        if stats is None:
+            return files_signature(self._data_paths())
+        return [stat and [stat.st_ino, stat.st_mtime_ns, stat.st_size] for stat in stats]
 
-    def _dump_task(self, task: Task) -> dict:
-        response_dict = asdict(task)
-        response_dict["created_at"] = task.created_at.isoformat()
-        response_dict["updated_at"] = task.updated_at.isoformat()
-        response_dict["status"] = task.status.value
-        return response_dict
+    def _read_version(self, lock_file: TextIO, signature: list | None = None) -> tuple[int, bool]:
+        # A record that does not describe the current files was left by a writer that died
+        # between replacing the data and recording its version: treat the version as unknown.
+        lock_file.seek(0)
+        try:
+            record = json.loads(lock_file.read())
+            version = int(record["version"])
+        except (ValueError, KeyError, TypeError):
+            return 0, False
+        return version, record.get("signature") == (signature or self._data_signature())
 
-    def _load_task(self, response_dict: dict) -> Task:
-        response_dict["created_at"] = datetime.datetime.fromisoformat(response_dict["created_at"])
-        response_dict["updated_at"] = datetime.datetime.fromisoformat(response_dict["updated_at"])
-        response_dict["status"] = TaskStatus(response_dict["status"])
-        return Task(**response_dict)
+    def _write_version(self, lock_file: TextIO, version: int) -> None:
+        lock_file.seek(0)
+        lock_file.truncate()
+        lock_file.write(json.dumps({"version": version, "signature": self._data_signature()}))
+        lock_file.flush()
 
+    def _observe_version(self, signature: list) -> None:
+        try:
+            with self._lock_path.open(encoding="utf-8") as lock_file:
+                version, consistent = self._read_version(lock_file, signature)
+        except FileNotFoundError:
+            version, consistent = 0, False
+        self._version = version if consistent else None
+
+    def _write_tasks(self, tasks: list[Task], dirty: Container[int] | None = None) -> None:
+        # With dirty IDs, the other tasks reuse what the previous write encoded and the
+        # encodings are kept for the next one; without them, nothing is reused nor kept.
+        kept = self._encoded if dirty is not None else {}
+        with metrics.timed("store.encode"):
+            for task_id in dirty or ():
+                kept.pop(task_id, None)
+            ids = list(map(_TASK_ID, tasks))
+            entries = list(map(kept.get, ids))
+            missing = [position for position, entry in enumerate(entries) if entry is None]
+            for position in missing:
+                entries[position] = self._encode_task(tasks[position])
+            rows = list(map(_FIRST, entries))
+            text = f"[{', '.join(map(_SECOND, entries))}]"
+        metrics.count("store.encode", tasks=len(missing), reused=len(entries) - len(missing))
+        temporary_path = self.file_path.with_name(f"{self.file_path.name}.{os.getpid()}.tmp")
+        with temporary_path.open("w+", encoding="utf-8") as file:
+            with metrics.timed("store.write"):
+                file.write(text)
+                file.flush()
+            metrics.count("store.write", bytes_written=len(text))
+            # The temporary file keeps its inode, modification time and size when renamed.
+            self._write_cache(rows, file.fileno())
+        os.replace(temporary_path, self.file_path)
+        if dirty is not None:
+            self._encoded = dict(zip(ids, entries))
+
+    def _encode_task(self, task: Task) -> tuple[tuple, str]:
+        # The same text as json.dumps(dump_task(task)), without building the dictionary.
+        created_at, updated_at = task.created_at.isoformat(), task.updated_at.isoformat()
+        text = (
+            f'{{"id": {task.id:d}, "description": {_encode_string(task.description)}, '
+            f'"status": {_STATUS_STRINGS[task.status]}, "created_at": "{created_at}", "updated_at": "{updated_at}"'
+        )
+        row = (task.id, task.description, task.status.value, created_at, updated_at)
+        if not task.tags and task.priority is None and task.due_at is None and task.done_at is None:
+            return row, f"{text}}}"
+        due_at = None if task.due_at is None else task.due_at.isoformat()
+        done_at = None if task.done_at is None else task.done_at.isoformat()
+        if task.tags:
+            text = f'{text}, "tags": [{", ".join(map(_encode_string, task.tags))}]'
+        if task.priority is not None:
+            text = f'{text}, "priority": {task.priority:d}'
+        if due_at is not None:
+            text = f'{text}, "due_at": "{due_at}"'
+        if done_at is not None:
+            text = f'{text}, "done_at": "{done_at}"'
+        return row + (task.tags, task.priority, due_at, done_at), f"{text}}}"
+
+    @metrics.measure("store.load")
     def load(self) -> list[Task]:
-        text = self.file_path.read_text(encoding="utf-8")
-        if not text:
-            return []
-        return [self._load_task(task) for task in json.loads(text)]
+        return self._read_tasks(observe=True)
+
+    def _read_tasks(self, observe: bool = False) -> list[Task]:
+        with self.file_path.open("rb") as file:
+            if observe:
+                # The version only counts if it describes the very file opened here.
+                self._observe_version(self._data_signature([os.fstat(file.fileno())]))
+            rows = self._read_rows(file)
+        with metrics.timed("store.build"):
+            tasks = [_from_row(row) for row in rows]
+        metrics.count("store.build", tasks=len(tasks))
+        return tasks
+
+    def _read_rows(self, file: BinaryIO) -> list[tuple]:
+        cache = self._open_cache(file)
+        if cache is not None:
+            with metrics.timed("store.decode_cache"):
+                rows = [row for chunk in self._iter_cache_chunks(cache) for row in chunk]
+            metrics.count("store.decode_cache", tasks=len(rows))
+            return rows
+        with metrics.timed("store.read"):
+            data = file.read()
+        metrics.count("store.read", bytes_read=len(data))
+        with metrics.timed("store.decode"):
+            rows = [_to_row(response_dict) for response_dict in json.loads(data)] if data else []
+        metrics.count("store.decode", tasks=len(rows))
+        self._write_cache(rows, file.fileno())
+        return rows
+
+    @metrics.measure("store.iter_tasks")
+    def iter_tasks(self, status: TaskStatus | None = None) -> Iterator[Task]:
+        with self.file_path.open("rb") as file:
+            self._observe_version(self._data_signature([os.fstat(file.fileno())]))
+            yield from self._iter_file(file, status)
+
+    def _iter_file(self, file: BinaryIO, status: TaskStatus | None = None) -> Iterator[Task]:
+        cache = self._open_cache(file)
+        if cache is not None:
+            yield from self._iter_cache(cache, status)
+            return
+        # The streaming counterpart of _write_cache(): the rows are added as they are decoded.
+        writer = self._cache_writer()
+        text = io.TextIOWrapper(file, encoding="utf-8")
+        try:
+            for response_dict in iter_json_array(text):
+                row = _to_row(response_dict)
+                if writer is not None:
+                    writer.add(row)
+                if status is None or row[2] == status:
+                    yield _from_row(row)
+            if writer is not None:
+                writer.finish(file.fileno())
+                writer = None
+        finally:
+            # The cache is only replaced once the whole file was read.
+            if writer is not None:
+                writer.discard()
+            text.detach()
+
+    def _iter_cache(self, cache: BinaryIO, status: TaskStatus | None = None) -> Iterator[Task]:
+        for chunk in self._iter_cache_chunks(cache):
+            for row in chunk:
+                if status is None or row[2] == status:
+                    yield _from_row(row)
+
+    def _iter_cache_chunks(self, cache: BinaryIO) -> Iterator[list[tuple]]:
+        with cache:
+            while length := cache.read(_CACHE_LENGTH.size):
+                yield marshal.loads(cache.read(*_CACHE_LENGTH.unpack(length)))
+
+    def _open_cache(self, file: BinaryIO) -> BinaryIO | None:
+        if not self.snapshot_cache:
+            return None
+        try:
+            cache = self._cache_path.open("rb")
+        except OSError:
+            return None
+        stat = os.fstat(file.fileno())
+        header = cache.read(_CACHE_HEADER.size)
+        if len(header) == _CACHE_HEADER.size:
+            magic, mtime_ns, size, crc = _CACHE_HEADER.unpack(header)
+            if (magic, mtime_ns, size) == (_CACHE_MAGIC, stat.st_mtime_ns, stat.st_size):
+                with metrics.timed("store.checksum"):
+                    valid = crc == _checksum(file.fileno(), size)
+                metrics.count("store.checksum", bytes_read=size)
+                if valid:
+                    return cache
+        cache.close()
+        return None
+
+    def _write_cache(self, rows: Iterable[tuple], descriptor: int) -> None:
+        writer = self._cache_writer()
+        if writer is None:
+            return
+        with metrics.timed("store.write_cache"):
+            for row in rows:
+                writer.add(row)
+            writer.finish(descriptor)
+
+    def _cache_writer(self) -> _SnapshotCacheWriter | None:
+        if not self.snapshot_cache:
+            return None
+        try:
+            return _SnapshotCacheWriter(self._cache_path)
+        except OSError:
+            return None
+
+
+def store_signature(store: StoreProtocol) -> list:
+    """
+    Returns the inode, modification time and size of the files holding a store's data. They
+    change whenever any process writes to the store, so caches derived from its contents (such
+    as a search index) can tell whether they are still up to date.
+    """
+    if isinstance(store, StoreJSON):
+        return store._data_signature()
+    return files_signature([store.file_path])
+
+
+def files_signature(paths: Iterable[Path]) -> list:
+    """
+    Returns the inode, modification time and size of each file, None for a missing one: the
+    signature of a store holding its data in those files, computed without opening the store.
+    """
+    signature = []
+    for path in paths:
+        try:
+            stat = os.stat(path)
+        except FileNotFoundError:
+            signature.append(None)
+        else:
+            signature.append([stat.st_ino, stat.st_mtime_ns, stat.st_size])
+    return signature
@@ -0,0 +1,218 @@
+import json
+import os
+import threading
+from collections.abc import Container, Iterator
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import TextIO
+
+from .metrics import metrics
+from .store import IncrementalStoreProtocol, StoreJSON, dump_task, load_task, rebase_changes
+from .task import Task
+from .task_status import TaskStatus
+
+
+@dataclass
+class StoreJournal(StoreJSON, IncrementalStoreProtocol):
+    """
+    A journaled implementation of the StoreProtocol that appends one record per change to a log
+    next to the JSON snapshot instead of rewriting the whole snapshot on every mutation.
+
+    The snapshot keeps the StoreJSON format, so it stays readable by StoreJSON. The journal is a
+    line-delimited JSON file (``<snapshot>.journal``) replayed on top of the snapshot on load.
+    Once the journal grows past ``compact_threshold`` bytes it is folded back into the snapshot.
+    Writers append under the advisory lock of StoreJSON and readers hold it shared while they
+    replay the journal, so several processes can share the store.
+
+    Attributes:
+        file_path (Path): The path to the JSON snapshot file.
+        compact_threshold (int): The journal size in bytes that triggers a compaction.
+        background_compaction (bool): Whether automatic compactions run in a background thread.
+        journal_path (Path): The path to the journal file receiving new records.
+
+    Methods:
+        update_file(tasks: list[Task]) -> None: Rewrites the snapshot and discards the journal.
+        apply_changes(upserts: list[Task], deletes: list[int]) -> None: Appends one record per change to the journal.
+        commit(upserts, deletes, created=(), tasks=None) -> dict[int, int] | None: Appends changes, rebasing them if the version changed.
+        load() -> list[Task]: Loads the snapshot and replays the journal on top of it.
+        iter_tasks(status: TaskStatus | None = None) -> Iterator[Task]: Streams the snapshot with the journal applied.
+        compact(background: bool = False) -> None: Folds the journal into the snapshot.
+        wait_for_compaction() -> None: Blocks until a running background compaction finishes.
+    """
+    file_path: Path
+    compact_threshold: int = 1024 * 1024
+    background_compaction: bool = False
+    journal_path: Path = field(init=False)
+    _lock: threading.RLock = field(init=False, repr=False, default_factory=threading.RLock)
+    _compaction: threading.Thread | None = field(init=False, repr=False, default=None)
+
+    def __post_init__(self):
+        self.journal_path = self.file_path.with_name(f"{self.file_path.name}.journal")
+        super().__post_init__()
+
+    @property
+    def _rotated_path(self) -> Path:
+        return self.journal_path.with_name(f"{self.journal_path.name}.1")
+
+    def _data_paths(self) -> tuple[Path, ...]:
+        return self.file_path, self._rotated_path, self.journal_path
+
+    @metrics.measure("store.update_file")
+    def update_file(self, tasks: list[Task]) -> None:
+        with self._lock, self._locked() as lock_file:
+            version, _ = self._read_version(lock_file)
+            self._write_tasks(tasks)
+            self.journal_path.unlink(missing_ok=True)
+            self._rotated_path.unlink(missing_ok=True)
+            self._write_version(lock_file, version + 1)
+        self._version = version + 1
+
+    @metrics.measure("store.apply_changes")
+    def apply_changes(self, upserts: list[Task], deletes: list[int]) -> None:
+        if not upserts and not deletes:
+            return
+        with self._lock, self._locked() as lock_file:
+            version, consistent = self._read_version(lock_file)
+            journal_size = self._append(upserts, deletes)
+            self._write_version(lock_file, version + 1)
+        # Blind appends do not bring this instance up to date with other writers.
+        self._version = version + 1 if consistent and version == self._version else None
+        if journal_size >= self.compact_threshold:
+            self.compact(background=self.background_compaction)
+
+    @metrics.measure("store.commit")
+    def commit(
+        self,
+        upserts: list[Task],
+        deletes: list[int],
+        created: Container[int] = (),
+        tasks: list[Task] | None = None
+    ) -> dict[int, int] | None:
+        # Appending the changes is cheaper than rewriting the snapshot, so tasks is not used.
+        with self._lock, self._locked() as lock_file:
+            version, consistent = self._read_version(lock_file)
+            changed = not consistent or version != self._version
+            new_ids = {}
+            if changed:
+                existing = {task_id for task_id, task in self._replay_all().items() if task is not None}
+                upserts, deletes, new_ids = rebase_changes(
+                    upserts, deletes, created, existing, max(existing, default=0)
+                )
+            journal_size = self._append(upserts, deletes)
+            self._write_version(lock_file, version + 1)
+        self._version = version + 1
+        if journal_size >= self.compact_threshold:
+            self.compact(background=self.background_compaction)
+        return new_ids if changed else None
+
+    @metrics.measure("store.load")
+    def load(self) -> list[Task]:
+        with self._lock, self._locked(exclusive=False) as lock_file:
+            tasks = self._replay_all()
+            self._observe_locked(lock_file)
+        return [task for task in tasks.values() if task is not None]
+
+    @metrics.measure("store.iter_tasks")
+    def iter_tasks(self, status: TaskStatus | None = None) -> Iterator[Task]:
+        # The journal is bounded by compact_threshold, so only it is held in memory while the
+        # snapshot is streamed. Opening the snapshot under the lock pins the version matching
+        # the replayed journal even if a compaction replaces the file meanwhile.
+        changes = {}
+        with self._lock, self._locked(exclusive=False) as lock_file:
+            self._replay(self._rotated_path, changes)
+            self._replay(self.journal_path, changes)
+            snapshot = self.file_path.open("rb")
+            self._observe_locked(lock_file)
+        with snapshot:
+            for task in self._iter_file(snapshot):
+                if task.id in changes:
+                    task = changes.pop(task.id)
+                if task is not None and (status is None or task.status == status):
+                    yield task
+        for task in changes.values():
+            if task is not None and (status is None or task.status == status):
+                yield task
+
+    def compact(self, background: bool = False) -> None:
+        with self._lock:
+            if self._compaction is not None and self._compaction.is_alive():
+                return
+            # A leftover rotated journal (e.g. from an interrupted compaction) is folded first;
+            # the live journal keeps receiving records until the next compaction.
+            with self._locked() as lock_file:
+                if not self._rotated_path.exists():
+                    if not self.journal_path.exists():
+                        return
+                    version, consistent = self._read_version(lock_file)
+                    self.journal_path.replace(self._rotated_path)
+                    self._write_version(lock_file, version if consistent else version + 1)
+            if background:
+                self._compaction = threading.Thread(target=self._fold_rotated, name="journal-compaction")
+                self._compaction.start()
+                return
+        self._fold_rotated()
+
+    def wait_for_compaction(self) -> None:
+        compaction = self._compaction
+        if compaction is not None:
+            compaction.join()
+
+    def _fold_rotated(self) -> None:
+        # Folding runs without the lock so writers keep appending to the live journal. It is
+        # discarded if another process folded or rewrote the snapshot in the meantime.
+        inputs = self._data_signature()[:2]
+        tasks = {task.id: task for task in self._read_tasks()}
+        self._replay(self._rotated_path, tasks)
+        with self._lock, self._locked() as lock_file:
+            if self._data_signature()[:2] != inputs:
+                return
+            version, consistent = self._read_version(lock_file)
+            self._write_tasks([task for task in tasks.values() if task is not None])
+            self._rotated_path.unlink(missing_ok=True)
+            # The contents did not change, so versions read before the compaction stay valid.
+            self._write_version(lock_file, version if consistent else version + 1)
+
+    def _append(self, upserts: list[Task], deletes: list[int]) -> int:
+        with metrics.timed("store.encode"):
+            records = [{"op": "put", "task": dump_task(task)} for task in upserts]
+            records.extend({"op": "delete", "id": task_id} for task_id in deletes)
+            text = "".join(json.dumps(record) + "\n" for record in records)
+        metrics.count("store.encode", tasks=len(upserts))
+        with metrics.timed("store.write"), self.journal_path.open("a+b") as journal:
+            # A crash in the middle of an append leaves a torn last line: the records are
+            # written on a line of their own instead of being glued to it.
+            end = journal.seek(0, os.SEEK_END)
+            if end:
+                journal.seek(end - 1)
+                if journal.read(1) != b"\n":
+                    text = "\n" + text
+            journal.write(text.encode("utf-8"))
+            size = journal.tell()
+        metrics.count("store.write", bytes_written=len(text))
+        return size
+
+    def _replay_all(self) -> dict[int, Task | None]:
+        tasks = {task.id: task for task in self._read_tasks()}
+        self._replay(self._rotated_path, tasks)
+        self._replay(self.journal_path, tasks)
+        return tasks
+
+    def _observe_locked(self, lock_file: TextIO) -> None:
+        version, consistent = self._read_version(lock_file)
+        self._version = version if consistent else None
+
+    def _replay(self, path: Path, tasks: dict[int, Task | None]) -> None:
+        if not path.exists():
+            return
+        with path.open(encoding="utf-8") as journal:
+            for line in journal:
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    # Torn by a crash in the middle of an append, later appends start a new line.
+                    continue
+                if record["op"] == "put":
+                    task = load_task(record["task"])
+                    tasks[task.id] = task
+                else:
+                    tasks[record["id"]] = None
@@ -0,0 +1,378 @@
+import json
+import mmap
+import os
+import threading
+from array import array
+from bisect import bisect_left, bisect_right
+from collections.abc import Container, Iterable, Iterator
+from dataclasses import dataclass, field
+from pathlib import Path
+
+from .metrics import metrics
+from .store import QueryStoreProtocol, StoreJSON, load_task, rebase_changes
+from .task import STATUS_CODES, Task
+from .task_status import TaskStatus
+
+_DELETED = 255
+_HEADER = -1
+_MARKER = 0
+_CHUNK = 1024
+
+
+@dataclass
+class StoreNDJSON(StoreJSON, QueryStoreProtocol):
+    """
+    A line-oriented implementation of the StoreProtocol with a persisted ID -> byte offset index,
+    so a lookup or a change touches a single record instead of the whole store.
+
+    The data file holds one JSON object per line, padded with spaces to a multiple of
+    ``slot_size`` bytes. A change that still fits in its slot is patched in place; otherwise the
+    record is appended and its old slot blanked. Deleted slots are blanked too, and blank lines
+    are skipped, so the file stays valid NDJSON. Records are read through ``mmap``.
+
+    The index file (``<file>.idx``) is a snapshot of ``(id, offset, status)`` int64 triples sorted
+    by ID, followed by the triples of every later change. Each write ends with a marker carrying
+    the size and inode of the data file it describes; an index that does not match the data file
+    (after a crash, say) is rebuilt by scanning it. Once the changes outnumber the rows, data and
+    index are compacted. Only the index, 17 bytes per task, is kept in memory, so with a Tracker,
+    which pushes lookups and filters down to query stores, stores larger than memory can be used.
+
+    Writers hold the StoreJSON advisory lock exclusively and readers hold it shared, so several
+    processes can share the store; each catches up with the changes of the others from the index.
+
+    Attributes:
+        file_path (Path): The path to the NDJSON data file.
+        slot_size (int): The granularity in bytes records are padded to.
+        index_path (Path): The path to the index file.
+
+    Methods:
+        create_file() -> None: Creates empty data and index files.
+        update_file(tasks: list[Task]) -> None: Replaces every stored task with the provided list of tasks.
+        apply_changes(upserts: list[Task], deletes: list[int]) -> None: Patches, appends and blanks the changed records.
+        commit(upserts, deletes, created=(), tasks=None) -> dict[int, int] | None: Applies changes, rebasing them if the store changed.
+        load() -> list[Task]: Loads and returns every stored task.
+        get_task(task_id: int) -> Task | None: Reads a single record.
+        iter_tasks(status: TaskStatus | None = None) -> Iterator[Task]: Yields tasks in ID order, optionally filtered by status.
+        last_task_id() -> int: Returns the highest stored task ID.
+        close() -> None: Unmaps and closes the data file.
+    """
+    file_path: Path
+    slot_size: int = 32
+    index_path: Path = field(init=False)
+    _lock: threading.RLock = field(init=False, repr=False, default_factory=threading.RLock)
+    _ids: array = field(init=False, repr=False, default_factory=lambda: array("q"))
+    _offsets: array = field(init=False, repr=False, default_factory=lambda: array("q"))
+    _statuses: bytearray = field(init=False, repr=False, default_factory=bytearray)
+    _tail: int = field(init=False, repr=False, default=0)
+    _descriptor: int | None = field(init=False, repr=False, default=None)
+    _map: mmap.mmap | None = field(init=False, repr=False, default=None)
+    _data_key: tuple[int, int] | None = field(init=False, repr=False, default=None)
+    _index_key: tuple[int, int] | None = field(init=False, repr=False, default=None)
+
+    def __post_init__(self):
+        self.index_path = self.file_path.with_name(f"{self.file_path.name}.idx")
+        super().__post_init__()
+
+    def create_file(self) -> None:
+        with self._lock, self._locked():
+            self._write_snapshot([])
+
+    @metrics.measure("store.update_file")
+    def update_file(self, tasks: list[Task]) -> None:
+        latest = {task.id: task for task in tasks}
+        with self._lock, self._locked():
+            self._write_snapshot(
+                (task.id, STATUS_CODES[TaskStatus(task.status)], self._encode(task))
+                for task in sorted(latest.values(), key=lambda task: task.id)
+            )
+
+    @metrics.measure("store.apply_changes")
+    def apply_changes(self, upserts: list[Task], deletes: list[int]) -> None:
+        with self._lock, self._locked():
+            self._refresh(exclusive=True)
+            self._write_changes(upserts, deletes)
+
+    @metrics.measure("store.commit")
+    def commit(
+        self,
+        upserts: list[Task],
+        deletes: list[int],
+        created: Container[int] = (),
+        tasks: list[Task] | None = None
+    ) -> dict[int, int] | None:
+        # Rebasing only needs the resident index, so it is always done; tasks is not used. A read
+        # may have caught up with another writer already, so a remapped ID counts as a change too.
+        with self._lock, self._locked():
+            changed = self._refresh(exclusive=True)
+            existing = _LiveIds(self)
+            upserts, deletes, new_ids = rebase_changes(upserts, deletes, created, existing, self._last_id())
+            self._write_changes(upserts, deletes)
+        return new_ids if changed or new_ids else None
+
+    @metrics.measure("store.load")
+    def load(self) -> list[Task]:
+        return list(self.iter_tasks())
+
+    @metrics.measure("store.get_task")
+    def get_task(self, task_id: int) -> Task | None:
+        with self._lock, self._locked(exclusive=False):
+            self._refresh()
+            row = self._find_row(task_id)
+            if row is None or self._statuses[row] == _DELETED:
+                return None
+            return self._read(self._offsets[row])
+
+    @metrics.measure("store.iter_tasks")
+    def iter_tasks(self, status: TaskStatus | None = None) -> Iterator[Task]:
+        # Tasks are decoded a chunk at a time under the lock. The position is kept as the last
+        # ID yielded rather than as a row, so it survives the compactions of other writers.
+        code = None if status is None else STATUS_CODES[TaskStatus(status)]
+        last_id = 0
+        while True:
+            with self._lock, self._locked(exclusive=False):
+                self._refresh()
+                chunk = []
+                row = bisect_right(self._ids, last_id)
+                while row < len(self._ids) and len(chunk) < _CHUNK:
+                    if code is not None:
+                        row = self._statuses.find(code, row)
+                        if row == -1:
+                            break
+                    if self._statuses[row] != _DELETED:
+                        chunk.append(self._read(self._offsets[row]))
+                    row += 1
+            yield from chunk
+            if len(chunk) < _CHUNK:
+                return
+            last_id = chunk[-1].id
+
+    def last_task_id(self) -> int:
+        with self._lock, self._locked(exclusive=False):
+            self._refresh()
+            return self._last_id()
+
+    def close(self) -> None:
+        with self._lock:
+            self._close_data()
+
+    def _encode(self, task: Task) -> bytes:
+        return self._encode_task(task)[1].encode("ascii")
+
+    def _slot(self, record: bytes) -> bytes:
+        capacity = -(-(len(record) + 1) // self.slot_size) * self.slot_size
+        return record.ljust(capacity - 1) + b"\n"
+
+    def _slot_capacity(self, offset: int) -> int:
+        return self._map.find(b"\n", offset) - offset + 1
+
+    def _record(self, offset: int) -> bytes:
+        return self._map[offset:self._map.find(b"\n", offset)].rstrip()
+
+    def _read(self, offset: int) -> Task:
+        return load_task(json.loads(self._record(offset)))
+
+    def _find_row(self, task_id: int) -> int | None:
+        row = bisect_left(self._ids, task_id)
+        if row < len(self._ids) and self._ids[row] == task_id:
+            return row
+        return None
+
+    def _last_id(self) -> int:
+        return next((self._ids[row] for row in range(len(self._ids) - 1, -1, -1)
+                     if self._statuses[row] != _DELETED), 0)
+
+    def _place(self, task_id: int, offset: int, code: int) -> None:
+        row = bisect_left(self._ids, task_id)
+        if row == len(self._ids) or self._ids[row] != task_id:
+            # IDs are assigned in ascending order, so this is an append in practice.
+            self._ids.insert(row, task_id)
+            self._offsets.insert(row, offset)
+            self._statuses.insert(row, code)
+        elif code == _DELETED:
+            self._statuses[row] = _DELETED
+        else:
+            self._offsets[row] = offset
+            self._statuses[row] = code
+
+    def _write_changes(self, upserts: list[Task], deletes: list[int]) -> None:
+        end = self._data_key[1]
+        appended = bytearray()
+        entries = array("q")
+        blanks = []
+        for task in upserts:
+            record = self._encode(task)
+            code = STATUS_CODES[TaskStatus(task.status)]
+            row = self._find_row(task.id)
+            if row is not None and self._statuses[row] != _DELETED:
+                offset = self._offsets[row]
+                capacity = self._slot_capacity(offset)
+                if len(record) < capacity:
+                    os.pwrite(self._descriptor, record.ljust(capacity - 1) + b"\n", offset)
+                    self._statuses[row] = code
+                    entries.extend((task.id, offset, code))
+                    continue
+                blanks.append((offset, capacity))
+            offset = end + len(appended)
+            appended += self._slot(record)
+            self._place(task.id, offset, code)
+            entries.extend((task.id, offset, code))
+        for task_id in deletes:
+            row = self._find_row(task_id)
+            if row is None or self._statuses[row] == _DELETED:
+                continue
+            blanks.append((self._offsets[row], self._slot_capacity(self._offsets[row])))
+            self._statuses[row] = _DELETED
+            entries.extend((task_id, 0, _DELETED))
+        if not entries:
+            return
+        # Records first, then the index, then the blanks: a crash at any point leaves either a
+        # consistent pair of files or an index whose marker no longer matches the data file.
+        if appended:
+            os.pwrite(self._descriptor, appended, end)
+        entries.extend((_MARKER, end + len(appended), self._data_key[0]))
+        with self.index_path.open("ab") as index:
+            index.write(entries.tobytes())
+            consumed = index.tell()
+        for offset, capacity in blanks:
+            os.pwrite(self._descriptor, b" " * (capacity - 1) + b"\n", offset)
+        if appended:
+            self._open_data()
+        self._index_key = (self._index_key[0], consumed)
+        self._tail += len(entries) // 3
+        if self._tail > max(_CHUNK, len(self._ids)):
+            self._write_snapshot(
+                (self._ids[row], self._statuses[row], self._record(self._offsets[row]))
+                for row in range(len(self._ids)) if self._statuses[row] != _DELETED
+            )
+
+    def _write_snapshot(self, records: Iterable[tuple[int, int, bytes]]) -> None:
+        ids, offsets, statuses = array("q"), array("q"), bytearray()
+        data_path = self.file_path.with_name(f"{self.file_path.name}.{os.getpid()}.tmp")
+        with data_path.open("wb") as data:
+            for task_id, code, record in records:
+                ids.append(task_id)
+                offsets.append(data.tell())
+                statuses.append(code)
+                data.write(self._slot(record))
+            size = data.tell()
+            inode = os.fstat(data.fileno()).st_ino
+        entries = array("q", [0]) * (3 * len(ids))
+        # From buffers, arrays and bytearrays copy raw bytes: the codes are converted one by one.
+        entries[0::3], entries[1::3], entries[2::3] = ids, offsets, array("q", iter(statuses))
+        index_path = self.index_path.with_name(f"{self.index_path.name}.{os.getpid()}.tmp")
+        with index_path.open("wb") as index:
+            array("q", (_HEADER, len(ids), 0)).tofile(index)
+            entries.tofile(index)
+            array("q", (_MARKER, size, inode)).tofile(index)
+        os.replace(data_path, self.file_path)
+        os.replace(index_path, self.index_path)
+        self._ids, self._offsets, self._statuses, self._tail = ids, offsets, statuses, 0
+        self._open_data()
+        index_stat = self.index_path.stat()
+        self._index_key = (index_stat.st_ino, index_stat.st_size)
+
+    def _refresh(self, exclusive: bool = False) -> bool:
+        """Catches up with the files on disk, returns whether they changed since the last call."""
+        data_stat = self.file_path.stat()
+        try:
+            index_stat = self.index_path.stat()
+            index_key = (index_stat.st_ino, index_stat.st_size)
+        except FileNotFoundError:
+            index_key = None
+        if (data_stat.st_ino, data_stat.st_size) == self._data_key and index_key == self._index_key is not None:
+            return False
+        if (data_stat.st_ino, data_stat.st_size) != self._data_key:
+            self._open_data()
+        if index_key is None:
+            loaded = False
+        elif self._index_key is not None and index_key[0] == self._index_key[0] and index_key[1] > self._index_key[1]:
+            loaded = self._read_index(self._index_key[1])
+        else:
+            loaded = self._read_index(0)
+        if not loaded:
+            self._rebuild(exclusive)
+        return True
+
+    def _read_index(self, position: int) -> bool:
+        with self.index_path.open("rb") as index:
+            inode = os.fstat(index.fileno()).st_ino
+            index.seek(position)
+            raw = index.read()
+        entries = array("q")
+        entries.frombytes(raw[:len(raw) - len(raw) % 24])
+        start = 0
+        if position == 0:
+            if len(entries) < 3 or entries[0] != _HEADER:
+                return False
+            count = entries[1]
+            start = 3 + 3 * count
+            self._ids, self._offsets = entries[3:start:3], entries[4:start:3]
+            self._statuses = bytearray(iter(entries[5:start:3]))
+            self._tail = -1
+        marker, batch_start = None, start
+        for entry in range(start, len(entries), 3):
+            if entries[entry] != _MARKER:
+                continue
+            for change in range(batch_start, entry, 3):
+                self._place(entries[change], entries[change + 1], entries[change + 2])
+            self._tail += (entry - batch_start) // 3 + 1
+            marker, batch_start = entry, entry + 3
+        # Changes after the last marker were cut short by a crash.
+        if marker is None or batch_start != len(entries) or len(raw) % 24:
+            return False
+        if (entries[marker + 2], entries[marker + 1]) != self._data_key:
+            return False
+        self._index_key = (inode, position + 8 * len(entries))
+        return True
+
+    def _rebuild(self, exclusive: bool) -> None:
+        latest = {}
+        position, size = 0, self._data_key[1]
+        while position < size:
+            end = self._map.find(b"\n", position)
+            end = size if end == -1 else end
+            line = self._map[position:end]
+            if line.strip():
+                try:
+                    record = json.loads(line)
+                    latest[record["id"]] = (position, STATUS_CODES[TaskStatus(record["status"])])
+                except (ValueError, KeyError):
+                    # A record torn by a crash in the middle of an append.
+                    pass
+            position = end + 1
+        self._ids = array("q", sorted(latest))
+        self._offsets = array("q", (latest[task_id][0] for task_id in self._ids))
+        self._statuses = bytearray(latest[task_id][1] for task_id in self._ids)
+        self._index_key = None
+        if exclusive:
+            self._write_snapshot(
+                (self._ids[row], self._statuses[row], self._record(self._offsets[row]))
+                for row in range(len(self._ids))
+            )
+
+    def _open_data(self) -> None:
+        self._close_data()
+        self._descriptor = os.open(self.file_path, os.O_RDWR)
+        stat = os.fstat(self._descriptor)
+        self._data_key = (stat.st_ino, stat.st_size)
+        if stat.st_size:
+            self._map = mmap.mmap(self._descriptor, 0, access=mmap.ACCESS_READ)
+
+    def _close_data(self) -> None:
+        if self._map is not None:
+            self._map.close()
+            self._map = None
+        if self._descriptor is not None:
+            os.close(self._descriptor)
+            self._descriptor = None
+        self._data_key = None
+
+
+@dataclass
+class _LiveIds:
+    """A read-only view of the IDs of the live records of a StoreNDJSON, for rebase_changes()."""
+    store: StoreNDJSON
+
+    def __contains__(self, task_id: object) -> bool:
+        row = self.store._find_row(task_id)
+        return row is not None and self.store._statuses[row] != _DELETED
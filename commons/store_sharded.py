@@ -0,0 +1,286 @@
+import json
+import marshal
+import os
+import threading
+from collections.abc import Container, Iterable, Iterator
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from itertools import repeat
+from operator import attrgetter
+from pathlib import Path
+
+from .metrics import metrics
+from .processes import process_pool
+from .store import IncrementalStoreProtocol, StoreJSON, _from_row, rebase_changes
+from .task import Task
+from .task_status import TaskStatus
+
+PARTITIONS = ("hash", "range", "status")
+
+
+def _read_shard_rows(path: str, snapshot_cache: bool) -> bytes:
+    # Runs in a worker process. The rows are sent back marshalled: turning them into tasks takes
+    # the parent less time than unpickling Task objects would.
+    store = StoreJSON(Path(path), snapshot_cache=snapshot_cache)
+    with store.file_path.open("rb") as file:
+        return marshal.dumps(store._read_rows(file))
+
+
+@dataclass
+class StoreSharded(StoreJSON, IncrementalStoreProtocol):
+    """
+    A sharded implementation of the StoreProtocol that partitions tasks across several JSON
+    files, by a hash of their ID, by ranges of IDs or by status, so a change only rewrites the
+    shards holding the tasks it touches.
+
+    ``file_path`` holds a small JSON manifest with the partitioning and the shard keys. Each
+    shard (``<file>.shard-<key>``) is in the StoreJSON format, with its own snapshot cache, and
+    is replaced atomically. Writers take the advisory lock of StoreJSON on the whole store and
+    its version covers every shard, so ``commit()`` rebases changes like StoreJSON does.
+
+    ``load()`` decodes the shards in parallel worker processes once they add up to
+    ``parallel_threshold`` bytes and more than one CPU is available; it returns the tasks in ID
+    order. With status partitioning, ``iter_tasks(status)`` only opens the matching shard.
+
+    Attributes:
+        file_path (Path): The path to the manifest file.
+        partition (str): How tasks are assigned to shards: "hash", "range" or "status".
+        shard_count (int): The number of shards of a hash partitioning.
+        shard_size (int): The number of consecutive IDs per shard of a range partitioning.
+        max_workers (int | None): The most worker processes decoding shards, defaults to the CPU count.
+        parallel_threshold (int): The total size in bytes of the shards above which they are decoded in parallel.
+        _locations (dict[int, str] | None): The shard of every task with status partitioning, None if unknown.
+        _processes (ProcessPoolExecutor | None): The worker processes, started on the first parallel load.
+
+    Methods:
+        create_file() -> None: Writes the manifest of an empty store.
+        update_file(tasks: list[Task]) -> None: Rewrites every shard.
+        apply_changes(upserts: list[Task], deletes: list[int]) -> None: Rewrites the shards holding the changed tasks.
+        commit(upserts, deletes, created=(), tasks=None) -> dict[int, int] | None: Writes changes, rebasing them if the version changed.
+        load() -> list[Task]: Loads the tasks of every shard, in parallel when they are large.
+        iter_tasks(status: TaskStatus | None = None) -> Iterator[Task]: Streams the tasks shard by shard.
+        close() -> None: Stops the worker processes.
+    """
+    file_path: Path
+    partition: str = "hash"
+    shard_count: int = 8
+    shard_size: int = 100_000
+    max_workers: int | None = None
+    parallel_threshold: int = 8 * 1024 * 1024
+    _locations: dict[int, str] | None = field(init=False, repr=False, default=None)
+    _processes: ProcessPoolExecutor | None = field(init=False, repr=False, default=None)
+    _processes_lock: threading.Lock = field(init=False, repr=False, default_factory=threading.Lock)
+
+    def __post_init__(self):
+        if self.partition not in PARTITIONS:
+            raise ValueError(f"Unknown partitioning {self.partition!r}, expected one of {', '.join(PARTITIONS)}")
+        super().__post_init__()
+        manifest = self._read_manifest()
+        if not isinstance(manifest, dict) or "shards" not in manifest:
+            raise ValueError(f"{self.file_path} is not the manifest of a sharded store")
+        layout = {name: manifest.get(name) for name in ("partition", "shard_count", "shard_size")}
+        if layout != self._layout():
+            raise ValueError(f"{self.file_path} is sharded as {layout}, not as {self._layout()}")
+
+    def _layout(self) -> dict:
+        return {
+            "partition": self.partition,
+            "shard_count": self.shard_count if self.partition == "hash" else None,
+            "shard_size": self.shard_size if self.partition == "range" else None,
+        }
+
+    def create_file(self) -> None:
+        match self.partition:
+            case "hash":
+                keys = [str(number) for number in range(self.shard_count)]
+            case "status":
+                keys = [status.value for status in TaskStatus]
+            case _:
+                keys = []
+        for key in keys:
+            self._shard_path(key).touch()
+        self._write_manifest(keys)
+
+    def _read_manifest(self) -> dict:
+        return json.loads(self.file_path.read_text(encoding="utf-8"))
+
+    def _write_manifest(self, keys: Iterable[str]) -> None:
+        temporary_path = self.file_path.with_name(f"{self.file_path.name}.{os.getpid()}.tmp")
+        temporary_path.write_text(json.dumps({**self._layout(), "shards": sorted(keys)}), encoding="utf-8")
+        os.replace(temporary_path, self.file_path)
+
+    def _shard_keys(self) -> list[str]:
+        return self._read_manifest()["shards"]
+
+    def _shard_path(self, key: str) -> Path:
+        return self.file_path.with_name(f"{self.file_path.name}.shard-{key}")
+
+    def _shard(self, key: str) -> StoreJSON:
+        return StoreJSON(self._shard_path(key), self.snapshot_cache)
+
+    def _data_paths(self) -> tuple[Path, ...]:
+        return self.file_path, *(self._shard_path(key) for key in self._shard_keys())
+
+    def _key(self, task: Task) -> str:
+        if self.partition == "status":
+            return task.status.value
+        return self._id_key(task.id)
+
+    def _id_key(self, task_id: int) -> str:
+        if self.partition == "hash":
+            return str(task_id % self.shard_count)
+        return str(max(task_id - 1, 0) // self.shard_size)
+
+    @metrics.measure("store.update_file")
+    def update_file(self, tasks: list[Task]) -> None:
+        groups = self._group(tasks)
+        with self._locked() as lock_file:
+            version, _ = self._read_version(lock_file)
+            keys = set(groups) | (set() if self.partition == "range" else set(self._shard_keys()))
+            for key in keys:
+                self._shard(key)._write_tasks(groups.get(key, []))
+            for key in set(self._shard_keys()) - keys:
+                self._remove_shard(key)
+            self._write_manifest(keys)
+            self._write_version(lock_file, version + 1)
+        self._version = version + 1
+        if self.partition == "status":
+            self._locations = {task.id: key for key, group in groups.items() for task in group}
+
+    @metrics.measure("store.apply_changes")
+    def apply_changes(self, upserts: list[Task], deletes: list[int]) -> None:
+        if not upserts and not deletes:
+            return
+        with self._locked() as lock_file:
+            version, consistent = self._read_version(lock_file)
+            current = consistent and version == self._version
+            if not current and self.partition == "status":
+                # Where tasks are was changed by another writer.
+                self._locations = self._read_locations()
+            self._write_changes(upserts, deletes)
+            self._write_version(lock_file, version + 1)
+        # Writing the changes alone does not bring this instance up to date with other writers.
+        self._version = version + 1 if current else None
+
+    @metrics.measure("store.commit")
+    def commit(
+        self,
+        upserts: list[Task],
+        deletes: list[int],
+        created: Container[int] = (),
+        tasks: list[Task] | None = None
+    ) -> dict[int, int] | None:
+        # Rewriting the touched shards is cheaper than rewriting all of them, so tasks is not used.
+        with self._locked() as lock_file:
+            version, consistent = self._read_version(lock_file)
+            changed = not consistent or version != self._version
+            new_ids = {}
+            if changed:
+                locations = self._read_locations()
+                if self.partition == "status":
+                    self._locations = locations
+                upserts, deletes, new_ids = rebase_changes(
+                    upserts, deletes, created, locations, max(locations, default=0)
+                )
+            self._write_changes(upserts, deletes)
+            self._write_version(lock_file, version + 1)
+        self._version = version + 1
+        return new_ids if changed else None
+
+    @metrics.measure("store.load")
+    def load(self) -> list[Task]:
+        # Holding the lock shared keeps every shard at the version observed.
+        with self._locked(exclusive=False) as lock_file:
+            shards = self._read_shards(self._shard_keys())
+            version, consistent = self._read_version(lock_file)
+        self._version = version if consistent else None
+        if self.partition == "status":
+            self._locations = {task.id: key for key, tasks in shards.items() for task in tasks}
+        # Shards hold ascending runs of IDs, which the sort merges.
+        return sorted((task for tasks in shards.values() for task in tasks), key=attrgetter("id"))
+
+    @metrics.measure("store.iter_tasks")
+    def iter_tasks(self, status: TaskStatus | None = None) -> Iterator[Task]:
+        with self._locked(exclusive=False) as lock_file:
+            keys = self._shard_keys()
+            if self.partition == "status" and status is not None:
+                keys = [TaskStatus(status).value]
+            # Opened under the lock, the shards stay at the version observed while they are read.
+            files = [self._shard_path(key).open("rb") for key in keys]
+            version, consistent = self._read_version(lock_file)
+        self._version = version if consistent else None
+        try:
+            for key, file in zip(keys, files):
+                yield from self._shard(key)._iter_file(file, status)
+        finally:
+            for file in files:
+                file.close()
+
+    def close(self) -> None:
+        with self._processes_lock:
+            processes, self._processes = self._processes, None
+        if processes is not None:
+            processes.shutdown()
+
+    def _group(self, tasks: Iterable[Task]) -> dict[str, list[Task]]:
+        groups = {}
+        for task in tasks:
+            groups.setdefault(self._key(task), []).append(task)
+        return groups
+
+    def _read_locations(self) -> dict[int, str]:
+        return {task.id: key for key, tasks in self._read_shards(self._shard_keys()).items() for task in tasks}
+
+    def _read_shards(self, keys: list[str]) -> dict[str, list[Task]]:
+        paths = [str(self._shard_path(key)) for key in keys]
+        size = sum(os.path.getsize(path) for path in paths)
+        workers = min(len(keys), self.max_workers or os.cpu_count() or 1)
+        if workers < 2 or size < self.parallel_threshold:
+            return {key: self._shard(key)._read_tasks() for key in keys}
+        with metrics.timed("store.decode_parallel"):
+            shards = list(self._pool(workers).map(_read_shard_rows, paths, repeat(self.snapshot_cache)))
+        metrics.count("store.decode_parallel", bytes_read=size, shards=len(keys))
+        with metrics.timed("store.build"):
+            tasks = {key: [_from_row(row) for row in marshal.loads(rows)] for key, rows in zip(keys, shards)}
+        metrics.count("store.build", tasks=sum(map(len, tasks.values())))
+        return tasks
+
+    def _pool(self, workers: int) -> ProcessPoolExecutor:
+        with self._processes_lock:
+            if self._processes is None:
+                self._processes = process_pool(workers)
+            return self._processes
+
+    def _write_changes(self, upserts: list[Task], deletes: list[int]) -> None:
+        # The shards each change is removed from, and the ones it is written to.
+        removals, additions = {}, self._group(upserts)
+        for task_id in [*deletes, *(task.id for task in upserts)]:
+            key = self._location(task_id)
+            if key is not None:
+                removals.setdefault(key, set()).add(task_id)
+        keys = set(self._shard_keys())
+        for key in (removals.keys() & keys) | additions.keys():
+            shard = self._shard(key)
+            tasks = {task.id: task for task in shard._read_tasks()} if key in keys else {}
+            for task_id in removals.get(key, ()):
+                tasks.pop(task_id, None)
+            tasks.update((task.id, task) for task in additions.get(key, ()))
+            shard._write_tasks(sorted(tasks.values(), key=attrgetter("id")))
+        if not additions.keys() <= keys:
+            self._write_manifest(additions.keys() | keys)
+        if self._locations is not None:
+            for task_id in deletes:
+                self._locations.pop(task_id, None)
+            self._locations.update((task.id, key) for key, tasks in additions.items() for task in tasks)
+
+    def _location(self, task_id: int) -> str | None:
+        if self.partition != "status":
+            return self._id_key(task_id)
+        if self._locations is None:
+            self._locations = self._read_locations()
+        return self._locations.get(task_id)
+
+    def _remove_shard(self, key: str) -> None:
+        path = self._shard_path(key)
+        path.unlink(missing_ok=True)
+        path.with_name(f"{path.name}.cache").unlink(missing_ok=True)
@@ -0,0 +1,196 @@
+import datetime
+import json
+import sqlite3
+from collections.abc import Container, Iterator
+from dataclasses import dataclass, field
+from pathlib import Path
+
+from .metrics import metrics
+from .store import (
+    AsyncStoreProtocol,
+    QueryStoreProtocol,
+    ThreadedStoreMixin,
+    VersionedStoreProtocol,
+    rebase_changes,
+)
+from .task import Task
+from .task_status import TaskStatus
+
+_COLUMNS = "id, description, status, created_at, updated_at, tags, priority, due_at, done_at"
+# The columns added since the table was first created, with their definitions.
+_ADDED_COLUMNS = {
+    "tags": "TEXT NOT NULL DEFAULT '[]'",
+    "priority": "INTEGER",
+    "due_at": "TEXT",
+    "done_at": "TEXT",
+}
+
+
+@dataclass
+class StoreSQLite(ThreadedStoreMixin, QueryStoreProtocol, VersionedStoreProtocol, AsyncStoreProtocol):
+    """
+    A SQLite-based implementation of the StoreProtocol that answers lookups and filters with
+    indexed queries, so a single-task change is one indexed statement and opening the store
+    does not depend on how many tasks it holds.
+
+    SQLite locks the database itself. ``commit()`` uses ``PRAGMA data_version``, which changes
+    whenever another connection commits, as its version counter. Tags are stored as a JSON
+    array. Databases created before a column existed get it when opened.
+
+    Attributes:
+        file_path (Path): The path to the SQLite database file where tasks are stored.
+        connection (sqlite3.Connection): The open connection to the database.
+        _version (int): The data version of the database after this connection last wrote it.
+
+    Methods:
+        __post_init__(): Opens the database and creates the schema if it doesn't exist.
+        create_file() -> None: Creates the tasks table and its indexes.
+        update_file(tasks: list[Task]) -> None: Replaces every stored task with the provided list of tasks.
+        apply_changes(upserts: list[Task], deletes: list[int]) -> None: Upserts and deletes tasks in one transaction.
+        commit(upserts, deletes, created=(), tasks=None) -> dict[int, int] | None: Applies changes, rebasing them if the version changed.
+        load() -> list[Task]: Loads and returns every stored task.
+        get_task(task_id: int) -> Task | None: Returns a task by its ID.
+        iter_tasks(status: TaskStatus | None = None) -> Iterator[Task]: Yields tasks, optionally filtered by status.
+        last_task_id() -> int: Returns the highest stored task ID.
+        close() -> None: Closes the database connection.
+        aload(), aupdate_file(tasks), aapply_changes(upserts, deletes): Awaitable versions run on a worker thread.
+    """
+    file_path: Path
+    connection: sqlite3.Connection = field(init=False, repr=False)
+    _version: int = field(init=False, repr=False, default=0)
+
+    def __post_init__(self):
+        # Writes may run on the ThreadedStoreMixin worker thread.
+        self.connection = sqlite3.connect(self.file_path, check_same_thread=False)
+        self.create_file()
+        self._version = self._data_version()
+
+    def create_file(self) -> None:
+        with self.connection:
+            self.connection.executescript(
+                """
+                CREATE TABLE IF NOT EXISTS tasks (
+                    id INTEGER PRIMARY KEY,
+                    description TEXT NOT NULL,
+                    status TEXT NOT NULL,
+                    created_at TEXT NOT NULL,
+                    updated_at TEXT NOT NULL,
+                    tags TEXT NOT NULL DEFAULT '[]',
+                    priority INTEGER,
+                    due_at TEXT,
+                    done_at TEXT
+                );
+                CREATE INDEX IF NOT EXISTS tasks_status ON tasks (status, id);
+                CREATE INDEX IF NOT EXISTS tasks_updated_at ON tasks (updated_at);
+                """
+            )
+            columns = {name for _, name, *_ in self.connection.execute("PRAGMA table_info(tasks)")}
+            for name, definition in _ADDED_COLUMNS.items():
+                if name not in columns:
+                    self.connection.execute(f"ALTER TABLE tasks ADD COLUMN {name} {definition}")
+
+    @metrics.measure("store.update_file")
+    def update_file(self, tasks: list[Task]) -> None:
+        with self.connection:
+            self.connection.execute("DELETE FROM tasks")
+            self.connection.executemany(
+                f"INSERT INTO tasks ({_COLUMNS}) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                map(self._dump_task, tasks)
+            )
+
+    @metrics.measure("store.apply_changes")
+    def apply_changes(self, upserts: list[Task], deletes: list[int]) -> None:
+        with self.connection:
+            self._write_changes(upserts, deletes)
+
+    @metrics.measure("store.commit")
+    def commit(
+        self,
+        upserts: list[Task],
+        deletes: list[int],
+        created: Container[int] = (),
+        tasks: list[Task] | None = None
+    ) -> dict[int, int] | None:
+        # The tasks are never needed, every change is a single indexed statement anyway.
+        with self.connection:
+            with metrics.timed("store.lock_wait"):
+                self.connection.execute("BEGIN IMMEDIATE")
+            version = self._data_version()
+            changed = version != self._version
+            new_ids = {}
+            if changed:
+                task_ids = json.dumps([task.id for task in upserts] + list(deletes))
+                existing = {
+                    task_id for task_id, in self.connection.execute(
+                        "SELECT id FROM tasks WHERE id IN (SELECT value FROM json_each(?))", (task_ids,)
+                    )
+                }
+                upserts, deletes, new_ids = rebase_changes(upserts, deletes, created, existing, self.last_task_id())
+            self._write_changes(upserts, deletes)
+        self._version = version
+        return new_ids if changed else None
+
+    @metrics.measure("store.load")
+    def load(self) -> list[Task]:
+        return list(self.iter_tasks())
+
+    @metrics.measure("store.get_task")
+    def get_task(self, task_id: int) -> Task | None:
+        row = self.connection.execute(f"SELECT {_COLUMNS} FROM tasks WHERE id = ?", (task_id,)).fetchone()
+        return self._load_task(row) if row else None
+
+    @metrics.measure("store.iter_tasks")
+    def iter_tasks(self, status: TaskStatus | None = None) -> Iterator[Task]:
+        if status is None:
+            cursor = self.connection.execute(f"SELECT {_COLUMNS} FROM tasks ORDER BY id")
+        else:
+            cursor = self.connection.execute(
+                f"SELECT {_COLUMNS} FROM tasks WHERE status = ? ORDER BY id", (TaskStatus(status).value,)
+            )
+        return map(self._load_task, cursor)
+
+    def last_task_id(self) -> int:
+        return self.connection.execute("SELECT COALESCE(MAX(id), 0) FROM tasks").fetchone()[0]
+
+    def close(self) -> None:
+        self.connection.close()
+
+    def _data_version(self) -> int:
+        return self.connection.execute("PRAGMA data_version").fetchone()[0]
+
+    def _write_changes(self, upserts: list[Task], deletes: list[int]) -> None:
+        self.connection.executemany(
+            f"INSERT INTO tasks ({_COLUMNS}) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?) "
+            "ON CONFLICT (id) DO UPDATE SET description = excluded.description, status = excluded.status, "
+            "created_at = excluded.created_at, updated_at = excluded.updated_at, tags = excluded.tags, "
+            "priority = excluded.priority, due_at = excluded.due_at, done_at = excluded.done_at",
+            map(self._dump_task, upserts)
+        )
+        self.connection.executemany("DELETE FROM tasks WHERE id = ?", ((task_id,) for task_id in deletes))
+
+    def _dump_task(self, task: Task) -> tuple:
+        return (
+            task.id,
+            task.description,
+            task.status.value,
+            task.created_at.isoformat(timespec="microseconds"),
+            task.updated_at.isoformat(timespec="microseconds"),
+            json.dumps(task.tags),
+            task.priority,
+            None if task.due_at is None else task.due_at.isoformat(timespec="microseconds"),
+            None if task.done_at is None else task.done_at.isoformat(timespec="microseconds"),
+        )
+
+    def _load_task(self, row: tuple) -> Task:
+        task_id, description, status, created_at, updated_at, tags, priority, due_at, done_at = row
+        return Task(
+            id=task_id,
+            description=description,
+            status=TaskStatus(status),
+            created_at=datetime.datetime.fromisoformat(created_at),
+            updated_at=datetime.datetime.fromisoformat(updated_at),
+            tags=tuple(json.loads(tags)) if tags != "[]" else (),
+            priority=priority,
+            due_at=None if due_at is None else datetime.datetime.fromisoformat(due_at),
+            done_at=None if done_at is None else datetime.datetime.fromisoformat(done_at),
+        )
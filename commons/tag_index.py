@@ -0,0 +1,206 @@
+import heapq
+from array import array
+from bisect import bisect_left
+from collections.abc import Iterable
+from dataclasses import InitVar, dataclass, field
+from functools import reduce
+from operator import or_
+from pathlib import Path
+
+from .saved_file import load_marshalled, save_marshalled
+from .task import Task
+from .task_status import TaskStatus
+
+# The bitmaps of a saved index are saved as little-endian bytes.
+_FORMAT = 1
+# The positions of the set bits of every byte value.
+_BITS = [tuple(bit for bit in range(8) if byte >> bit & 1) for byte in range(256)]
+
+
+def _bitmap(ordinals: Iterable[int], size: int) -> int:
+    bits = bytearray((size + 7) // 8)
+    for ordinal in ordinals:
+        bits[ordinal >> 3] |= 1 << (ordinal & 7)
+    return int.from_bytes(bits, "little")
+
+
+def _set_bits(bitmap: int) -> list[int]:
+    # Scanned 64 bits at a time, skipping empty words; dense words are read byte by byte.
+    data = bitmap.to_bytes(-(-bitmap.bit_length() // 64) * 8, "little")
+    positions = []
+    append, extend = positions.append, positions.extend
+    for index, word in enumerate(memoryview(data).cast("Q")):
+        if not word:
+            continue
+        if word.bit_count() > 8:
+            for offset in range(index << 3, (index + 1) << 3):
+                base = offset << 3
+                extend([base + bit for bit in _BITS[data[offset]]])
+            continue
+        base = index << 6
+        while word:
+            low = word & -word
+            append(base + low.bit_length() - 1)
+            word ^= low
+    return positions
+
+
+@dataclass(frozen=True)
+class TagFilter:
+    """
+    The tags the tasks of a listing must have.
+
+    Attributes:
+        tags (tuple[str, ...]): The tags a task must all have.
+        any_tags (tuple[str, ...]): The tags a task must have at least one of, if any.
+        exclude_tags (tuple[str, ...]): The tags a task must have none of.
+
+    Methods:
+        matches(tags: Iterable[str]) -> bool: Tells whether the tags of a task pass the filter.
+    """
+    tags: tuple[str, ...] = ()
+    any_tags: tuple[str, ...] = ()
+    exclude_tags: tuple[str, ...] = ()
+
+    def __bool__(self) -> bool:
+        return bool(self.tags or self.any_tags or self.exclude_tags)
+
+    def matches(self, tags: Iterable[str]) -> bool:
+        tags = set(tags)
+        return (
+            tags.issuperset(self.tags)
+            and (not self.any_tags or not tags.isdisjoint(self.any_tags))
+            and tags.isdisjoint(self.exclude_tags)
+        )
+
+
+@dataclass
+class TagIndex:
+    """
+    Bitmaps of the tasks with each status and with each tag, so filters combining them with
+    AND, OR and NOT are answered by bitwise operations instead of by looking at every task.
+
+    Every indexed task has a dense ordinal, the position of its bit in every bitmap, and the
+    ordinals of deleted tasks are given to the next tasks indexed, so the bitmaps stay about as
+    long as the number of tasks. Ordinals are found by binary search over the IDs while those are
+    in ascending order, as the Tracker assigns them; an ID -> ordinal dict is only built once
+    deleted tasks and reused ordinals make a search miss. The bitmaps are Python ints: a filter costs O(N / 64) machine
+    words per bitmap it combines, plus O(m) for the m tasks it selects. Changing the status or
+    the tags of a task copies the bitmaps concerned, also O(N / 64); other changes cost nothing.
+
+    Attributes:
+        tasks (Iterable[Task]): The tasks to index initially.
+        signature (list | None): The signature of the store contents the index reflects, None if unknown.
+        _ids (array): The ID of the task with each ordinal, 0 for a free ordinal.
+        _free (list[int]): The free ordinals, a heap.
+        _ordinals (dict[int, int] | None): The ordinal of each task ID, None until a binary search missed.
+        _statuses (dict[TaskStatus, int]): The bitmap of the tasks with each status.
+        _tags (dict[str, int]): The bitmap of the tasks with each tag, for the tags of at least one task.
+
+    Methods:
+        apply_change(before: Task | None, after: Task | None) -> None: Updates the bitmaps for a created, updated or deleted task.
+        select(status: TaskStatus | None = None, tag_filter: TagFilter = TagFilter()) -> list[int]: Returns the IDs of the matching tasks, in no particular order.
+        save(path: Path) -> None: Atomically writes the index to a file.
+        load(path: Path, signature: list) -> TagIndex | None: Reads an index saved for the given signature.
+    """
+    tasks: InitVar[Iterable[Task]] = ()
+    signature: list | None = None
+    _ids: array = field(init=False, repr=False, default_factory=lambda: array("q"))
+    _free: list[int] = field(init=False, repr=False, default_factory=list)
+    _ordinals: dict[int, int] | None = field(init=False, repr=False, default=None)
+    _statuses: dict[TaskStatus, int] = field(init=False, repr=False, default_factory=lambda: dict.fromkeys(TaskStatus, 0))
+    _tags: dict[str, int] = field(init=False, repr=False, default_factory=dict)
+
+    def __post_init__(self, tasks: Iterable[Task]):
+        # Built in bulk: setting the bits one change at a time would copy the bitmaps every time.
+        statuses, tags = {status: [] for status in TaskStatus}, {}
+        for ordinal, task in enumerate(tasks):
+            self._ids.append(task.id)
+            statuses[task.status].append(ordinal)
+            for tag in task.tags:
+                tags.setdefault(tag, []).append(ordinal)
+        size = len(self._ids)
+        self._statuses = {status: _bitmap(ordinals, size) for status, ordinals in statuses.items()}
+        self._tags = {tag: _bitmap(ordinals, size) for tag, ordinals in tags.items()}
+
+    def apply_change(self, before: Task | None, after: Task | None) -> None:
+        if before is not None and after is not None and before.status == after.status and before.tags == after.tags:
+            return
+        if before is None:
+            ordinal = heapq.heappop(self._free) if self._free else len(self._ids)
+            if ordinal == len(self._ids):
+                self._ids.append(after.id)
+            else:
+                self._ids[ordinal] = after.id
+            if self._ordinals is not None:
+                self._ordinals[after.id] = ordinal
+        else:
+            ordinal = self._ordinal(before.id)
+            bit = 1 << ordinal
+            # The bit is known to be set, so XOR clears it.
+            self._statuses[before.status] ^= bit
+            for tag in before.tags:
+                bitmap = self._tags[tag] ^ bit
+                if bitmap:
+                    self._tags[tag] = bitmap
+                else:
+                    del self._tags[tag]
+        if after is None:
+            self._ids[ordinal] = 0
+            if self._ordinals is not None:
+                del self._ordinals[before.id]
+            heapq.heappush(self._free, ordinal)
+            return
+        bit = 1 << ordinal
+        self._statuses[after.status] |= bit
+        for tag in after.tags:
+            self._tags[tag] = self._tags.get(tag, 0) | bit
+
+    def select(self, status: TaskStatus | None = None, tag_filter: TagFilter = TagFilter()) -> list[int]:
+        if status is not None:
+            bitmap = self._statuses[TaskStatus(status)]
+        else:
+            bitmap = reduce(or_, self._statuses.values())
+        for tag in tag_filter.tags:
+            bitmap &= self._tags.get(tag, 0)
+        if tag_filter.any_tags:
+            bitmap &= reduce(or_, (self._tags.get(tag, 0) for tag in tag_filter.any_tags))
+        for tag in tag_filter.exclude_tags:
+            bitmap &= ~self._tags.get(tag, 0)
+        ids = self._ids
+        return [ids[ordinal] for ordinal in _set_bits(bitmap)]
+
+    def save(self, path: Path) -> None:
+        save_marshalled(path, _FORMAT, self.signature, (
+            self._ids.tobytes(),
+            self._free,
+            {status.value: self._pack(bitmap) for status, bitmap in self._statuses.items()},
+            {tag: self._pack(bitmap) for tag, bitmap in self._tags.items()},
+        ))
+
+    @classmethod
+    def load(cls, path: Path, signature: list) -> "TagIndex | None":
+        saved = load_marshalled(path, _FORMAT, signature, 4)
+        if saved is None:
+            return None
+        ids, free, statuses, tags = saved
+        index = cls(signature=signature)
+        index._ids.frombytes(ids)
+        index._free = free
+        index._statuses.update((TaskStatus(status), int.from_bytes(bitmap, "little")) for status, bitmap in statuses.items())
+        index._tags = {tag: int.from_bytes(bitmap, "little") for tag, bitmap in tags.items()}
+        return index
+
+    def _ordinal(self, task_id: int) -> int:
+        if self._ordinals is None:
+            ordinal = bisect_left(self._ids, task_id)
+            if ordinal < len(self._ids) and self._ids[ordinal] == task_id:
+                return ordinal
+            self._ordinals = self._map_ordinals()
+        return self._ordinals[task_id]
+
+    def _map_ordinals(self) -> dict[int, int]:
+        return {task_id: ordinal for ordinal, task_id in enumerate(self._ids) if task_id}
+
+    def _pack(self, bitmap: int) -> bytes:
+        return bitmap.to_bytes((bitmap.bit_length() + 7) // 8, "little")
@@ -1,8 +1,32 @@
 import datetime
+from collections.abc import Iterable
 from dataclasses import dataclass, field
 
 from .task_status import TaskStatus
 
+EPOCH = datetime.datetime(1970, 1, 1)
+STATUSES = tuple(TaskStatus)
+STATUS_CODES = {status: code for code, status in enumerate(STATUSES)}
+
+
+def to_epoch_us(moment: datetime.datetime) -> int:
+    """Converts a naive datetime into integer microseconds since the (naive) Unix epoch, losslessly."""
+    return (moment - EPOCH) // datetime.timedelta(microseconds=1)
+
+
+def from_epoch_us(microseconds: int) -> datetime.datetime:
+    """Converts integer microseconds since the (naive) Unix epoch back into a naive datetime."""
+    return EPOCH + datetime.timedelta(microseconds=microseconds)
+
+
+def normalize_tags(tags: Iterable[str]) -> tuple[str, ...]:
+    """Returns the distinct tags sorted, raising ValueError for an empty tag or one containing whitespace."""
+    tags = set(tags)
+    for tag in tags:
+        if not tag or any(character.isspace() for character in tag):
+            raise ValueError(f"Invalid tag {tag!r}")
+    return tuple(sorted(tags))
+
 
 @dataclass
 class Task:
@@ -15,6 +39,10 @@ class Task:
         status (TaskStatus): The current status of the task, represented by a TaskStatus enum.
         created_at (datetime.datetime): The timestamp when the task was created, defaults to the current time.
         updated_at (datetime.datetime): The timestamp when the task was last updated, defaults to the current time.
+        tags (tuple[str, ...]): The tags of the task, sorted, defaults to none.
+        priority (int | None): The priority of the task, higher is more urgent, defaults to none.
+        due_at (datetime.datetime | None): The time the task is due, defaults to none.
+        done_at (datetime.datetime | None): The time the task was last marked done, none while it is not done.
 
     Methods:
         __str__(): Returns a string representation of the task with its ID, description, and status.
@@ -25,15 +53,24 @@ class Task:
     status: TaskStatus
     created_at: datetime.datetime = field(default_factory=datetime.datetime.now)
     updated_at: datetime.datetime = field(default_factory=datetime.datetime.now)
+    tags: tuple[str, ...] = ()
+    priority: int | None = None
+    due_at: datetime.datetime | None = None
+    done_at: datetime.datetime | None = None
 
     def __str__(self):
         return f"Task ID: {self.id}\nDescription: {self.description}\nStatus: {self.status.value}\n\n"
 
     def display_details(self):
+        tags = f"Tags: {', '.join(self.tags)}\n" if self.tags else ""
+        priority = f"Priority: {self.priority}\n" if self.priority is not None else ""
+        due_at = f"Due at: {self.due_at}\n" if self.due_at is not None else ""
+        done_at = f"Done at: {self.done_at}\n" if self.done_at is not None else ""
         return f"""
 Task ID: {self.id}
 Description: {self.description}
 Status: {self.status.value}
-Created at: {self.created_at}
+{tags}{priority}{due_at}Created at: {self.created_at}
 Updated at: {self.updated_at}
-"""
+{done_at}"""
+
@@ -0,0 +1,59 @@
+from collections.abc import Iterable, Iterator
+from dataclasses import InitVar, dataclass, field
+
+from .task import Task
+from .task_status import TaskStatus
+
+
+@dataclass
+class TaskIndex:
+    """
+    An in-memory index of tasks by ID with per-status membership, so lookups, deletes and status
+    filters cost O(1) or O(result) instead of a scan over every task.
+
+    Both mappings are insertion ordered dicts, so iteration follows the order in which tasks
+    were added (or, for a status, the order in which they entered it).
+
+    Attributes:
+        tasks (Iterable[Task]): The tasks to index initially.
+
+    Methods:
+        get_task(task_id: int) -> Task | None: Returns the task with the given ID, if any.
+        iter_tasks(status: TaskStatus | None = None) -> Iterator[Task]: Yields tasks, optionally filtered by status.
+        count_tasks(status: TaskStatus | None = None) -> int: Counts tasks, optionally filtered by status.
+        last_task_id() -> int: Returns the highest indexed task ID, or 0 if empty.
+        apply_change(before: Task | None, after: Task | None) -> None: Updates the index for a created, updated or deleted task.
+    """
+    tasks: InitVar[Iterable[Task]] = ()
+    _by_id: dict[int, Task] = field(init=False, repr=False, default_factory=dict)
+    _by_status: dict[TaskStatus, dict[int, Task]] = field(init=False, repr=False)
+
+    def __post_init__(self, tasks: Iterable[Task]):
+        self._by_status = {status: {} for status in TaskStatus}
+        for task in tasks:
+            self.apply_change(None, task)
+
+    def get_task(self, task_id: int) -> Task | None:
+        return self._by_id.get(task_id)
+
+    def iter_tasks(self, status: TaskStatus | None = None) -> Iterator[Task]:
+        if status is None:
+            return iter(self._by_id.values())
+        return iter(self._by_status[TaskStatus(status)].values())
+
+    def count_tasks(self, status: TaskStatus | None = None) -> int:
+        if status is None:
+            return len(self._by_id)
+        return len(self._by_status[TaskStatus(status)])
+
+    def last_task_id(self) -> int:
+        return max(self._by_id, default=0)
+
+    def apply_change(self, before: Task | None, after: Task | None) -> None:
+        if before is not None and (after is None or before.status != after.status):
+            del self._by_status[before.status][before.id]
+        if after is None:
+            del self._by_id[before.id]
+            return
+        self._by_id[after.id] = after
+        self._by_status[after.status][after.id] = after
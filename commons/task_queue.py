@@ -0,0 +1,125 @@
+import datetime
+import heapq
+from collections.abc import Callable, Iterable
+from dataclasses import InitVar, dataclass, field
+
+from .task import Task
+from .task_status import TaskStatus
+
+_NEVER = datetime.datetime.max
+
+
+def urgency(task: Task) -> tuple:
+    """Returns the sort key of an open task by urgency: highest priority, then soonest due, then lowest ID."""
+    return (-(task.priority or 0), task.due_at or _NEVER, task.id)
+
+
+def is_open(task: Task) -> bool:
+    """Tells whether a task is still to be worked on, that is not done."""
+    return task.status != TaskStatus.DONE
+
+
+@dataclass
+class TaskQueue:
+    """
+    Heaps of the open tasks, by urgency and by due time, answering what to work on next and what
+    is overdue without sorting every task.
+
+    Open tasks are the ones not done. They are ranked by priority, highest first and no priority
+    counting as 0, then by due time, soonest first and undated last, then by ID.
+
+    Both heaps are invalidated lazily: a change pushes the new entry of the task and leaves the
+    old one in place, to be skipped wherever it is met since it no longer matches the entry
+    recorded for the task. Skipped entries reaching the top are dropped, and a heap is rebuilt
+    once it holds twice as many entries as open tasks. Queries walk the heap from the root
+    without popping, so the first k tasks cost O(k log k) plus the stale entries met, and a
+    change costs O(log N).
+
+    Attributes:
+        tasks (Iterable[Task]): The tasks to queue initially.
+        _urgent (list[tuple]): The heap of urgency keys, ending with the task ID.
+        _due (list[tuple]): The heap of (due_at, ID) entries of the open tasks with a due time.
+        _keys (dict[int, tuple]): The urgency key of every open task.
+        _due_at (dict[int, tuple]): The due entry of every open task with a due time.
+
+    Methods:
+        apply_change(before: Task | None, after: Task | None) -> None: Updates the heaps for a created, updated or deleted task.
+        next(count: int) -> list[int]: Returns the IDs of the most urgent open tasks, most urgent first.
+        overdue(now: datetime.datetime, limit: int | None = None) -> list[int]: Returns the IDs of the open tasks due before now, longest overdue first.
+    """
+    tasks: InitVar[Iterable[Task]] = ()
+    _urgent: list[tuple] = field(init=False, repr=False, default_factory=list)
+    _due: list[tuple] = field(init=False, repr=False, default_factory=list)
+    _keys: dict[int, tuple] = field(init=False, repr=False, default_factory=dict)
+    _due_at: dict[int, tuple] = field(init=False, repr=False, default_factory=dict)
+
+    def __post_init__(self, tasks: Iterable[Task]):
+        for task in filter(is_open, tasks):
+            self._keys[task.id] = urgency(task)
+            if task.due_at is not None:
+                self._due_at[task.id] = (task.due_at, task.id)
+        self._urgent, self._due = list(self._keys.values()), list(self._due_at.values())
+        heapq.heapify(self._urgent)
+        heapq.heapify(self._due)
+
+    def apply_change(self, before: Task | None, after: Task | None) -> None:
+        task_id = after.id if before is None else before.id
+        if after is None or not is_open(after):
+            # Their entries go stale.
+            self._keys.pop(task_id, None)
+            self._due_at.pop(task_id, None)
+            self._compact(self._urgent, self._keys)
+            self._compact(self._due, self._due_at)
+            return
+        key = urgency(after)
+        if self._keys.get(task_id) != key:
+            self._keys[task_id] = key
+            self._push(self._urgent, self._keys, key)
+        entry = None if after.due_at is None else (after.due_at, task_id)
+        if entry is None:
+            self._due_at.pop(task_id, None)
+        elif self._due_at.get(task_id) != entry:
+            self._due_at[task_id] = entry
+            self._push(self._due, self._due_at, entry)
+
+    def next(self, count: int) -> list[int]:
+        return [key[-1] for key in self._smallest(self._urgent, self._keys, count)]
+
+    def overdue(self, now: datetime.datetime, limit: int | None = None) -> list[int]:
+        entries = self._smallest(self._due, self._due_at, limit, lambda entry: entry[0] < now)
+        return [entry[-1] for entry in entries]
+
+    def _push(self, heap: list[tuple], current: dict[int, tuple], entry: tuple) -> None:
+        heapq.heappush(heap, entry)
+        self._compact(heap, current)
+
+    def _compact(self, heap: list[tuple], current: dict[int, tuple]) -> None:
+        if len(heap) > 2 * len(current) + 64:
+            heap[:] = current.values()
+            heapq.heapify(heap)
+
+    def _smallest(
+        self,
+        heap: list[tuple],
+        current: dict[int, tuple],
+        count: int | None,
+        wanted: Callable[[tuple], bool] | None = None
+    ) -> list[tuple]:
+        while heap and current.get(heap[0][-1]) != heap[0]:
+            heapq.heappop(heap)
+        # A heap of the positions still to visit, by their entry: the children of an entry are
+        # never smaller than it, so entries come off in order.
+        frontier = [(heap[0], 0)] if heap else []
+        entries, seen = [], set()
+        while frontier and (count is None or len(entries) < count):
+            entry, position = heapq.heappop(frontier)
+            if wanted is not None and not wanted(entry):
+                break
+            # An entry pushed again after its task changed back to it is met twice.
+            if current.get(entry[-1]) == entry and entry[-1] not in seen:
+                seen.add(entry[-1])
+                entries.append(entry)
+            for child in (2 * position + 1, 2 * position + 2):
+                if child < len(heap):
+                    heapq.heappush(frontier, (heap[child], child))
+        return entries
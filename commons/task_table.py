@@ -0,0 +1,168 @@
+import datetime
+import sys
+from array import array
+from bisect import bisect_left
+from collections.abc import Iterable, Iterator
+from dataclasses import InitVar, dataclass, field
+
+from .task import STATUS_CODES, STATUSES, Task, from_epoch_us, to_epoch_us
+from .task_status import TaskStatus
+
+_DELETED = 255
+# The completion time of a task that has none.
+_NO_TIME = -2 ** 63
+
+
+@dataclass
+class TaskTable:
+    """
+    A columnar, array-backed container of tasks with the same interface as TaskIndex.
+
+    Each task costs one row across typed arrays (ID, creation, update and completion timestamps
+    as integer microseconds, status as a one-byte code) plus its description string and tags
+    tuple, instead of a Task object with a ``__dict__`` and several datetime objects. Untagged
+    tasks all share the empty tuple. Priorities and due times are only kept, by ID, for the tasks
+    that have one. Task objects are only materialized when they are returned. Deleted rows are
+    tombstoned and reclaimed once they make up half the table.
+
+    While IDs arrive in ascending order (as the Tracker assigns them) rows are found by binary
+    search over the ID column; an ID -> row dict is only built once an ID arrives out of order.
+
+    Attributes:
+        tasks (Iterable[Task]): The tasks to store initially.
+        intern_descriptions (bool): Whether descriptions are interned so equal texts share memory.
+
+    Methods:
+        get_task(task_id: int) -> Task | None: Returns the task with the given ID, if any.
+        iter_tasks(status: TaskStatus | None = None) -> Iterator[Task]: Yields tasks, optionally filtered by status.
+        count_tasks(status: TaskStatus | None = None) -> int: Counts tasks, optionally filtered by status.
+        last_task_id() -> int: Returns the highest stored task ID, or 0 if empty.
+        apply_change(before: Task | None, after: Task | None) -> None: Updates the table for a created, updated or deleted task.
+    """
+    tasks: InitVar[Iterable[Task]] = ()
+    intern_descriptions: bool = False
+    _ids: array = field(init=False, repr=False, default_factory=lambda: array("q"))
+    _created_at: array = field(init=False, repr=False, default_factory=lambda: array("q"))
+    _updated_at: array = field(init=False, repr=False, default_factory=lambda: array("q"))
+    _done_at: array = field(init=False, repr=False, default_factory=lambda: array("q"))
+    _statuses: bytearray = field(init=False, repr=False, default_factory=bytearray)
+    _descriptions: list[str | None] = field(init=False, repr=False, default_factory=list)
+    _tags: list[tuple[str, ...]] = field(init=False, repr=False, default_factory=list)
+    _schedules: dict[int, tuple[int | None, datetime.datetime | None]] = field(init=False, repr=False, default_factory=dict)
+    _rows: dict[int, int] | None = field(init=False, repr=False, default=None)
+    _size: int = field(init=False, repr=False, default=0)
+    _counts: list[int] = field(init=False, repr=False, default_factory=lambda: [0] * len(STATUSES))
+
+    def __post_init__(self, tasks: Iterable[Task]):
+        for task in tasks:
+            self.apply_change(None, task)
+
+    def get_task(self, task_id: int) -> Task | None:
+        row = self._find_row(task_id)
+        return None if row is None else self._materialize(row)
+
+    def iter_tasks(self, status: TaskStatus | None = None) -> Iterator[Task]:
+        if status is None:
+            for row, code in enumerate(self._statuses):
+                if code != _DELETED:
+                    yield self._materialize(row)
+            return
+        # bytearray.find skips non-matching rows in C, so filtering costs O(result) in Python.
+        code = STATUS_CODES[TaskStatus(status)]
+        row = self._statuses.find(code)
+        while row != -1:
+            yield self._materialize(row)
+            row = self._statuses.find(code, row + 1)
+
+    def count_tasks(self, status: TaskStatus | None = None) -> int:
+        if status is None:
+            return self._size
+        return self._counts[STATUS_CODES[TaskStatus(status)]]
+
+    def last_task_id(self) -> int:
+        if self._rows is None:
+            return next((self._ids[row] for row in range(len(self._ids) - 1, -1, -1)
+                         if self._statuses[row] != _DELETED), 0)
+        return max(self._rows, default=0)
+
+    def apply_change(self, before: Task | None, after: Task | None) -> None:
+        if after is None:
+            row = self._find_row(before.id)
+            if self._rows is not None:
+                del self._rows[before.id]
+            self._counts[self._statuses[row]] -= 1
+            self._statuses[row] = _DELETED
+            self._descriptions[row] = None
+            self._tags[row] = ()
+            self._schedules.pop(before.id, None)
+            self._size -= 1
+            if len(self._statuses) > 64 and self._size * 2 < len(self._statuses):
+                self._reclaim()
+            return
+
+        code = STATUS_CODES[after.status]
+        if after.priority is not None or after.due_at is not None:
+            self._schedules[after.id] = (after.priority, after.due_at)
+        else:
+            self._schedules.pop(after.id, None)
+        description = sys.intern(after.description) if self.intern_descriptions else after.description
+        done_at = _NO_TIME if after.done_at is None else to_epoch_us(after.done_at)
+        row = self._find_row(after.id)
+        if row is None:
+            if self._rows is None and self._ids and after.id <= self._ids[-1]:
+                self._rows = {task_id: row for row, task_id in enumerate(self._ids)
+                              if self._statuses[row] != _DELETED}
+            if self._rows is not None:
+                self._rows[after.id] = len(self._ids)
+            self._size += 1
+            self._ids.append(after.id)
+            self._created_at.append(to_epoch_us(after.created_at))
+            self._updated_at.append(to_epoch_us(after.updated_at))
+            self._done_at.append(done_at)
+            self._statuses.append(code)
+            self._descriptions.append(description)
+            self._tags.append(after.tags)
+        else:
+            self._counts[self._statuses[row]] -= 1
+            self._created_at[row] = to_epoch_us(after.created_at)
+            self._updated_at[row] = to_epoch_us(after.updated_at)
+            self._done_at[row] = done_at
+            self._statuses[row] = code
+            self._descriptions[row] = description
+            self._tags[row] = after.tags
+        self._counts[code] += 1
+
+    def _find_row(self, task_id: int) -> int | None:
+        if self._rows is not None:
+            return self._rows.get(task_id)
+        row = bisect_left(self._ids, task_id)
+        if row < len(self._ids) and self._ids[row] == task_id and self._statuses[row] != _DELETED:
+            return row
+        return None
+
+    def _materialize(self, row: int) -> Task:
+        priority, due_at = self._schedules.get(self._ids[row], (None, None))
+        done_at = self._done_at[row]
+        return Task(
+            id=self._ids[row],
+            description=self._descriptions[row],
+            status=STATUSES[self._statuses[row]],
+            created_at=from_epoch_us(self._created_at[row]),
+            updated_at=from_epoch_us(self._updated_at[row]),
+            tags=self._tags[row],
+            priority=priority,
+            due_at=due_at,
+            done_at=None if done_at == _NO_TIME else from_epoch_us(done_at),
+        )
+
+    def _reclaim(self) -> None:
+        live = [row for row, code in enumerate(self._statuses) if code != _DELETED]
+        self._ids = array("q", (self._ids[row] for row in live))
+        self._created_at = array("q", (self._created_at[row] for row in live))
+        self._updated_at = array("q", (self._updated_at[row] for row in live))
+        self._done_at = array("q", (self._done_at[row] for row in live))
+        self._statuses = bytearray(self._statuses[row] for row in live)
+        self._descriptions = [self._descriptions[row] for row in live]
+        self._tags = [self._tags[row] for row in live]
+        if self._rows is not None:
+            self._rows = {task_id: row for row, task_id in enumerate(self._ids)}
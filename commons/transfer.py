@@ -0,0 +1,303 @@
+import asyncio
+import csv
+import datetime
+import io
+import json
+import marshal
+import os
+import threading
+from collections import deque
+from collections.abc import AsyncIterator, Iterable, Iterator
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from typing import BinaryIO, TextIO
+
+from .metrics import metrics
+from .processes import process_pool
+from .store import dump_task
+from .task import Task, normalize_tags
+from .task_status import TaskStatus
+
+FORMATS = ("ndjson", "csv")
+# The columns of an exported CSV file. An imported one needs a header naming its columns, of
+# which only description is required.
+CSV_FIELDS = ("id", "description", "status", "created_at", "updated_at", "tags", "priority", "due_at", "done_at")
+_STATUSES = {status.value for status in TaskStatus}
+
+
+def detect_format(path: str) -> str:
+    """Returns the format of a file from its suffix: csv for .csv, ndjson otherwise."""
+    return "csv" if path.lower().endswith(".csv") else "ndjson"
+
+
+def _time(value, name: str) -> str | None:
+    # Read like the --since and --until times: naive local times, aware ones converted.
+    if value is None or value == "":
+        return None
+    try:
+        moment = datetime.datetime.fromisoformat(value)
+    except (TypeError, ValueError):
+        raise ValueError(f"Invalid {name} {value!r}") from None
+    if moment.tzinfo is None:
+        # Read again as is by the parent.
+        return value
+    return moment.astimezone().replace(tzinfo=None).isoformat()
+
+
+def _priority(value) -> int | None:
+    if value is None or value == "":
+        return None
+    if isinstance(value, str):
+        try:
+            return int(value)
+        except ValueError:
+            pass
+    elif isinstance(value, int) and not isinstance(value, bool):
+        return value
+    raise ValueError(f"Invalid priority {value!r}")
+
+
+def _row(record: dict, now: str) -> tuple:
+    # A task as a tuple of built-in values, which marshal sends back to the parent quickly.
+    description = record.get("description")
+    if description is None:
+        raise ValueError("Missing field 'description'")
+    if not isinstance(description, str):
+        raise ValueError(f"Invalid description {description!r}")
+    status = record.get("status") or "todo"
+    if not isinstance(status, str) or status not in _STATUSES:
+        raise ValueError(f"Invalid status {status!r}")
+    tags = record.get("tags") or []
+    if isinstance(tags, str):
+        tags = tags.split()
+    elif not isinstance(tags, list) or not all(isinstance(tag, str) for tag in tags):
+        raise ValueError(f"Invalid tags {tags!r}")
+    created_at = _time(record.get("created_at"), "created_at") or now
+    return (
+        description,
+        status,
+        created_at,
+        _time(record.get("updated_at"), "updated_at") or created_at,
+        normalize_tags(tags),
+        _priority(record.get("priority")),
+        _time(record.get("due_at"), "due_at"),
+        _time(record.get("done_at"), "done_at") if status == "done" else None,
+    )
+
+
+def _check_utf8(values: list[str]) -> None:
+    try:
+        for value in values:
+            value.encode("utf-8")
+    except UnicodeEncodeError:
+        raise ValueError("Invalid UTF-8") from None
+
+
+def _parse_chunk(format: str, data: bytes, first_line: int, header: list[str] | None, now: str) -> bytes:
+    # Runs in a worker process: parses and validates a chunk of whole records, and returns the
+    # rows of the valid ones and the line number and message of the others, marshalled.
+    rows, errors = [], []
+    if format == "ndjson":
+        try:
+            lines = data.decode("utf-8").split("\n")
+        except UnicodeDecodeError:
+            # Decoded line by line, to reject the invalid lines only.
+            lines = data.split(b"\n")
+        for line_number, line in enumerate(lines, start=first_line):
+            if not line.strip():
+                continue
+            try:
+                record = json.loads(line)
+                if not isinstance(record, dict):
+                    raise ValueError("Task must be a JSON object")
+                rows.append(_row(record, now))
+            except json.JSONDecodeError as error:
+                errors.append((line_number, f"Invalid JSON: {error.msg}"))
+            except UnicodeDecodeError:
+                errors.append((line_number, "Invalid UTF-8"))
+            except ValueError as error:
+                errors.append((line_number, str(error)))
+        return marshal.dumps((rows, errors))
+    try:
+        text, valid = data.decode("utf-8"), True
+    except UnicodeDecodeError:
+        # Kept as lone surrogates, which only the records holding them are rejected for.
+        text, valid = data.decode("utf-8", "surrogateescape"), False
+    reader = csv.reader(io.StringIO(text, newline=""))
+    line_number = first_line
+    for values in reader:
+        if values:
+            try:
+                if not valid:
+                    _check_utf8(values)
+                if len(values) > len(header):
+                    raise ValueError(f"Expected {len(header)} fields, got {len(values)}")
+                rows.append(_row(dict(zip(header, values)), now))
+            except ValueError as error:
+                errors.append((line_number, str(error)))
+        # A record quoting line breaks spans several lines.
+        line_number = first_line + reader.line_num
+    return marshal.dumps((rows, errors))
+
+
+def _task(row: tuple) -> Task:
+    description, status, created_at, updated_at, tags, priority, due_at, done_at = row
+    return Task(
+        0,
+        description,
+        TaskStatus(status),
+        datetime.datetime.fromisoformat(created_at),
+        datetime.datetime.fromisoformat(updated_at),
+        tuple(tags),
+        priority,
+        None if due_at is None else datetime.datetime.fromisoformat(due_at),
+        None if done_at is None else datetime.datetime.fromisoformat(done_at),
+    )
+
+
+@dataclass
+class TaskTransfer:
+    """
+    Moves tasks in and out of the tracker as NDJSON, one JSON object per line in the format of
+    the store, or as CSV with the CSV_FIELDS columns and tags separated by spaces.
+
+    Both directions stream in chunks, so memory stays bounded whatever the size of the file.
+    ``encode()`` turns a chunk of tasks into text. ``parse()`` reads a file ``chunk_size``
+    bytes at a time, cut after the last complete record, and parses and validates the chunks
+    in worker processes when more than one CPU is available, several chunks ahead of the one
+    being consumed. Chunks come back in file order, as Task objects with ID 0 for the tracker
+    to number, along with the line number and message of every invalid record. Missing
+    statuses default to todo and missing creation times to the time of the import.
+
+    Attributes:
+        format (str): The format of the file, "ndjson" or "csv".
+        chunk_size (int): The number of bytes read per chunk, or more for a longer record.
+        max_workers (int | None): The most worker processes parsing chunks, defaults to the CPU count.
+        _processes (ProcessPoolExecutor | None): The worker processes, started by the first parse.
+        _header (list[str] | None): The columns named by the header of the CSV file being read.
+
+    Methods:
+        header() -> str: Returns the text starting an exported file.
+        encode(tasks: Iterable[Task]) -> str: Returns the text of exported tasks.
+        read_chunks(file: BinaryIO | TextIO) -> Iterator[tuple[int, bytes]]: Yields the first line number and the data of every chunk.
+        parse(file: BinaryIO | TextIO) -> AsyncIterator[tuple[list[Task], list[tuple[int, str]], int]]: Yields the tasks, errors and size of every chunk.
+        close() -> None: Stops the worker processes.
+    """
+    format: str = "ndjson"
+    chunk_size: int = 4 * 1024 * 1024
+    max_workers: int | None = None
+    _processes: ProcessPoolExecutor | None = field(init=False, repr=False, default=None)
+    _processes_lock: threading.Lock = field(init=False, repr=False, default_factory=threading.Lock)
+    _header: list[str] | None = field(init=False, repr=False, default=None)
+
+    def __post_init__(self):
+        if self.format not in FORMATS:
+            raise ValueError(f"Unknown format {self.format!r}, expected one of {', '.join(FORMATS)}")
+        if self.chunk_size < 1:
+            raise ValueError(f"Invalid chunk size {self.chunk_size!r}")
+
+    def header(self) -> str:
+        return ",".join(CSV_FIELDS) + "\r\n" if self.format == "csv" else ""
+
+    def encode(self, tasks: Iterable[Task]) -> str:
+        if self.format == "ndjson":
+            return "".join(f"{json.dumps(dump_task(task))}\n" for task in tasks)
+        text = io.StringIO()
+        csv.writer(text).writerows(
+            (
+                task.id,
+                task.description,
+                task.status.value,
+                task.created_at.isoformat(),
+                task.updated_at.isoformat(),
+                " ".join(task.tags),
+                "" if task.priority is None else task.priority,
+                "" if task.due_at is None else task.due_at.isoformat(),
+                "" if task.done_at is None else task.done_at.isoformat(),
+            )
+            for task in tasks
+        )
+        return text.getvalue()
+
+    def read_chunks(self, file: BinaryIO | TextIO) -> Iterator[tuple[int, bytes]]:
+        line_number, rest = 1, b""
+        if self.format == "csv":
+            self._header = None
+        while True:
+            data = file.read(self.chunk_size)
+            if isinstance(data, str):
+                data = data.encode("utf-8", "surrogateescape")
+            if not data:
+                break
+            data = rest + data
+            end = data.rfind(b"\n") + 1
+            if self.format == "csv":
+                # Only a line break outside quotes ends a record: the quotes before it must be
+                # balanced, an escaped quote being written twice.
+                inside = data.count(b'"', 0, end) & 1
+                while end and inside:
+                    previous = data.rfind(b"\n", 0, end - 1) + 1
+                    inside ^= data.count(b'"', previous, end) & 1
+                    end = previous
+            if not end:
+                rest = data
+                continue
+            chunk, rest = data[:end], data[end:]
+            if self.format == "csv" and self._header is None:
+                chunk, line_number = self._read_header(chunk), line_number + 1
+            if chunk:
+                yield line_number, chunk
+                line_number += chunk.count(b"\n")
+        if rest and self.format == "csv" and self._header is None:
+            rest, line_number = self._read_header(rest), line_number + 1
+        if rest:
+            yield line_number, rest
+
+    async def parse(self, file: BinaryIO | TextIO) -> AsyncIterator[tuple[list[Task], list[tuple[int, str]], int]]:
+        now = datetime.datetime.now().isoformat()
+        workers = self.max_workers or os.cpu_count() or 1
+        loop = asyncio.get_running_loop()
+        pending = deque()
+        chunks = self.read_chunks(file)
+        while True:
+            # Reading ahead keeps every worker busy while the tracker writes a chunk.
+            while len(pending) < (2 * workers if workers > 1 else 1):
+                chunk = next(chunks, None)
+                if chunk is None:
+                    break
+                line_number, data = chunk
+                arguments = (self.format, data, line_number, self._header, now)
+                if workers > 1:
+                    parsed = loop.run_in_executor(self._pool(workers), _parse_chunk, *arguments)
+                else:
+                    parsed = loop.create_future()
+                    parsed.set_result(_parse_chunk(*arguments))
+                pending.append((parsed, len(data)))
+            if not pending:
+                return
+            parsed, size = pending.popleft()
+            with metrics.timed("transfer.parse"):
+                rows, errors = marshal.loads(await parsed)
+                tasks = [_task(row) for row in rows]
+            metrics.count("transfer.parse", tasks=len(tasks), bytes_read=size)
+            yield tasks, errors, size
+
+    def close(self) -> None:
+        with self._processes_lock:
+            processes, self._processes = self._processes, None
+        if processes is not None:
+            processes.shutdown()
+
+    def _read_header(self, chunk: bytes) -> bytes:
+        end = chunk.find(b"\n") + 1 or len(chunk)
+        header = next(csv.reader([chunk[:end].decode("utf-8-sig", "replace")]), [])
+        self._header = [name.strip() for name in header]
+        if "description" not in self._header:
+            raise ValueError("The CSV header must name a description column")
+        return chunk[end:]
+
+    def _pool(self, workers: int) -> ProcessPoolExecutor:
+        with self._processes_lock:
+            if self._processes is None:
+                self._processes = process_pool(workers)
+            return self._processes
@@ -0,0 +1,153 @@
+import asyncio
+import json
+import os
+import signal
+import socket
+from contextlib import redirect_stderr, redirect_stdout
+from dataclasses import dataclass, field
+from io import StringIO
+from pathlib import Path
+
+import client
+from command_interface import CommandInterface
+from commons.store import store_signature
+
+
+@dataclass
+class TrackerDaemon:
+    """
+    A long-running server that keeps a Tracker loaded in memory and executes CommandInterface
+    commands sent by clients over a Unix domain socket, so a command costs a socket round trip
+    instead of an interpreter start plus a full store load.
+
+    Each connection carries one request, a JSON line ``{"argv": [...], "stdin": "..." | null}``,
+    answered by one JSON line ``{"stdout": "...", "stderr": "...", "exit_code": 0}``. Commands
+    run one at a time. The tracker is reloaded when the store files change behind its back.
+    Changes still held by a write-behind tracker are flushed when the daemon stops. With a
+    workspace, every list keeps its tracker loaded once a command touched it, and the manifest
+    is synced after every command.
+
+    Attributes:
+        command_interface (CommandInterface): The command interface executing the commands.
+        socket_path (Path | None): The socket to listen on, defaults to client.socket_path().
+
+    Methods:
+        serve() -> None: Listens on the socket until SIGINT or SIGTERM is received.
+        run_command(argv: list[str], stdin: str | None = None) -> dict: Executes a command and captures its output.
+    """
+    command_interface: CommandInterface
+    socket_path: Path | None = None
+    _lock: asyncio.Lock = field(init=False, repr=False, default_factory=asyncio.Lock)
+    # By tracker, for the trackers of every list of a workspace.
+    _store_signatures: dict[int, list | None] = field(init=False, repr=False, default_factory=dict)
+    _write_counts: dict[int, int] = field(init=False, repr=False, default_factory=dict)
+
+    def __post_init__(self):
+        self.socket_path = Path(client.socket_path(self.socket_path))
+
+    async def serve(self) -> None:
+        self._claim_socket()
+        server = await asyncio.start_unix_server(self._handle, path=self.socket_path)
+        stop = asyncio.Event()
+        loop = asyncio.get_running_loop()
+        for signal_number in (signal.SIGINT, signal.SIGTERM):
+            loop.add_signal_handler(signal_number, stop.set)
+        try:
+            async with server:
+                await stop.wait()
+        finally:
+            for signal_number in (signal.SIGINT, signal.SIGTERM):
+                loop.remove_signal_handler(signal_number)
+            self.socket_path.unlink(missing_ok=True)
+            if self.command_interface.workspace is not None:
+                await self.command_interface.workspace.close()
+            else:
+                await self.command_interface.tracker.flush()
+
+    async def run_command(self, argv: list[str], stdin: str | None = None) -> dict:
+        output, errors = StringIO(), StringIO()
+        exit_code = 0
+        async with self._lock:
+            command = client.command_arguments(argv)[:1]
+            if command == ["serve"]:
+                return {"stdout": "", "stderr": "The daemon is already running.\n", "exit_code": 1}
+            if command == ["watch"]:
+                # It would hold the daemon until interrupted.
+                return {"stdout": "", "stderr": "watch does not run in the daemon.\n", "exit_code": 1}
+            command_interface = self.command_interface
+            command_interface.input_stream = StringIO(stdin or "")
+            command_interface.output_stream = output
+            command_interface.error_stream = errors
+            try:
+                # argparse writes usage and errors to sys.stdout/sys.stderr directly.
+                with redirect_stdout(output), redirect_stderr(errors):
+                    args = command_interface.parse_args(argv)
+                    await self._refresh_tracker()
+                    await command_interface.dispatch(args)
+                    if command_interface.workspace is not None:
+                        await command_interface.workspace.sync()
+            except SystemExit as error:
+                exit_code = error.code if isinstance(error.code, int) else int(error.code is not None)
+            finally:
+                command_interface.input_stream = None
+                command_interface.output_stream = None
+                command_interface.error_stream = None
+                if command_interface.tracker is not None:
+                    self._store_signatures[id(command_interface.tracker)] = self._signature()
+                    self._write_counts[id(command_interface.tracker)] = command_interface.tracker.write_count
+        return {"stdout": output.getvalue(), "stderr": errors.getvalue(), "exit_code": exit_code}
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        try:
+            line = await reader.readline()
+            if not line:
+                # A liveness probe, see _claim_socket.
+                return
+            try:
+                request = json.loads(line)
+                response = await self.run_command(request["argv"], request.get("stdin"))
+            except Exception as error:
+                response = {"stdout": "", "stderr": f"Daemon error: {error}\n", "exit_code": 1}
+            writer.write(json.dumps(response).encode("utf-8") + b"\n")
+            await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    def _claim_socket(self) -> None:
+        if not self.socket_path.exists():
+            return
+        probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            probe.connect(os.fspath(self.socket_path))
+        except ConnectionRefusedError:
+            # Left behind by a daemon that did not shut down cleanly.
+            self.socket_path.unlink()
+            return
+        finally:
+            probe.close()
+        raise RuntimeError(f"A daemon is already listening on {self.socket_path}")
+
+    def _signature(self) -> list | None:
+        # Every file of the store: a sharded store changes its shards without its manifest.
+        tracker = self.command_interface.tracker
+        if tracker is None:
+            return None
+        try:
+            return store_signature(tracker.store)
+        except OSError:
+            return None
+
+    async def _refresh_tracker(self) -> None:
+        tracker = self.command_interface.tracker
+        if tracker is None:
+            return
+        signature = self._store_signatures.get(id(tracker))
+        if signature is None or self._signature() == signature:
+            return
+        if tracker.write_count != self._write_counts[id(tracker)]:
+            # Changed by the tracker's own write-behind flush.
+            return
+        await tracker.flush()
+        tracker.reload()
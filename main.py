@@ -1,23 +1,63 @@
-import asyncio
-from argparse import ArgumentParser
-from pathlib import Path
+import os
+import sys
+from io import TextIOBase
 
-from command_interface import CommandInterface
-from commons import StoreJSON
-from tracker import Tracker
+import client
 
+# Done tasks are moved to the archive this many days after being done, when set.
+ARCHIVE_AFTER_ENV = "TASK_TRACKER_ARCHIVE_AFTER_DAYS"
+
+
+async def main(argv: list[str] | None = None, input_stream: TextIOBase | None = None):
+    import datetime
+    from argparse import ArgumentParser
+    from pathlib import Path
+
+    from command_interface import CommandInterface
+    from workspace import Workspace
 
-async def main():
     argument_parser = ArgumentParser(
         prog="task-cli",
         description="A command-line interface for managing tasks.",
     )
-    tracker = Tracker(
-        StoreJSON(Path("tasks.json"))
+    archive_after = os.environ.get(ARCHIVE_AFTER_ENV)
+    # The default list is tasks.json, the others are only opened when a command names them.
+    workspace = Workspace(
+        Path("."),
+        archive_after=datetime.timedelta(days=float(archive_after)) if archive_after else None
     )
-    command_interface = CommandInterface(argument_parser, tracker)
-    await command_interface.execute()
+    command_interface = CommandInterface(argument_parser, workspace=workspace, input_stream=input_stream)
+    try:
+        await command_interface.execute(argv)
+    finally:
+        await workspace.close()
+
+
+def run(argv: list[str]) -> int:
+    # Commands go to a running daemon when there is one; the heavy imports above are only paid
+    # when the command has to run in this process. So do profiles written to a file, whose path
+    # is relative to this process, watch, which streams until interrupted, and import and
+    # export, which stream files of any size; the daemon reloads the store they change.
+    input_stream = None
+    profile_files = any(argument.split("=")[0] in ("--profile-output", "--cprofile") for argument in argv)
+    if client.command_arguments(argv)[:1] not in (["serve"], ["watch"], ["import"], ["export"]) and not profile_files:
+        stdin = sys.stdin.read() if client.reads_stdin(argv) else None
+        response = client.forward(argv, stdin=stdin)
+        if response is not None:
+            sys.stdout.write(response["stdout"])
+            sys.stderr.write(response["stderr"])
+            return response["exit_code"]
+        if stdin is not None:
+            from io import StringIO
+            input_stream = StringIO(stdin)
+
+    import asyncio
+    try:
+        asyncio.run(main(argv, input_stream))
+    except KeyboardInterrupt:
+        return 130
+    return 0
 
 
 if __name__ == '__main__':
-    asyncio.run(main())
+    sys.exit(run(sys.argv[1:]))
@@ -0,0 +1,72 @@
+import unittest
+from pathlib import Path
+from tempfile import TemporaryDirectory
+
+from commons.archive import TaskArchive
+from commons.task import Task
+from commons.task_status import TaskStatus
+
+
+class TestTaskArchive(unittest.TestCase):
+    def setUp(self):
+        self.directory = TemporaryDirectory()
+        self.tasks = [
+            Task(id=task_id, description=f"Task {task_id}", status=TaskStatus.DONE)
+            for task_id in (3, 1, 2)
+        ]
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_append_and_read(self):
+        for name in ("archive.gz", "archive.xz"):
+            with self.subTest(name=name):
+                archive = TaskArchive(Path(self.directory.name) / name)
+                self.assertEqual(list(archive.iter_tasks()), [])
+                archive.append(self.tasks[:2])
+                archive.append(self.tasks[2:])
+
+                other = TaskArchive(archive.path)
+                self.assertEqual([task.id for task in other.iter_tasks()], [1, 2, 3])
+                self.assertEqual(other.get_task(3), self.tasks[0])
+                self.assertEqual(other.last_task_id(), 3)
+                self.assertEqual(list(other.iter_tasks(TaskStatus.TODO)), [])
+
+    def test_remove_appends_without_rewriting(self):
+        archive = TaskArchive(Path(self.directory.name) / "archive.gz")
+        archive.append(self.tasks)
+        archived = archive.path.read_bytes()
+        archive.remove([1, 3])
+
+        self.assertTrue(archive.path.read_bytes().startswith(archived))
+        self.assertEqual([task.id for task in archive.iter_tasks()], [2])
+        self.assertIsNone(TaskArchive(archive.path).get_task(1))
+        self.assertEqual(archive.last_task_id(), 3)
+
+    def test_torn_append_is_ignored(self):
+        archive = TaskArchive(Path(self.directory.name) / "archive.gz")
+        archive.append(self.tasks[:1])
+        first = archive.path.stat().st_size
+        archive.append(self.tasks[1:])
+        archive.path.write_bytes(archive.path.read_bytes()[:first + 15])
+
+        self.assertEqual([task.id for task in TaskArchive(archive.path).iter_tasks()], [3])
+
+    def test_appends_after_a_torn_append_are_read(self):
+        for name in ("archive.gz", "archive.xz"):
+            with self.subTest(name=name):
+                archive = TaskArchive(Path(self.directory.name) / name)
+                archive.append(self.tasks[:1])
+                first = archive.path.stat().st_size
+                archive.append([Task(id=9, description="Torn", status=TaskStatus.DONE)])
+                archive.path.write_bytes(archive.path.read_bytes()[:first + 30])
+                archive.append(self.tasks[1:])
+                archive.remove([2])
+
+                other = TaskArchive(archive.path)
+                self.assertEqual([task.id for task in other.iter_tasks()], [1, 3])
+                self.assertEqual(other.last_task_id(), 9)
+
+    def test_suffix_selects_the_compression(self):
+        with self.assertRaises(ValueError):
+            TaskArchive(Path(self.directory.name) / "archive.json")
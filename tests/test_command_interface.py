@@ -1,11 +1,17 @@
+import datetime
+import json
+import pstats
 import unittest
 from argparse import ArgumentParser
 from io import StringIO
+from pathlib import Path
+from tempfile import TemporaryDirectory
 from unittest.mock import MagicMock, patch
 
 from command_interface import CommandInterface
-from commons import Task, TaskStatus
+from commons import StoreJSON, Task, TaskStats, TaskStatus, metrics
 from tracker import Tracker
+from workspace import Workspace
 
 
 class TestCommandInterface(unittest.IsolatedAsyncioTestCase):
@@ -70,7 +76,7 @@ class TestCommandInterface(unittest.IsolatedAsyncioTestCase):
         # Arrange
         task1 = Task(id=1, description="Task 1", status=TaskStatus.TODO)
         task2 = Task(id=2, description="Task 2", status=TaskStatus.IN_PROGRESS)
-        self.mocker_tracker.list_tasks.return_value = [task1, task2]
+        self.mocker_tracker.iter_tasks.return_value.__aiter__.return_value = [task1, task2]
         command_interface = CommandInterface(parser=self.parser, tracker=self.mocker_tracker)
 
         # Act
@@ -79,7 +85,7 @@ class TestCommandInterface(unittest.IsolatedAsyncioTestCase):
                 await command_interface.execute()
 
         # Assert
-        self.mocker_tracker.list_tasks.assert_called_once_with(None)
+        self.mocker_tracker.iter_tasks.assert_called_once_with(None)
         self.assertIn("Task ID: 1", mock_stdout.getvalue())
         self.assertIn("Task ID: 2", mock_stdout.getvalue())
 
@@ -87,7 +93,7 @@ class TestCommandInterface(unittest.IsolatedAsyncioTestCase):
     async def test_list_tasks_filtered_by_status(self):
         # Arrange
         task = Task(id=1, description="Task 1", status=TaskStatus.TODO)
-        self.mocker_tracker.list_tasks.return_value = [task]
+        self.mocker_tracker.iter_tasks.return_value.__aiter__.return_value = [task]
         command_interface = CommandInterface(parser=self.parser, tracker=self.mocker_tracker)
 
         # Act
@@ -96,7 +102,7 @@ class TestCommandInterface(unittest.IsolatedAsyncioTestCase):
                 await command_interface.execute()
 
         # Assert
-        self.mocker_tracker.list_tasks.assert_called_once_with('todo')
+        self.mocker_tracker.iter_tasks.assert_called_once_with('todo')
         self.assertIn("Task ID: 1", mock_stdout.getvalue())
         self.assertIn("Status: todo", mock_stdout.getvalue())
 
@@ -163,7 +169,7 @@ class TestCommandInterface(unittest.IsolatedAsyncioTestCase):
     # Listing tasks when no tasks exist
     async def test_list_empty_tasks(self):
         # Arrange
-        self.mocker_tracker.list_tasks.return_value = []
+        self.mocker_tracker.iter_tasks.return_value.__aiter__.return_value = []
         command_interface = CommandInterface(parser=self.parser, tracker=self.mocker_tracker)
 
         # Act
@@ -172,5 +178,334 @@ class TestCommandInterface(unittest.IsolatedAsyncioTestCase):
                 await command_interface.execute()
 
         # Assert
-        self.mocker_tracker.list_tasks.assert_called_once_with(None)
+        self.mocker_tracker.iter_tasks.assert_called_once_with(None)
         self.assertIn("No tasks found", mock_stderr.getvalue())
+
+    # Listing the most recently updated tasks, sorted and paginated
+    async def test_list_sorted_with_limit(self):
+        # Arrange
+        self.mocker_tracker.list_tasks.return_value = [self.task_test]
+        command_interface = CommandInterface(parser=self.parser, tracker=self.mocker_tracker)
+
+        # Act
+        argv = ['program', 'list', 'in-progress', '--sort', 'updated_at', '--desc', '--limit', '20',
+                '--since', '2025-03-09T20:00']
+        with patch('sys.argv', argv):
+            with patch('command_interface.stdout', new_callable=StringIO) as mock_stdout:
+                await command_interface.execute()
+
+        # Assert
+        self.mocker_tracker.list_tasks.assert_called_once_with(
+            'in-progress', 'updated_at', True, datetime.datetime(2025, 3, 9, 20, 0), None, 0, 20
+        )
+        self.mocker_tracker.iter_tasks.assert_not_called()
+        self.assertIn("Description: Test task", mock_stdout.getvalue())
+
+    # Listing the tasks with some tags and without others
+    async def test_list_filtered_by_tags(self):
+        # Arrange
+        self.mocker_tracker.list_tasks.return_value = [Task(1, "Fix login", TaskStatus.TODO, tags=("bug", "ui"))]
+        command_interface = CommandInterface(parser=self.parser, tracker=self.mocker_tracker)
+
+        # Act
+        argv = ['program', 'list', '--status', 'todo', '--tag', 'bug', '--any-tag', 'ui', '--any-tag', 'api',
+                '--exclude-tag', 'wontfix']
+        with patch('sys.argv', argv):
+            with patch('command_interface.stdout', new_callable=StringIO) as mock_stdout:
+                await command_interface.execute()
+
+        # Assert
+        self.mocker_tracker.list_tasks.assert_called_once_with(
+            'todo', None, False, None, None, 0, None, tags=['bug'], any_tags=['ui', 'api'], exclude_tags=['wontfix']
+        )
+        self.assertIn("Tags: bug, ui", mock_stdout.getvalue())
+
+    # Tagging a task, then removing a tag
+    async def test_tag_and_untag(self):
+        # Arrange
+        self.mocker_tracker.tag_task.return_value = self.task_test
+        self.mocker_tracker.untag_task.side_effect = ValueError("Task with ID 9 not found")
+        command_interface = CommandInterface(parser=self.parser, tracker=self.mocker_tracker)
+
+        # Act
+        with patch('command_interface.stdout', new_callable=StringIO) as mock_stdout:
+            with patch('command_interface.stderr', new_callable=StringIO) as mock_stderr:
+                await command_interface.execute(['tag', '1', 'bug', 'urgent'])
+                await command_interface.execute(['untag', '9', 'bug'])
+                with self.assertRaises(SystemExit):
+                    await command_interface.execute(['tag', '1', 'two words'])
+
+        # Assert
+        self.mocker_tracker.tag_task.assert_called_once_with(1, ['bug', 'urgent'])
+        self.assertIn("Task (ID: 1) tagged successfully.", mock_stdout.getvalue())
+        self.assertIn("Task (ID: 9) not found.", mock_stderr.getvalue())
+
+    # Asking for the most urgent tasks, then the overdue ones
+    async def test_next_and_overdue(self):
+        # Arrange
+        due_at = datetime.datetime(2025, 3, 9, 20, 0)
+        self.mocker_tracker.next_tasks.return_value = [Task(1, "Fix login", TaskStatus.TODO, priority=2, due_at=due_at)]
+        self.mocker_tracker.overdue_tasks.return_value = []
+        command_interface = CommandInterface(parser=self.parser, tracker=self.mocker_tracker)
+
+        # Act
+        with patch('command_interface.stdout', new_callable=StringIO) as mock_stdout:
+            with patch('command_interface.stderr', new_callable=StringIO) as mock_stderr:
+                await command_interface.execute(['next', '-n', '3'])
+                await command_interface.execute(['overdue', '--limit', '5'])
+
+        # Assert
+        self.mocker_tracker.next_tasks.assert_called_once_with(3)
+        self.mocker_tracker.overdue_tasks.assert_called_once_with(limit=5)
+        self.assertIn("Priority: 2\nDue at: 2025-03-09 20:00:00\n", mock_stdout.getvalue())
+        self.assertIn("No tasks found.", mock_stderr.getvalue())
+
+    # Adding a task with a priority and a due time, then clearing the priority
+    async def test_add_with_priority_and_due_time(self):
+        # Arrange
+        self.mocker_tracker.add_task.return_value = self.task_test
+        self.mocker_tracker.set_priority.return_value = self.task_test
+        command_interface = CommandInterface(parser=self.parser, tracker=self.mocker_tracker)
+
+        # Act
+        with patch('command_interface.stdout', new_callable=StringIO) as mock_stdout:
+            await command_interface.execute(['add', 'Test task', '--priority', '0', '--due', '2025-03-09T20:00'])
+            await command_interface.execute(['priority', '1'])
+
+        # Assert
+        self.mocker_tracker.add_task.assert_called_once_with(
+            "Test task", priority=0, due_at=datetime.datetime(2025, 3, 9, 20, 0)
+        )
+        self.mocker_tracker.set_priority.assert_called_once_with(1, None)
+        self.assertIn("Task (ID: 1) priority set successfully.", mock_stdout.getvalue())
+
+    # Archiving the tasks done long ago
+    async def test_archive_older_than(self):
+        # Arrange
+        self.mocker_tracker.archive_tasks.return_value = [self.task_test, self.task_test]
+        command_interface = CommandInterface(parser=self.parser, tracker=self.mocker_tracker)
+
+        # Act
+        with patch('sys.argv', ['program', 'archive', '--older-than', '7']):
+            with patch('command_interface.stdout', new_callable=StringIO) as mock_stdout:
+                await command_interface.execute()
+
+        # Assert
+        self.mocker_tracker.archive_tasks.assert_called_once_with(datetime.timedelta(days=7))
+        self.assertIn("Archived 2 task(s).", mock_stdout.getvalue())
+
+    async def test_archive_rejects_an_age_out_of_range(self):
+        # Arrange
+        command_interface = CommandInterface(parser=self.parser, tracker=self.mocker_tracker)
+
+        # Act
+        with patch('sys.stderr', new_callable=StringIO):
+            for days in ('-1', '1e12', 'nan', 'inf'):
+                with self.assertRaises(SystemExit):
+                    await command_interface.execute(['archive', '--older-than', days])
+
+        # Assert
+        self.mocker_tracker.archive_tasks.assert_not_called()
+
+    # Reporting the stats
+    async def test_stats(self):
+        # Arrange
+        today = datetime.datetime.combine(datetime.date.today(), datetime.time(9))
+        done = Task(2, "Done", TaskStatus.DONE, today - datetime.timedelta(days=1), today)
+        self.mocker_tracker.stats.return_value = TaskStats([self.task_test, done])
+        command_interface = CommandInterface(parser=self.parser, tracker=self.mocker_tracker)
+
+        # Act
+        with patch('sys.argv', ['program', 'stats', '--days', '2']):
+            with patch('command_interface.stdout', new_callable=StringIO) as mock_stdout:
+                await command_interface.execute()
+
+        # Assert
+        lines = mock_stdout.getvalue().splitlines()
+        self.assertEqual(lines[0], "Tasks: 2 (todo: 1, in-progress: 0, done: 1)")
+        self.assertRegex(lines[1], r"^Median time to done: about (23|1 day, 0):")
+        self.assertEqual(len(lines), 5)
+        self.assertEqual(lines[4].split(), [datetime.date.today().isoformat(), "1", "1"])
+
+    # Streaming the changes as NDJSON
+    async def test_watch_with_limit(self):
+        # Arrange
+        async def watch(since, interval):
+            for sequence in range(since + 1, since + 10):
+                yield {"seq": sequence, "op": "delete", "id": sequence}
+        self.mocker_tracker.watch = MagicMock(side_effect=watch)
+        command_interface = CommandInterface(parser=self.parser, tracker=self.mocker_tracker)
+
+        # Act
+        with patch('sys.argv', ['program', 'watch', '--since', '4', '--interval', '2', '--limit', '2']):
+            with patch('command_interface.stdout', new_callable=StringIO) as mock_stdout:
+                await command_interface.execute()
+
+        # Assert
+        self.mocker_tracker.watch.assert_called_once_with(4, 2.0)
+        self.assertEqual(
+            [json.loads(line) for line in mock_stdout.getvalue().splitlines()],
+            [{"seq": 5, "op": "delete", "id": 5}, {"seq": 6, "op": "delete", "id": 6}]
+        )
+
+    async def test_watch_rejects_an_interval_below_or_at_zero(self):
+        # Arrange
+        command_interface = CommandInterface(parser=self.parser, tracker=self.mocker_tracker)
+
+        # Act
+        with patch('sys.stderr', new_callable=StringIO):
+            for interval in ('0', '-0.5', 'nan'):
+                with self.assertRaises(SystemExit):
+                    await command_interface.execute(['watch', '--interval', interval])
+
+        # Assert
+        self.mocker_tracker.watch.assert_not_called()
+
+    async def test_serve_rejects_a_negative_write_behind(self):
+        # Arrange
+        command_interface = CommandInterface(parser=self.parser, tracker=self.mocker_tracker)
+
+        # Act
+        with patch('sys.stderr', new_callable=StringIO):
+            with patch('daemon.TrackerDaemon.serve') as serve:
+                with self.assertRaises(SystemExit):
+                    await command_interface.execute(['serve', '--write-behind', '-1'])
+
+        # Assert
+        serve.assert_not_called()
+
+    # Searching task descriptions
+    async def test_search_with_status_and_limit(self):
+        # Arrange
+        self.mocker_tracker.search.return_value = [self.task_test]
+        command_interface = CommandInterface(parser=self.parser, tracker=self.mocker_tracker)
+
+        # Act
+        with patch('sys.argv', ['program', 'search', 'test', '--status', 'todo', '--limit', '5']):
+            with patch('command_interface.stdout', new_callable=StringIO) as mock_stdout:
+                await command_interface.execute()
+
+        # Assert
+        self.mocker_tracker.search.assert_called_once_with("test", "todo", 5)
+        self.assertIn("Description: Test task", mock_stdout.getvalue())
+
+    async def test_search_rejects_a_negative_limit(self):
+        # Arrange
+        command_interface = CommandInterface(parser=self.parser, tracker=self.mocker_tracker)
+
+        # Act
+        with patch('sys.stderr', new_callable=StringIO):
+            with self.assertRaises(SystemExit):
+                await command_interface.execute(['search', 'test', '--limit', '-1'])
+
+        # Assert
+        self.mocker_tracker.search.assert_not_called()
+
+    # Applying a batch of NDJSON operations
+    async def test_batch_reports_failures_per_line(self):
+        # Arrange
+        self.mocker_tracker.apply_batch.return_value = [self.task_test, ValueError("Task with ID 999 not found")]
+        command_interface = CommandInterface(parser=self.parser, tracker=self.mocker_tracker)
+        lines = StringIO(
+            '{"action": "add", "description": "Test task"}\n'
+            'not json\n'
+            '\n'
+            '{"action": "mark-done", "task_id": 999}\n'
+        )
+
+        # Act
+        with patch('sys.argv', ['program', 'batch']), patch('command_interface.stdin', lines):
+            with patch('command_interface.stdout', new_callable=StringIO) as mock_stdout:
+                with patch('command_interface.stderr', new_callable=StringIO) as mock_stderr:
+                    await command_interface.execute()
+
+        # Assert
+        self.mocker_tracker.apply_batch.assert_called_once_with([
+            {"action": "add", "description": "Test task"},
+            {"action": "mark-done", "task_id": 999},
+        ])
+        self.assertIn("Line 2: Invalid JSON", mock_stderr.getvalue())
+        self.assertIn("Line 4: Task with ID 999 not found.", mock_stderr.getvalue())
+        self.assertIn("Batch applied: 1 succeeded, 2 failed.", mock_stdout.getvalue())
+
+    # Exporting the tasks to CSV, then importing them again with a line that is not valid
+    async def test_export_and_import(self):
+        with TemporaryDirectory() as directory:
+            tracker = Tracker(StoreJSON(Path(directory) / "tasks.json"))
+            await tracker.add_task("Fix login", ["bug"], priority=2)
+            await tracker.add_task("Write, then review\ndocs")
+            command_interface = CommandInterface(parser=self.parser, tracker=tracker)
+            path = Path(directory) / "tasks.csv"
+
+            with patch('command_interface.stdout', new_callable=StringIO) as mock_stdout:
+                with patch('command_interface.stderr', new_callable=StringIO) as mock_stderr:
+                    await command_interface.execute(['export', str(path)])
+                    with path.open("a", encoding="utf-8", newline="") as file:
+                        file.write("9,Broken,blocked,,,,,\r\n")
+                    await command_interface.execute(['import', str(path), '--chunk-size', '32', '--workers', '1'])
+                    await command_interface.execute(['import', str(Path(directory) / "missing.csv")])
+                    for option in ('--workers', '--chunk-size'):
+                        with self.assertRaises(SystemExit):
+                            await command_interface.execute(['import', str(path), option, '0'])
+
+            self.assertIn("Exported 2 task(s)", mock_stderr.getvalue())
+            self.assertIn("Line 5: Invalid status 'blocked'.", mock_stderr.getvalue())
+            self.assertIn("Import done: 2 imported, 1 failed.", mock_stdout.getvalue())
+            self.assertIn("missing.csv not found.", mock_stderr.getvalue())
+            tasks = await tracker.list_tasks()
+            self.assertEqual([task.id for task in tasks], [1, 2, 3, 4])
+            self.assertEqual((tasks[2].description, tasks[2].tags, tasks[2].priority), ("Fix login", ("bug",), 2))
+            self.assertEqual(tasks[3].description, "Write, then review\ndocs")
+
+
+    # Working on named lists of a workspace, then listing the todo tasks of every list
+    async def test_lists_of_a_workspace(self):
+        with TemporaryDirectory() as directory:
+            workspace = Workspace(Path(directory))
+            command_interface = CommandInterface(parser=self.parser, workspace=workspace)
+
+            with patch('command_interface.stdout', new_callable=StringIO) as mock_stdout:
+                await command_interface.execute(['--list', 'work', 'add', 'Work task'])
+                await command_interface.execute(['add', 'Default task'])
+                await command_interface.execute(['--list', 'home', 'add', 'Home task'])
+                await command_interface.execute(['--list', 'home', 'mark-done', '1'])
+                await workspace.close()
+                mock_stdout.truncate(0)
+                await command_interface.execute(['list', '--all-lists', '--status', 'todo'])
+                await command_interface.execute(['lists'])
+
+            output = mock_stdout.getvalue()
+            self.assertIn("List: work\n\nTask ID: 1\nDescription: Work task", output)
+            self.assertIn("List: default\n\nTask ID: 1\nDescription: Default task", output)
+            self.assertNotIn("List: home", output)
+            self.assertIn("home: 0 todo, 0 in-progress, 1 done (lists/home.json)\n", output)
+            self.assertEqual(sorted(workspace.lists()), ["default", "home", "work"])
+
+
+    # Profiling a command against a real store
+    async def test_profile_reports_store_phases(self):
+        # Arrange
+        directory = TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        store = StoreJSON(Path(directory.name) / "tasks.json")
+        store.update_file([self.task_test])
+        command_interface = CommandInterface(parser=self.parser, tracker=Tracker(store))
+        output_path = Path(directory.name) / "profile.json"
+        cprofile_path = Path(directory.name) / "profile.out"
+
+        # Act
+        with patch('command_interface.stderr', new_callable=StringIO) as mock_stderr:
+            await command_interface.execute(["--profile", "mark-done", "1"])
+        await CommandInterface(parser=ArgumentParser(), tracker=Tracker(store)).execute(
+            ["--profile-output", str(output_path), "--cprofile", str(cprofile_path), "list"]
+        )
+
+        # Assert
+        self.assertIn("store.commit", mock_stderr.getvalue())
+        self.assertIn("tasks=1", mock_stderr.getvalue())
+        report = json.loads(output_path.read_text())
+        self.assertEqual(report["command"], "list")
+        self.assertEqual(report["metrics"]["store.iter_tasks"]["items"], 1)
+        self.assertTrue(pstats.Stats(str(cprofile_path)).total_calls > 0)
+        self.assertFalse(metrics.enabled)
+        self.assertIsNone(metrics.profiler)
@@ -0,0 +1,148 @@
+import asyncio
+import socket
+import unittest
+from argparse import ArgumentParser
+from pathlib import Path
+from tempfile import TemporaryDirectory
+
+import client
+from command_interface import CommandInterface
+from commons.store import StoreJSON
+from commons.store_sharded import StoreSharded
+from commons.task import Task
+from commons.task_status import TaskStatus
+from daemon import TrackerDaemon
+from tracker import Tracker
+from workspace import Workspace
+
+
+class TestClient(unittest.TestCase):
+    def test_reads_stdin(self):
+        self.assertTrue(client.reads_stdin(["batch"]))
+        self.assertTrue(client.reads_stdin(["batch", "-"]))
+        self.assertFalse(client.reads_stdin(["batch", "operations.ndjson"]))
+        self.assertFalse(client.reads_stdin(["add", "batch"]))
+        self.assertTrue(client.reads_stdin(["--list", "work", "batch"]))
+        self.assertFalse(client.reads_stdin(["--list", "batch", "list"]))
+
+    def test_command_arguments(self):
+        self.assertEqual(client.command_arguments(["--profile", "--list", "work", "add", "--tag", "x", "Task"]), ["add", "--tag", "x", "Task"])
+        self.assertEqual(client.command_arguments(["--cprofile", "out.prof", "watch"]), ["watch"])
+
+    def test_forward_without_daemon(self):
+        with TemporaryDirectory() as directory:
+            self.assertIsNone(client.forward(["list"], Path(directory) / "missing.sock"))
+
+
+class TestTrackerDaemon(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.directory = TemporaryDirectory()
+        self.store = StoreJSON(Path(self.directory.name) / "tasks.json")
+        self.store.update_file([Task(id=1, description="Task 1", status=TaskStatus.TODO)])
+        self.socket_path = Path(self.directory.name) / "daemon.sock"
+        command_interface = CommandInterface(ArgumentParser(prog="task-cli"), Tracker(self.store))
+        self.daemon = TrackerDaemon(command_interface, self.socket_path)
+        self.server = asyncio.create_task(self.daemon.serve())
+        while not self.socket_path.exists():
+            await asyncio.sleep(0.01)
+
+    async def asyncTearDown(self):
+        self.server.cancel()
+        await asyncio.gather(self.server, return_exceptions=True)
+        self.directory.cleanup()
+
+    async def forward(self, argv: list[str], stdin: str | None = None) -> dict:
+        return await asyncio.to_thread(client.forward, argv, self.socket_path, stdin)
+
+    async def test_commands_share_loaded_tracker(self):
+        added = await self.forward(["add", "Task 2"])
+        done = await self.forward(["mark-done", "2"])
+        listed = await self.forward(["list", "done"])
+
+        self.assertEqual(added, {"stdout": "Task added successfully (ID: 2).\n", "stderr": "", "exit_code": 0})
+        self.assertIn("marked as done successfully", done["stdout"])
+        self.assertIn("Description: Task 2", listed["stdout"])
+        self.assertEqual([task.id for task in self.store.load()], [1, 2])
+
+    async def test_batch_reads_forwarded_stdin(self):
+        response = await self.forward(["batch"], '{"action": "mark-in-progress", "task_id": 1}\n')
+        self.assertIn("Batch applied: 1 succeeded, 0 failed.", response["stdout"])
+        self.assertEqual(self.store.load()[0].status, TaskStatus.IN_PROGRESS)
+
+    async def test_usage_errors_are_captured(self):
+        response = await self.forward(["mark-done", "not-a-number"])
+        self.assertEqual(response["exit_code"], 2)
+        self.assertIn("invalid int value", response["stderr"])
+
+        response = await self.forward(["serve"])
+        self.assertEqual(response["exit_code"], 1)
+
+    async def test_reloads_after_external_change(self):
+        await self.forward(["list"])
+        self.store.update_file([Task(id=7, description="Written elsewhere", status=TaskStatus.TODO)])
+
+        response = await self.forward(["list"])
+        self.assertIn("Written elsewhere", response["stdout"])
+
+    async def test_reloads_after_external_change_to_a_shard(self):
+        path = Path(self.directory.name) / "sharded.json"
+        StoreSharded(path, shard_count=2).update_file([Task(id=1, description="Task 1", status=TaskStatus.TODO)])
+        self.daemon.command_interface.tracker = Tracker(StoreSharded(path, shard_count=2))
+        await self.forward(["list", "--sort", "id"])
+        # Only rewrites the shard of the task, not the manifest.
+        StoreSharded(path, shard_count=2).apply_changes([Task(id=1, description="Written elsewhere", status=TaskStatus.TODO)], [])
+
+        response = await self.forward(["list", "--sort", "id"])
+        self.assertIn("Written elsewhere", response["stdout"])
+
+    async def test_write_behind_flushes_on_shutdown(self):
+        self.daemon.command_interface.tracker.write_behind = 60
+        await self.forward(["add", "Task 2"])
+        await self.forward(["mark-done", "1"])
+        self.assertEqual(len(self.store.load()), 1)
+
+        self.server.cancel()
+        await asyncio.gather(self.server, return_exceptions=True)
+        self.assertEqual([task.id for task in self.store.load()], [1, 2])
+        self.assertEqual(self.daemon.command_interface.tracker.write_count, 1)
+
+    async def test_serves_the_lists_of_a_workspace(self):
+        root = Path(self.directory.name) / "workspace"
+        root.mkdir()
+        socket_path = root / "daemon.sock"
+        daemon = TrackerDaemon(CommandInterface(ArgumentParser(prog="task-cli"), workspace=Workspace(root)), socket_path)
+        server = asyncio.create_task(daemon.serve())
+        while not socket_path.exists():
+            await asyncio.sleep(0.01)
+        try:
+            forward = lambda argv: asyncio.to_thread(client.forward, argv, socket_path)
+            await forward(["--list", "work", "add", "Work task"])
+            await forward(["add", "Default task"])
+            StoreJSON(root / "lists" / "work.json").update_file([Task(id=5, description="Written elsewhere", status=TaskStatus.TODO)])
+            listed = await forward(["--list", "work", "list"])
+            everywhere = await forward(["list", "--all-lists"])
+        finally:
+            server.cancel()
+            await asyncio.gather(server, return_exceptions=True)
+
+        self.assertIn("Written elsewhere", listed["stdout"])
+        self.assertNotIn("Work task", listed["stdout"])
+        self.assertIn("List: default", everywhere["stdout"])
+        self.assertIn("List: work", everywhere["stdout"])
+        self.assertEqual(Workspace(root).lists()["work"]["counts"]["todo"], 1)
+
+    async def test_refuses_second_daemon(self):
+        other = TrackerDaemon(self.daemon.command_interface, self.socket_path)
+        with self.assertRaises(RuntimeError):
+            await other.serve()
+
+    async def test_replaces_stale_socket(self):
+        self.server.cancel()
+        await asyncio.gather(self.server, return_exceptions=True)
+        stale = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        stale.bind(str(self.socket_path))
+        stale.close()
+
+        self.server = asyncio.create_task(self.daemon.serve())
+        await asyncio.sleep(0.05)
+        self.assertEqual((await self.forward(["list", "todo"]))["exit_code"], 0)
@@ -0,0 +1,64 @@
+import asyncio
+import unittest
+
+from commons.metrics import Metrics
+
+
+class TestMetrics(unittest.TestCase):
+    def setUp(self):
+        self.metrics = Metrics()
+
+    def test_records_nothing_while_disabled(self):
+        @self.metrics.measure("square")
+        def square(value):
+            return value * value
+
+        with self.metrics.timed("block"):
+            self.assertEqual(square(3), 9)
+        self.metrics.count("block", bytes_read=10)
+        self.assertEqual(self.metrics.records, {})
+
+    def test_measures_functions_coroutines_and_generators(self):
+        @self.metrics.measure("function")
+        def function():
+            return 1
+
+        @self.metrics.measure("coroutine")
+        async def coroutine():
+            return 2
+
+        @self.metrics.measure("generator")
+        def generator():
+            yield from range(3)
+
+        self.metrics.enable()
+        self.assertEqual(function(), 1)
+        self.assertEqual(asyncio.run(coroutine()), 2)
+        self.assertEqual(list(generator()), [0, 1, 2])
+        with self.metrics.timed("block"):
+            self.metrics.count("block", bytes_read=10)
+        self.metrics.count("block", bytes_read=5)
+
+        report = self.metrics.as_dict()
+        self.assertEqual({name: values["calls"] for name, values in report.items()},
+                         {"block": 1, "coroutine": 1, "function": 1, "generator": 1})
+        self.assertEqual(report["generator"]["items"], 3)
+        self.assertEqual(report["block"]["bytes_read"], 15)
+        self.assertIn("bytes_read=15", self.metrics.format_report())
+
+    def test_closing_a_measured_generator_closes_it(self):
+        closed = []
+
+        @self.metrics.measure("generator")
+        def generator():
+            try:
+                yield from range(10)
+            finally:
+                closed.append(True)
+
+        self.metrics.enable()
+        items = generator()
+        next(items)
+        items.close()
+        self.assertEqual(closed, [True])
+        self.assertEqual(self.metrics.records["generator"].counters["items"], 1)
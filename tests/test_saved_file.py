@@ -0,0 +1,29 @@
+import unittest
+from pathlib import Path
+from tempfile import TemporaryDirectory
+
+from commons.saved_file import load_marshalled, save_marshalled
+
+
+class TestSavedFile(unittest.TestCase):
+    def test_only_loaded_for_its_format_signature_and_length(self):
+        with TemporaryDirectory() as directory:
+            path = Path(directory) / "saved"
+            save_marshalled(path, 1, [[1, 2, 3]], ({"a": 1}, b"ids"))
+
+            self.assertEqual(load_marshalled(path, 1, [[1, 2, 3]], 2), ({"a": 1}, b"ids"))
+            self.assertIsNone(load_marshalled(path, 2, [[1, 2, 3]], 2))
+            self.assertIsNone(load_marshalled(path, 1, [[1, 2, 4]], 2))
+            self.assertIsNone(load_marshalled(path, 1, [[1, 2, 3]], 3))
+            self.assertEqual(list(Path(directory).iterdir()), [path])
+
+    def test_truncated_or_missing_files_are_not_loaded(self):
+        with TemporaryDirectory() as directory:
+            path = Path(directory) / "saved"
+            save_marshalled(path, 1, None, (1,))
+            data = path.read_bytes()
+            for length in (0, 2, len(data) - 1):
+                path.write_bytes(data[:length])
+                self.assertIsNone(load_marshalled(path, 1, None, 1))
+            self.assertIsNone(load_marshalled(Path(directory) / "missing", 1, None, 1))
+
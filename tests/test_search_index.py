@@ -0,0 +1,61 @@
+import unittest
+from pathlib import Path
+from tempfile import TemporaryDirectory
+
+from commons.search_index import SearchIndex, tokenize
+from commons.task import Task
+from commons.task_status import TaskStatus
+
+
+class TestSearchIndex(unittest.TestCase):
+    def setUp(self):
+        self.tasks = [
+            Task(id=1, description="Write the quarterly report", status=TaskStatus.TODO),
+            Task(id=2, description="Review report drafts", status=TaskStatus.DONE),
+            Task(id=3, description="Buy groceries", status=TaskStatus.TODO),
+            Task(id=4, description="Reporting dashboard for groceries", status=TaskStatus.IN_PROGRESS),
+        ]
+        self.index = SearchIndex(self.tasks)
+
+    def test_tokenize(self):
+        self.assertEqual(tokenize("Write the REPORT, then write-up."), {"write", "the", "report", "then", "up"})
+
+    def test_ranking(self):
+        # Whole tokens count twice, and rarer tokens weigh more.
+        self.assertEqual(list(self.index.search("report")), [1, 2, 4])
+        self.assertEqual(list(self.index.search("port")), [4, 1, 2])
+
+    def test_every_term_must_match(self):
+        self.assertEqual(list(self.index.search("report groceries")), [4])
+        self.assertEqual(list(self.index.search("report missing")), [])
+        self.assertEqual(list(self.index.search("...")), [])
+
+    def test_short_terms_only_match_whole_tokens(self):
+        self.index.apply_change(None, Task(id=5, description="Go to the bank", status=TaskStatus.TODO))
+        self.assertEqual(list(self.index.search("go")), [5])
+        self.assertEqual(list(self.index.search("gr")), [])
+
+    def test_changes_are_indexed(self):
+        updated = Task(id=3, description="Buy report paper", status=TaskStatus.TODO)
+        self.index.apply_change(self.tasks[2], updated)
+        self.index.apply_change(self.tasks[0], None)
+
+        self.assertEqual(list(self.index.search("groceries")), [4])
+        self.assertEqual(sorted(self.index.search("report")), [2, 3, 4])
+        self.assertNotIn("quarterly", self.index._postings)
+        self.assertNotIn("art", self.index._trigrams)
+
+    def test_matches(self):
+        self.assertTrue(self.index.matches("rep groceries", "Reporting dashboard for groceries"))
+        self.assertFalse(self.index.matches("rep groceries", "Reporting dashboard"))
+
+    def test_saved_index_is_only_loaded_for_its_signature(self):
+        with TemporaryDirectory() as directory:
+            path = Path(directory) / "tasks.json.search"
+            self.index.signature = [[1, 2, 3]]
+            self.index.save(path)
+
+            loaded = SearchIndex.load(path, [[1, 2, 3]])
+            self.assertEqual(list(loaded.search("report")), [1, 2, 4])
+            self.assertIsNone(SearchIndex.load(path, [[1, 2, 4]]))
+            self.assertIsNone(SearchIndex.load(Path(directory) / "missing", [[1, 2, 3]]))
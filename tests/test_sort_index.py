@@ -0,0 +1,58 @@
+import datetime
+import unittest
+from dataclasses import replace
+
+from commons.sort_index import SortIndex
+from commons.task import Task
+from commons.task_status import TaskStatus
+
+START = datetime.datetime(2025, 3, 9, 20, 0)
+
+
+def at(minutes: int) -> datetime.datetime:
+    return START + datetime.timedelta(minutes=minutes)
+
+
+class TestSortIndex(unittest.TestCase):
+    def setUp(self):
+        self.tasks = [
+            Task(id=1, description="Task 1", status=TaskStatus.TODO, created_at=at(0), updated_at=at(30)),
+            Task(id=2, description="Task 2", status=TaskStatus.DONE, created_at=at(10), updated_at=at(10)),
+            Task(id=3, description="Task 3", status=TaskStatus.TODO, created_at=at(20), updated_at=at(20)),
+            Task(id=4, description="Task 4", status=TaskStatus.IN_PROGRESS, created_at=at(20), updated_at=at(40))
+        ]
+        self.index = SortIndex(self.tasks, "updated_at")
+
+    def test_select_merges_statuses_in_order(self):
+        self.assertEqual(list(self.index.select()), [2, 3, 1, 4])
+        self.assertEqual(list(self.index.select(descending=True)), [4, 1, 3, 2])
+        self.assertEqual(list(self.index.select(TaskStatus.TODO, descending=True)), [1, 3])
+
+    def test_select_range_is_inclusive(self):
+        self.assertEqual(list(self.index.select(since=at(20), until=at(30))), [3, 1])
+        self.assertEqual(list(self.index.select(since=at(20), until=at(30), descending=True)), [1, 3])
+        self.assertEqual(list(self.index.select(TaskStatus.DONE, since=at(11))), [])
+
+    def test_equal_timestamps_are_ordered_by_id(self):
+        index = SortIndex(self.tasks, "created_at")
+        self.assertEqual(list(index.select(since=at(20))), [3, 4])
+        self.assertEqual(list(index.select(until=at(20), descending=True)), [4, 3, 2, 1])
+
+    def test_apply_change(self):
+        before = replace(self.tasks[1])
+        self.tasks[1].status = TaskStatus.TODO
+        self.tasks[1].updated_at = at(50)
+        self.index.apply_change(before, self.tasks[1])
+        self.index.apply_change(self.tasks[0], None)
+        self.index.apply_change(None, Task(id=5, description="Task 5", status=TaskStatus.DONE, updated_at=at(0)))
+
+        self.assertEqual(list(self.index.select()), [5, 3, 4, 2])
+        self.assertEqual(list(self.index.select(TaskStatus.TODO)), [3, 2])
+
+    def test_ids_cannot_be_bounded_by_time(self):
+        index = SortIndex(self.tasks, "id")
+        self.assertEqual(list(index.select(TaskStatus.TODO, descending=True)), [3, 1])
+        with self.assertRaises(ValueError):
+            list(index.select(since=at(0)))
+        with self.assertRaises(ValueError):
+            SortIndex(self.tasks, "description")
@@ -1,7 +1,13 @@
+import asyncio
+import datetime
+import json
+import os
 import unittest
+from io import StringIO
 from pathlib import Path
+from unittest.mock import patch
 
-from commons.store import StoreJSON
+from commons.store import StoreJSON, _to_row, dump_task, iter_json_array
 from commons.task import Task
 from commons.task_status import TaskStatus
 
@@ -12,6 +18,8 @@ class TestStoreJSON(unittest.TestCase):
 
     def tearDown(self):
         self.file_test.unlink(missing_ok=True)
+        Path("test_store.json.lock").unlink(missing_ok=True)
+        Path("test_store.json.cache").unlink(missing_ok=True)
 
     def test_init_store(self):
         self.assertFalse(self.file_test.exists())
@@ -44,3 +52,178 @@ class TestStoreJSON(unittest.TestCase):
         store.update_file(tasks)
         loaded_tasks = store.load()
         self.assertEqual(loaded_tasks, tasks)
+
+    def test_iter_tasks(self):
+        tasks = [
+            Task(id=1, description="Task 1", status=TaskStatus.TODO),
+            Task(id=2, description="Task 2", status=TaskStatus.IN_PROGRESS)
+        ]
+        store = StoreJSON(self.file_test)
+        self.assertEqual(list(store.iter_tasks()), [])
+        store.update_file(tasks)
+        self.assertEqual(list(store.iter_tasks()), tasks)
+        self.assertEqual(list(store.iter_tasks(TaskStatus.IN_PROGRESS)), tasks[1:])
+
+    def test_update_file_replaces_atomically(self):
+        store = StoreJSON(self.file_test)
+        store.update_file([Task(id=1, description="Task 1", status=TaskStatus.TODO)])
+        inode = self.file_test.stat().st_ino
+        store.update_file([])
+
+        self.assertNotEqual(self.file_test.stat().st_ino, inode)
+        self.assertEqual(list(self.file_test.parent.glob("test_store.json.*.tmp")), [])
+        self.assertEqual(json.loads(Path("test_store.json.lock").read_text())["version"], 2)
+
+    def test_commit_merges_only_after_concurrent_write(self):
+        first, second = StoreJSON(self.file_test), StoreJSON(self.file_test)
+        first.update_file([Task(id=1, description="Task 1", status=TaskStatus.TODO)])
+        first.load()
+        second.load()
+
+        task_2 = Task(id=2, description="Added by first", status=TaskStatus.TODO)
+        self.assertIsNone(first.commit([task_2], [], {2}, first.load() + [task_2]))
+        # Written against version 1: the ID is taken, and task 1 is updated after a merge.
+        other_2 = Task(id=2, description="Added by second", status=TaskStatus.TODO)
+        updated_1 = Task(id=1, description="Task 1 Updated", status=TaskStatus.DONE)
+        new_ids = second.commit([other_2, updated_1], [], {2}, [updated_1, other_2])
+
+        self.assertEqual(new_ids, {2: 3})
+        self.assertEqual(
+            [(task.id, task.description) for task in first.load()],
+            [(1, "Task 1 Updated"), (2, "Added by first"), (3, "Added by second")]
+        )
+        self.assertIsNone(second.commit([], [3], (), [updated_1, task_2]))
+
+    def test_encode_task_matches_json_dumps(self):
+        store = StoreJSON(self.file_test)
+        task = Task(id=7, description='Say "hé" \\ \n 😀', status=TaskStatus.IN_PROGRESS)
+
+        row, text = store._encode_task(task)
+
+        self.assertEqual(text, json.dumps(dump_task(task)))
+        self.assertEqual(row, _to_row(dump_task(task)))
+
+    def test_tags_are_stored_when_set(self):
+        store = StoreJSON(self.file_test)
+        tasks = [
+            Task(id=1, description="Task 1", status=TaskStatus.TODO, tags=("bug", "ü")),
+            Task(id=2, description="Task 2", status=TaskStatus.TODO),
+        ]
+        store.update_file(tasks)
+
+        self.assertEqual(store._encode_task(tasks[0])[1], json.dumps(dump_task(tasks[0])))
+        records = json.loads(self.file_test.read_text())
+        self.assertEqual(records[0]["tags"], ["bug", "ü"])
+        self.assertNotIn("tags", records[1])
+        self.assertEqual(store.load(), tasks)
+        Path("test_store.json.cache").unlink()
+        self.assertEqual(list(store.iter_tasks()), tasks)
+
+    def test_priority_due_and_done_times_are_stored_when_set(self):
+        store = StoreJSON(self.file_test)
+        due_at = datetime.datetime(2025, 3, 9, 20, 0)
+        tasks = [
+            Task(id=1, description="Task 1", status=TaskStatus.TODO, priority=2, due_at=due_at),
+            Task(id=2, description="Task 2", status=TaskStatus.TODO, priority=0),
+            Task(id=3, description="Task 3", status=TaskStatus.DONE, done_at=due_at),
+        ]
+        store.update_file(tasks)
+
+        self.assertEqual(self.file_test.read_text(), json.dumps([dump_task(task) for task in tasks]))
+        self.assertEqual(json.loads(self.file_test.read_text())[0]["due_at"], "2025-03-09T20:00:00")
+        self.assertEqual(json.loads(self.file_test.read_text())[2]["done_at"], "2025-03-09T20:00:00")
+        self.assertEqual(store.load(), tasks)
+        Path("test_store.json.cache").unlink()
+        self.assertEqual(list(store.iter_tasks()), tasks)
+
+    def test_commit_encodes_only_the_changed_tasks(self):
+        tasks = [Task(id=task_id, description=f"Task {task_id}", status=TaskStatus.TODO) for task_id in range(1, 6)]
+        store = StoreJSON(self.file_test)
+        store.update_file(tasks)
+        tasks[2] = Task(id=3, description="Task 3 Updated", status=TaskStatus.DONE)
+
+        with patch.object(StoreJSON, "_encode_task", autospec=True, side_effect=StoreJSON._encode_task) as encode:
+            self.assertIsNone(store.commit([tasks[2]], [], (), tasks))
+
+        self.assertEqual([call.args[1] for call in encode.call_args_list], [tasks[2]])
+        self.assertEqual(self.file_test.read_text(), json.dumps([dump_task(task) for task in tasks]))
+        self.assertEqual(store.load(), tasks)
+
+    def test_commit_does_not_reuse_encodings_after_concurrent_write(self):
+        first, second = StoreJSON(self.file_test), StoreJSON(self.file_test)
+        first.update_file([Task(id=1, description="Task 1", status=TaskStatus.TODO)])
+        updated_1 = Task(id=1, description="Task 1 Updated", status=TaskStatus.DONE)
+        second.commit([updated_1], [], (), [updated_1])
+        first.load()
+
+        # The encoding kept by the first write of task 1 is outdated.
+        task_2 = Task(id=2, description="Task 2", status=TaskStatus.TODO)
+        first.commit([task_2], [], {2}, [updated_1, task_2])
+
+        self.assertEqual(second.load(), [updated_1, task_2])
+
+    def test_async_io_runs_off_the_event_loop(self):
+        tasks = [Task(id=1, description="Task 1", status=TaskStatus.TODO)]
+        store = StoreJSON(self.file_test)
+
+        async def round_trip():
+            await store.aupdate_file(tasks)
+            return await store.aload()
+
+        self.assertEqual(asyncio.run(round_trip()), tasks)
+        self.assertEqual(store.load(), tasks)
+
+    def test_snapshot_cache_skips_decoding(self):
+        tasks = [Task(id=1, description="Task 1", status=TaskStatus.TODO)]
+        store = StoreJSON(self.file_test)
+        store.update_file(tasks)
+
+        self.assertTrue(Path("test_store.json.cache").exists())
+        with patch("commons.store._to_row", side_effect=AssertionError):
+            self.assertEqual(store.load(), tasks)
+            self.assertEqual(list(store.iter_tasks(TaskStatus.TODO)), tasks)
+
+    def test_snapshot_cache_is_validated_by_content(self):
+        store = StoreJSON(self.file_test)
+        store.update_file([Task(id=1, description="Task 1", status=TaskStatus.TODO)])
+        stat = self.file_test.stat()
+        # Same size and modification time, different contents.
+        self.file_test.write_text(self.file_test.read_text().replace("Task 1", "Task 2"))
+        os.utime(self.file_test, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+
+        self.assertEqual(store.load()[0].description, "Task 2")
+        with patch("commons.store._to_row", side_effect=AssertionError):
+            self.assertEqual(store.load()[0].description, "Task 2")
+
+    def test_snapshot_cache_is_rebuilt_by_complete_streams_only(self):
+        tasks = [Task(id=task_id, description=f"Task {task_id}", status=TaskStatus.TODO) for task_id in range(1, 2001)]
+        store = StoreJSON(self.file_test)
+        store.update_file(tasks)
+        Path("test_store.json.cache").unlink()
+
+        stream = store.iter_tasks()
+        next(stream)
+        stream.close()
+        self.assertFalse(Path("test_store.json.cache").exists())
+        self.assertEqual(list(store.iter_tasks(TaskStatus.TODO)), tasks)
+        self.assertTrue(Path("test_store.json.cache").exists())
+        self.assertEqual(list(self.file_test.parent.glob("test_store.json.cache.*.tmp")), [])
+        with patch("commons.store._to_row", side_effect=AssertionError):
+            self.assertEqual(store.load(), tasks)
+
+
+class TestIterJsonArray(unittest.TestCase):
+    def test_items_across_chunks(self):
+        items = [{"id": index, "description": "x" * index, "nested": {"list": [1, 2]}} for index in range(50)]
+        text = json.dumps(items, indent=2)
+        for chunk_size in (1, 7, 64, len(text)):
+            self.assertEqual(list(iter_json_array(StringIO(text), chunk_size=chunk_size)), items)
+
+    def test_empty_input(self):
+        self.assertEqual(list(iter_json_array(StringIO(""))), [])
+        self.assertEqual(list(iter_json_array(StringIO(" [ ] "))), [])
+
+    def test_malformed_input(self):
+        for text in ('{"id": 1}', '[{"id": 1}, {"id"', '[{"id": 1}'):
+            with self.assertRaises(json.JSONDecodeError):
+                list(iter_json_array(StringIO(text), chunk_size=4))
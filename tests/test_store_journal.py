@@ -0,0 +1,138 @@
+import json
+import unittest
+from pathlib import Path
+from tempfile import TemporaryDirectory
+
+from commons.store import StoreJSON
+from commons.store_journal import StoreJournal
+from commons.task import Task
+from commons.task_status import TaskStatus
+from tracker import Tracker
+
+
+class TestStoreJournal(unittest.TestCase):
+    def setUp(self):
+        self.directory = TemporaryDirectory()
+        self.file_test = Path(self.directory.name) / "tasks.json"
+        self.tasks = [
+            Task(id=1, description="Task 1", status=TaskStatus.TODO),
+            Task(id=2, description="Task 2", status=TaskStatus.IN_PROGRESS)
+        ]
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_apply_changes_appends_records(self):
+        store = StoreJournal(self.file_test)
+        store.update_file(self.tasks)
+        snapshot = self.file_test.read_text(encoding="utf-8")
+
+        store.apply_changes([Task(id=3, description="Task 3", status=TaskStatus.DONE)], [])
+        store.apply_changes([], [1])
+
+        self.assertEqual(self.file_test.read_text(encoding="utf-8"), snapshot)
+        records = [json.loads(line) for line in store.journal_path.read_text(encoding="utf-8").splitlines()]
+        self.assertEqual([record["op"] for record in records], ["put", "delete"])
+
+    def test_load_replays_journal(self):
+        store = StoreJournal(self.file_test)
+        store.update_file(self.tasks)
+        updated = Task(id=2, description="Task 2 Updated", status=TaskStatus.DONE)
+        added = Task(id=3, description="Task 3", status=TaskStatus.TODO)
+        store.apply_changes([updated, added], [1])
+
+        self.assertEqual(StoreJournal(self.file_test).load(), [updated, added])
+
+    def test_iter_tasks_applies_journal(self):
+        store = StoreJournal(self.file_test)
+        store.update_file(self.tasks)
+        updated = Task(id=2, description="Task 2 Updated", status=TaskStatus.DONE)
+        added = Task(id=3, description="Task 3", status=TaskStatus.DONE)
+        store.apply_changes([updated, added], [1])
+
+        self.assertEqual(list(store.iter_tasks()), store.load())
+        self.assertEqual(list(store.iter_tasks(TaskStatus.DONE)), [updated, added])
+        self.assertEqual(list(store.iter_tasks(TaskStatus.TODO)), [])
+
+    def test_load_ignores_torn_record(self):
+        store = StoreJournal(self.file_test)
+        store.update_file(self.tasks)
+        with store.journal_path.open("a", encoding="utf-8") as journal:
+            journal.write('{"op": "delete", "id"')
+
+        self.assertEqual(store.load(), self.tasks)
+
+    def test_appends_after_a_torn_record_are_kept(self):
+        store = StoreJournal(self.file_test)
+        store.update_file(self.tasks[:1])
+        with store.journal_path.open("a", encoding="utf-8") as journal:
+            journal.write('{"op": "put", "task": {"id": 2')
+        added = [Task(id=3, description="Task 3", status=TaskStatus.TODO), Task(id=4, description="Task 4", status=TaskStatus.DONE)]
+        store.apply_changes(added[:1], [])
+        store.apply_changes(added[1:], [])
+
+        self.assertEqual(StoreJournal(self.file_test).load(), [self.tasks[0], *added])
+
+    def test_compact_on_threshold(self):
+        store = StoreJournal(self.file_test, compact_threshold=1)
+        store.update_file(self.tasks)
+        added = Task(id=3, description="Task 3", status=TaskStatus.TODO)
+        store.apply_changes([added], [])
+
+        self.assertFalse(store.journal_path.exists())
+        self.assertEqual(StoreJSON(self.file_test).load(), self.tasks + [added])
+
+    def test_background_compaction(self):
+        store = StoreJournal(self.file_test, compact_threshold=1, background_compaction=True)
+        store.update_file(self.tasks)
+        store.apply_changes([], [2])
+        store.wait_for_compaction()
+
+        self.assertEqual(StoreJSON(self.file_test).load(), self.tasks[:1])
+        self.assertEqual(store.load(), self.tasks[:1])
+
+    def test_commit_rebases_after_concurrent_append(self):
+        first, second = StoreJournal(self.file_test), StoreJournal(self.file_test)
+        first.update_file(self.tasks)
+        second.load()
+
+        self.assertIsNone(first.commit([Task(id=3, description="First", status=TaskStatus.TODO)], [1], {3}))
+        new_ids = second.commit(
+            [Task(id=3, description="Second", status=TaskStatus.TODO),
+             Task(id=1, description="Deleted meanwhile", status=TaskStatus.DONE)],
+            [],
+            {3}
+        )
+
+        self.assertEqual(new_ids, {3: 4})
+        self.assertEqual([(task.id, task.description) for task in first.load()],
+                         [(2, "Task 2"), (3, "First"), (4, "Second")])
+
+    def test_update_file_discards_journal(self):
+        store = StoreJournal(self.file_test)
+        store.apply_changes(self.tasks, [])
+        store.update_file(self.tasks[:1])
+
+        self.assertFalse(store.journal_path.exists())
+        self.assertEqual(store.load(), self.tasks[:1])
+
+
+class TestTrackerWithStoreJournal(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.directory = TemporaryDirectory()
+        self.store = StoreJournal(Path(self.directory.name) / "tasks.json")
+        self.tracker = Tracker(self.store)
+
+    async def asyncTearDown(self):
+        self.directory.cleanup()
+
+    async def test_mutations_survive_reload(self):
+        await self.tracker.add_task("Task 1")
+        await self.tracker.add_task("Task 2")
+        await self.tracker.update_task(1, "Task 1 Updated")
+        await self.tracker.mark_done(2)
+        await self.tracker.delete_task(1)
+
+        tasks = Tracker(StoreJournal(self.store.file_path)).tasks
+        self.assertEqual([(task.id, task.status) for task in tasks], [(2, TaskStatus.DONE)])
+        self.assertEqual(self.store.file_path.read_text(encoding="utf-8"), "")
@@ -0,0 +1,153 @@
+import json
+import unittest
+from pathlib import Path
+from tempfile import TemporaryDirectory
+from unittest.mock import patch
+
+from commons.store_ndjson import StoreNDJSON
+from commons.task import Task
+from commons.task_status import TaskStatus
+from tracker import Tracker
+
+
+class TestStoreNDJSON(unittest.TestCase):
+    def setUp(self):
+        self.directory = TemporaryDirectory()
+        self.file_test = Path(self.directory.name) / "tasks.ndjson"
+        self.tasks = [
+            Task(id=1, description="Task 1", status=TaskStatus.TODO),
+            Task(id=2, description="Task 2", status=TaskStatus.IN_PROGRESS),
+            Task(id=3, description="Task 3", status=TaskStatus.DONE)
+        ]
+        self.store = StoreNDJSON(self.file_test)
+        self.store.update_file(self.tasks)
+
+    def tearDown(self):
+        self.store.close()
+        self.directory.cleanup()
+
+    def lines(self) -> list[str]:
+        return self.file_test.read_text(encoding="utf-8").splitlines()
+
+    def test_one_padded_record_per_line(self):
+        lines = self.lines()
+        self.assertEqual([json.loads(line)["id"] for line in lines], [1, 2, 3])
+        self.assertTrue(all((len(line) + 1) % self.store.slot_size == 0 for line in lines))
+        self.assertEqual(self.store.load(), self.tasks)
+
+    def test_change_that_fits_is_patched_in_place(self):
+        size = self.file_test.stat().st_size
+        self.store.apply_changes([Task(id=2, description="Task 2", status=TaskStatus.DONE)], [])
+
+        self.assertEqual(self.file_test.stat().st_size, size)
+        self.assertEqual(json.loads(self.lines()[1])["status"], "done")
+        self.assertEqual(self.store.get_task(2).status, TaskStatus.DONE)
+
+    def test_change_that_does_not_fit_is_moved(self):
+        longer = Task(id=1, description="Task 1 " + "x" * 100, status=TaskStatus.TODO)
+        self.store.apply_changes([longer], [3])
+
+        lines = self.lines()
+        self.assertEqual([line.strip() for line in lines[0:3:2]], ["", ""])
+        self.assertEqual(json.loads(lines[-1])["description"], longer.description)
+        self.assertEqual(self.store.load(), [longer, self.tasks[1]])
+        self.assertEqual(list(self.store.iter_tasks(TaskStatus.DONE)), [])
+
+    def test_index_is_reused_and_caught_up(self):
+        self.store.apply_changes([Task(id=4, description="Task 4", status=TaskStatus.TODO)], [1])
+        other = StoreNDJSON(self.file_test)
+        self.addCleanup(other.close)
+
+        with patch.object(StoreNDJSON, "_rebuild") as rebuild:
+            self.assertEqual([task.id for task in other.load()], [2, 3, 4])
+            self.store.apply_changes([Task(id=5, description="Task 5", status=TaskStatus.TODO)], [])
+            self.assertEqual(other.get_task(5).description, "Task 5")
+            self.assertEqual(other.last_task_id(), 5)
+        rebuild.assert_not_called()
+
+    def test_index_is_rebuilt_when_it_does_not_match(self):
+        with self.file_test.open("a", encoding="utf-8") as data:
+            data.write('{"id": 9, "description": "Written without the index", "status": "todo", ')
+        self.store.index_path.unlink()
+
+        other = StoreNDJSON(self.file_test)
+        self.addCleanup(other.close)
+        self.assertEqual(other.load(), self.tasks)
+        other.apply_changes([Task(id=4, description="Task 4", status=TaskStatus.TODO)], [])
+        self.assertTrue(self.store.index_path.exists())
+        self.assertEqual([task.id for task in self.store.load()], [1, 2, 3, 4])
+
+    def test_compaction_drops_blank_slots(self):
+        for task_id in range(4, 604):
+            self.store.apply_changes([Task(id=task_id, description=f"Task {task_id}", status=TaskStatus.TODO)], [task_id - 1])
+
+        self.assertLess(len(self.lines()), 600)
+        self.assertEqual([task.id for task in self.store.load()], [1, 2, 603])
+        self.assertEqual([task.id for task in StoreNDJSON(self.file_test).load()], [1, 2, 603])
+
+    def test_iter_tasks_across_chunks(self):
+        tasks = [Task(id=task_id, description=f"Task {task_id}", status=TaskStatus.TODO) for task_id in range(1, 2501)]
+        self.store.update_file(tasks)
+        self.assertEqual([task.id for task in self.store.iter_tasks()], list(range(1, 2501)))
+
+    def test_commit_rebases_after_other_writer(self):
+        other = StoreNDJSON(self.file_test)
+        self.addCleanup(other.close)
+        other.last_task_id()
+
+        self.assertIsNone(self.store.commit([Task(id=4, description="First", status=TaskStatus.TODO)], [], {4}))
+        new_ids = other.commit([Task(id=4, description="Second", status=TaskStatus.TODO)], [], {4})
+
+        self.assertEqual(new_ids, {4: 5})
+        self.assertEqual([task.description for task in self.store.load()][3:], ["First", "Second"])
+
+
+class TestTrackerWithStoreNDJSON(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.directory = TemporaryDirectory()
+        self.store = StoreNDJSON(Path(self.directory.name) / "tasks.ndjson")
+        self.tracker = Tracker(self.store)
+
+    async def asyncTearDown(self):
+        self.store.close()
+        self.directory.cleanup()
+
+    async def test_only_the_index_is_resident(self):
+        await self.tracker.add_task("Task 1")
+        await self.tracker.add_task("Task 2")
+        await self.tracker.mark_done(1)
+        await self.tracker.delete_task(2)
+
+        self.assertIs(self.tracker._index, self.store)
+        self.assertEqual([task.id for task in await self.tracker.list_tasks(TaskStatus.DONE)], [1])
+        self.assertEqual(Tracker(StoreNDJSON(self.store.file_path)).tasks, await self.tracker.list_tasks())
+
+    async def test_sorted_listing_scans_the_store(self):
+        for number in range(1, 6):
+            await self.tracker.add_task(f"Task {number}")
+        await self.tracker.mark_done(2)
+        await self.tracker.update_task(4, "Task 4 Updated")
+
+        tasks = await self.tracker.list_tasks(sort="updated_at", descending=True, limit=2)
+        self.assertEqual([task.id for task in tasks], [4, 2])
+        tasks = await self.tracker.list_tasks(TaskStatus.TODO, sort="id", descending=True, offset=1)
+        self.assertEqual([task.id for task in tasks], [4, 3, 1])
+        self.assertEqual(self.tracker._sort_indexes, {})
+
+    async def test_ids_taken_by_another_tracker_after_a_read(self):
+        other = Tracker(StoreNDJSON(self.store.file_path))
+        self.addCleanup(other.store.close)
+        await self.tracker.add_task("a1")
+        await other.add_task("b1")
+        await self.tracker.add_task("a2")
+        # Catches up with the second add, which the commit of the next one then sees nothing of.
+        await other.list_tasks()
+
+        task = await other.add_task("b2")
+
+        self.assertEqual(task.id, 4)
+        self.assertEqual(
+            [(task.id, task.description) for task in self.store.load()],
+            [(1, "a1"), (2, "b1"), (3, "a2"), (4, "b2")]
+        )
+        self.assertEqual((await other.list_tasks())[-1].description, "b2")
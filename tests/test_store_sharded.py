@@ -0,0 +1,122 @@
+import json
+import unittest
+from pathlib import Path
+from tempfile import TemporaryDirectory
+
+from commons.store import StoreJSON
+from commons.store_sharded import StoreSharded
+from commons.task import Task
+from commons.task_status import TaskStatus
+from tracker import Tracker
+
+
+class TestStoreSharded(unittest.TestCase):
+    def setUp(self):
+        self.directory = TemporaryDirectory()
+        self.file_test = Path(self.directory.name) / "tasks.json"
+        self.tasks = [
+            Task(id=task_id, description=f"Task {task_id}", status=list(TaskStatus)[task_id % 3])
+            for task_id in range(1, 10)
+        ]
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def store(self, **options) -> StoreSharded:
+        store = StoreSharded(self.file_test, **options)
+        self.addCleanup(store.close)
+        return store
+
+    def shard(self, key: str) -> list[int]:
+        return [task["id"] for task in json.loads(self.file_test.with_name(f"tasks.json.shard-{key}").read_text())]
+
+    def test_partitions(self):
+        for partition, shards in [
+            ("hash", {"0": [3, 6, 9], "1": [1, 4, 7], "2": [2, 5, 8]}),
+            ("range", {"0": [1, 2, 3, 4], "1": [5, 6, 7, 8], "2": [9]}),
+            ("status", {"todo": [3, 6, 9], "in-progress": [1, 4, 7], "done": [2, 5, 8]}),
+        ]:
+            with self.subTest(partition=partition):
+                self.file_test.unlink(missing_ok=True)
+                store = self.store(partition=partition, shard_count=3, shard_size=4)
+                store.update_file(self.tasks)
+                self.assertEqual({key: self.shard(key) for key in shards}, shards)
+                self.assertEqual(store.load(), self.tasks)
+                self.assertEqual(list(self.store(partition=partition, shard_count=3, shard_size=4).iter_tasks()),
+                                 sorted(self.tasks, key=lambda task: (store._key(task), task.id)))
+
+    def test_changes_rewrite_only_the_touched_shards(self):
+        store = self.store(partition="status")
+        store.update_file(self.tasks)
+        todo = self.file_test.with_name("tasks.json.shard-todo").stat().st_mtime_ns
+
+        moved = Task(id=2, description="Task 2", status=TaskStatus.IN_PROGRESS)
+        store.apply_changes([moved], [1])
+        self.assertEqual(self.shard("in-progress"), [2, 4, 7])
+        self.assertEqual(self.shard("done"), [5, 8])
+        self.assertEqual(self.file_test.with_name("tasks.json.shard-todo").stat().st_mtime_ns, todo)
+
+        # Another instance finds where the tasks are by reading the shards.
+        self.store(partition="status").apply_changes([], [4])
+        self.assertEqual([task.id for task in self.store(partition="status").load()], [2, 3, 5, 6, 7, 8, 9])
+
+    def test_status_filter_opens_a_single_shard(self):
+        store = self.store(partition="status")
+        store.update_file(self.tasks)
+        self.file_test.with_name("tasks.json.shard-done").write_text("not JSON")
+
+        self.assertEqual([task.id for task in store.iter_tasks(TaskStatus.TODO)], [3, 6, 9])
+
+    def test_range_shards_are_added_as_needed(self):
+        store = self.store(partition="range", shard_size=4)
+        store.apply_changes([Task(id=10, description="Task 10", status=TaskStatus.TODO)], [3])
+
+        self.assertEqual(json.loads(self.file_test.read_text())["shards"], ["2"])
+        self.assertEqual([task.id for task in store.load()], [10])
+
+    def test_layout_must_match(self):
+        self.store(partition="status")
+        with self.assertRaises(ValueError):
+            StoreSharded(self.file_test, partition="hash")
+        StoreJSON(self.file_test).update_file(self.tasks)
+        with self.assertRaises(ValueError):
+            StoreSharded(self.file_test, partition="status")
+
+    def test_parallel_load(self):
+        store = self.store(max_workers=2, parallel_threshold=0)
+        store.update_file(self.tasks)
+        self.assertEqual(self.store(max_workers=2, parallel_threshold=0, snapshot_cache=False).load(), self.tasks)
+        self.assertEqual(store.load(), self.tasks)
+
+    def test_commit_rebases_after_other_writer(self):
+        store, other = self.store(), self.store()
+        store.update_file(self.tasks)
+        other.load()
+
+        self.assertIsNone(store.commit([Task(id=10, description="First", status=TaskStatus.TODO)], [], {10}))
+        new_ids = other.commit([Task(id=10, description="Second", status=TaskStatus.TODO)], [], {10})
+
+        self.assertEqual(new_ids, {10: 11})
+        self.assertEqual([task.description for task in store.load()][9:], ["First", "Second"])
+
+
+class TestTrackerWithStoreSharded(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.directory = TemporaryDirectory()
+        self.store = StoreSharded(Path(self.directory.name) / "tasks.json", partition="status")
+        self.tracker = Tracker(self.store)
+
+    async def asyncTearDown(self):
+        self.store.close()
+        self.directory.cleanup()
+
+    async def test_tracker(self):
+        await self.tracker.add_task("Task 1")
+        await self.tracker.add_task("Task 2")
+        await self.tracker.mark_done(1)
+        await self.tracker.delete_task(2)
+
+        self.assertEqual(self.tracker.write_count, 4)
+        tasks = [task async for task in Tracker(self.store).iter_tasks(TaskStatus.DONE)]
+        self.assertEqual([task.id for task in tasks], [1])
+        self.assertEqual(Tracker(StoreSharded(self.store.file_path, partition="status")).tasks, self.tracker.tasks)
@@ -0,0 +1,143 @@
+import asyncio
+import datetime
+import sqlite3
+import unittest
+from pathlib import Path
+from tempfile import TemporaryDirectory
+
+from commons.store_sqlite import StoreSQLite
+from commons.task import Task
+from commons.task_status import TaskStatus
+from tracker import Tracker
+
+
+class TestStoreSQLite(unittest.TestCase):
+    def setUp(self):
+        self.directory = TemporaryDirectory()
+        self.file_test = Path(self.directory.name) / "tasks.db"
+        self.tasks = [
+            Task(id=1, description="Task 1", status=TaskStatus.TODO),
+            Task(id=2, description="Task 2", status=TaskStatus.IN_PROGRESS),
+            Task(id=3, description="Task 3", status=TaskStatus.DONE)
+        ]
+        self.store = StoreSQLite(self.file_test)
+
+    def tearDown(self):
+        self.store.close()
+        self.directory.cleanup()
+
+    def test_init_store(self):
+        self.assertTrue(self.file_test.exists())
+        self.assertEqual(self.store.load(), [])
+        self.assertEqual(self.store.last_task_id(), 0)
+
+    def test_update_file(self):
+        self.store.update_file(self.tasks)
+        self.store.update_file(self.tasks[:2])
+        self.assertEqual(self.store.load(), self.tasks[:2])
+
+    def test_apply_changes(self):
+        self.store.update_file(self.tasks)
+        updated = Task(id=2, description="Task 2 Updated", status=TaskStatus.DONE)
+        added = Task(id=4, description="Task 4", status=TaskStatus.TODO)
+        self.store.apply_changes([updated, added], [1])
+        self.assertEqual(self.store.load(), [updated, self.tasks[2], added])
+
+    def test_commit_rebases_after_other_connection(self):
+        self.store.update_file(self.tasks)
+        other = StoreSQLite(self.file_test)
+        self.addCleanup(other.close)
+
+        self.assertIsNone(self.store.commit([Task(id=4, description="First", status=TaskStatus.TODO)], [], {4}))
+        new_ids = other.commit([Task(id=4, description="Second", status=TaskStatus.TODO)], [3], {4})
+
+        self.assertEqual(new_ids, {4: 5})
+        self.assertEqual([task.description for task in self.store.load()], ["Task 1", "Task 2", "First", "Second"])
+        self.assertIsNone(other.commit([], [5]))
+
+    def test_queries(self):
+        self.store.update_file(self.tasks)
+        self.assertEqual(self.store.get_task(2), self.tasks[1])
+        self.assertIsNone(self.store.get_task(99))
+        self.assertEqual(list(self.store.iter_tasks(TaskStatus.DONE)), [self.tasks[2]])
+        self.assertEqual(self.store.last_task_id(), 3)
+
+    def test_new_fields_and_databases_created_without_them(self):
+        self.store.close()
+        self.file_test.unlink()
+        with sqlite3.connect(self.file_test) as connection:
+            connection.execute(
+                "CREATE TABLE tasks (id INTEGER PRIMARY KEY, description TEXT NOT NULL, status TEXT NOT NULL, "
+                "created_at TEXT NOT NULL, updated_at TEXT NOT NULL)"
+            )
+            connection.execute("INSERT INTO tasks VALUES (1, 'Task 1', 'todo', '2025-03-09T20:00:00', '2025-03-09T20:00:00')")
+        connection.close()
+
+        self.store = StoreSQLite(self.file_test)
+        self.assertEqual(self.store.get_task(1).tags, ())
+        tagged = Task(
+            id=2, description="Task 2", status=TaskStatus.TODO, tags=("bug", "ui"), priority=1,
+            due_at=datetime.datetime(2025, 3, 10, 9, 0), done_at=datetime.datetime(2025, 3, 9, 21, 0)
+        )
+        self.store.apply_changes([tagged], [])
+        self.assertEqual(self.store.get_task(2), tagged)
+
+    def test_query_plans_use_indexes(self):
+        plans = [
+            self.store.connection.execute(f"EXPLAIN QUERY PLAN {query}", params).fetchall()
+            for query, params in (
+                ("SELECT * FROM tasks WHERE id = ?", (1,)),
+                ("SELECT * FROM tasks WHERE status = ? ORDER BY id", ("todo",)),
+                ("SELECT * FROM tasks ORDER BY updated_at", ()),
+            )
+        ]
+        for plan in plans:
+            self.assertIn("USING", " ".join(row[-1] for row in plan))
+
+
+class TestTrackerWithStoreSQLite(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.directory = TemporaryDirectory()
+        self.store = StoreSQLite(Path(self.directory.name) / "tasks.db")
+        self.store.update_file([
+            Task(id=1, description="Task 1", status=TaskStatus.TODO),
+            Task(id=2, description="Task 2", status=TaskStatus.IN_PROGRESS)
+        ])
+        self.tracker = Tracker(self.store)
+
+    async def asyncTearDown(self):
+        self.store.close()
+        self.directory.cleanup()
+
+    async def test_tasks_are_not_loaded(self):
+        self.assertIs(self.tracker._index, self.store)
+        self.assertEqual(self.tracker._last_id, 2)
+
+    async def test_mutations_are_pushed_down(self):
+        added = await self.tracker.add_task("Task 3")
+        await self.tracker.update_task(1, "Task 1 Updated")
+        await self.tracker.mark_done(2)
+        await self.tracker.delete_task(3)
+
+        self.assertEqual(added.id, 3)
+        self.assertEqual(self.store.get_task(1).description, "Task 1 Updated")
+        self.assertEqual(self.store.get_task(2).status, TaskStatus.DONE)
+        self.assertIsNone(self.store.get_task(3))
+
+    async def test_list_tasks(self):
+        tasks = await self.tracker.list_tasks(TaskStatus.IN_PROGRESS)
+        self.assertEqual([task.id for task in tasks], [2])
+        self.assertEqual(len(await self.tracker.list_tasks()), 2)
+
+    async def test_write_behind(self):
+        tracker = Tracker(self.store, write_behind=60)
+        await asyncio.gather(tracker.add_task("Task 3"), tracker.mark_done(1), tracker.delete_task(2))
+
+        self.assertIsNone(self.store.get_task(3))
+        self.assertEqual([task.id for task in await tracker.list_tasks()], [1, 3])
+        self.assertEqual(tracker.write_count, 1)
+        self.assertEqual(self.store.get_task(1).status, TaskStatus.DONE)
+
+    async def test_missing_task(self):
+        with self.assertRaises(ValueError):
+            await self.tracker.mark_done(99)
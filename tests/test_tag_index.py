@@ -0,0 +1,87 @@
+import unittest
+from dataclasses import replace
+from pathlib import Path
+from tempfile import TemporaryDirectory
+
+from commons.tag_index import TagFilter, TagIndex
+from commons.task import Task
+from commons.task_status import TaskStatus
+
+
+class TestTagIndex(unittest.TestCase):
+    def setUp(self):
+        self.tasks = [
+            Task(1, "Task 1", TaskStatus.TODO, tags=("bug", "ui")),
+            Task(2, "Task 2", TaskStatus.DONE, tags=("bug",)),
+            Task(3, "Task 3", TaskStatus.TODO),
+            Task(4, "Task 4", TaskStatus.IN_PROGRESS, tags=("api",)),
+        ]
+
+    def select(self, index: TagIndex, status: TaskStatus | None = None, **filters) -> list[int]:
+        return sorted(index.select(status, TagFilter(**filters)))
+
+    def test_combined_filters(self):
+        index = TagIndex(self.tasks)
+
+        self.assertEqual(self.select(index), [1, 2, 3, 4])
+        self.assertEqual(self.select(index, TaskStatus.TODO), [1, 3])
+        self.assertEqual(self.select(index, tags=("bug",)), [1, 2])
+        self.assertEqual(self.select(index, tags=("bug", "ui")), [1])
+        self.assertEqual(self.select(index, any_tags=("ui", "api")), [1, 4])
+        self.assertEqual(self.select(index, TaskStatus.TODO, exclude_tags=("bug",)), [3])
+        self.assertEqual(self.select(index, tags=("missing",)), [])
+        self.assertEqual(self.select(index, exclude_tags=("missing",)), [1, 2, 3, 4])
+
+    def test_changes_match_a_rebuild(self):
+        index = TagIndex(self.tasks)
+        index.apply_change(self.tasks[0], None)
+        tagged = replace(self.tasks[2], status=TaskStatus.DONE, tags=("ui",))
+        index.apply_change(self.tasks[2], tagged)
+        # Takes the ordinal of the deleted task.
+        added = Task(5, "Task 5", TaskStatus.TODO, tags=("bug",))
+        index.apply_change(None, added)
+        # Out of ID order now, found through the dict.
+        untagged = replace(added, tags=())
+        index.apply_change(added, untagged)
+
+        expected = TagIndex([self.tasks[1], tagged, self.tasks[3], untagged])
+        self.assertEqual(len(index._ids), 4)
+        for status in (None, *TaskStatus):
+            for tag in ("bug", "ui", "api"):
+                self.assertEqual(self.select(index, status, tags=(tag,)), self.select(expected, status, tags=(tag,)))
+        self.assertEqual(index._tags.keys(), expected._tags.keys())
+
+    def test_many_tasks(self):
+        tasks = [Task(task_id, "Task", TaskStatus.TODO, tags=("even",) if task_id % 2 == 0 else ()) for task_id in range(1, 1001)]
+        index = TagIndex(tasks)
+        index.apply_change(tasks[99], replace(tasks[99], tags=()))
+
+        self.assertEqual(self.select(index, tags=("even",)), [task_id for task_id in range(2, 1001, 2) if task_id != 100])
+        self.assertEqual(len(self.select(index, exclude_tags=("even",))), 501)
+
+    def test_save_and_load(self):
+        with TemporaryDirectory() as directory:
+            path = Path(directory) / "tasks.json.tags"
+            index = TagIndex(self.tasks, signature=[[1, 2, 3]])
+            index.apply_change(self.tasks[1], None)
+            index.save(path)
+
+            loaded = TagIndex.load(path, [[1, 2, 3]])
+            self.assertEqual(self.select(loaded, tags=("bug",)), [1])
+            loaded.apply_change(None, Task(5, "Task 5", TaskStatus.DONE, tags=("bug",)))
+            loaded.apply_change(self.tasks[3], None)
+            self.assertEqual(self.select(loaded, tags=("bug",)), [1, 5])
+            self.assertEqual(self.select(loaded), [1, 3, 5])
+            self.assertIsNone(TagIndex.load(path, [[1, 2, 4]]))
+            self.assertIsNone(TagIndex.load(Path(directory) / "missing", [[1, 2, 3]]))
+
+
+class TestTagFilter(unittest.TestCase):
+    def test_matches(self):
+        tag_filter = TagFilter(tags=("bug",), any_tags=("ui", "api"), exclude_tags=("wontfix",))
+
+        self.assertTrue(tag_filter.matches(("bug", "ui")))
+        self.assertFalse(tag_filter.matches(("bug",)))
+        self.assertFalse(tag_filter.matches(("api", "bug", "wontfix")))
+        self.assertTrue(TagFilter().matches(()))
+        self.assertFalse(TagFilter())
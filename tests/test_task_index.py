@@ -0,0 +1,48 @@
+import unittest
+from dataclasses import replace
+
+from commons.task import Task
+from commons.task_index import TaskIndex
+from commons.task_status import TaskStatus
+
+
+class TestTaskIndex(unittest.TestCase):
+    def setUp(self):
+        self.tasks = [
+            Task(id=1, description="Task 1", status=TaskStatus.TODO),
+            Task(id=2, description="Task 2", status=TaskStatus.IN_PROGRESS),
+            Task(id=3, description="Task 3", status=TaskStatus.TODO)
+        ]
+        self.index = TaskIndex(self.tasks)
+
+    def test_init_index(self):
+        self.assertEqual(list(self.index.iter_tasks()), self.tasks)
+        self.assertEqual(self.index.last_task_id(), 3)
+        self.assertEqual(TaskIndex().last_task_id(), 0)
+
+    def test_get_task(self):
+        self.assertIs(self.index.get_task(2), self.tasks[1])
+        self.assertIsNone(self.index.get_task(99))
+
+    def test_iter_tasks_by_status(self):
+        self.assertEqual(list(self.index.iter_tasks(TaskStatus.TODO)), [self.tasks[0], self.tasks[2]])
+        self.assertEqual(list(self.index.iter_tasks(TaskStatus.DONE)), [])
+        self.assertEqual(self.index.count_tasks(TaskStatus.TODO), 2)
+
+    def test_apply_change_status(self):
+        before = replace(self.tasks[0])
+        self.tasks[0].status = TaskStatus.DONE
+        self.index.apply_change(before, self.tasks[0])
+
+        self.assertEqual(list(self.index.iter_tasks(TaskStatus.TODO)), [self.tasks[2]])
+        self.assertEqual(list(self.index.iter_tasks(TaskStatus.DONE)), [self.tasks[0]])
+        self.assertEqual(list(self.index.iter_tasks()), self.tasks)
+
+    def test_apply_change_add_and_delete(self):
+        new_task = Task(id=4, description="Task 4", status=TaskStatus.TODO)
+        self.index.apply_change(None, new_task)
+        self.index.apply_change(self.tasks[1], None)
+
+        self.assertEqual(list(self.index.iter_tasks()), [self.tasks[0], self.tasks[2], new_task])
+        self.assertEqual(self.index.count_tasks(TaskStatus.IN_PROGRESS), 0)
+        self.assertEqual(self.index.count_tasks(), 3)
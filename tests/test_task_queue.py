@@ -0,0 +1,73 @@
+import datetime
+import random
+import unittest
+from dataclasses import replace
+
+from commons.task import Task
+from commons.task_queue import TaskQueue, is_open, urgency
+from commons.task_status import TaskStatus
+
+
+class TestTaskQueue(unittest.TestCase):
+    def setUp(self):
+        self.now = datetime.datetime(2025, 3, 9, 12, 0)
+        self.tasks = [
+            Task(1, "Task 1", TaskStatus.TODO),
+            Task(2, "Task 2", TaskStatus.TODO, priority=1, due_at=self.now + datetime.timedelta(days=2)),
+            Task(3, "Task 3", TaskStatus.IN_PROGRESS, priority=1, due_at=self.now - datetime.timedelta(days=1)),
+            Task(4, "Task 4", TaskStatus.DONE, priority=5, due_at=self.now - datetime.timedelta(days=3)),
+            Task(5, "Task 5", TaskStatus.TODO, due_at=self.now - datetime.timedelta(hours=1)),
+        ]
+
+    def test_next_and_overdue(self):
+        queue = TaskQueue(self.tasks)
+
+        self.assertEqual(queue.next(10), [3, 2, 5, 1])
+        self.assertEqual(queue.next(2), [3, 2])
+        self.assertEqual(queue.next(0), [])
+        self.assertEqual(queue.overdue(self.now), [3, 5])
+        self.assertEqual(queue.overdue(self.now, limit=1), [3])
+
+    def test_changes_invalidate_entries(self):
+        queue = TaskQueue(self.tasks)
+        queue.apply_change(self.tasks[2], replace(self.tasks[2], status=TaskStatus.DONE))
+        queue.apply_change(self.tasks[0], replace(self.tasks[0], priority=3))
+        queue.apply_change(self.tasks[4], None)
+        self.assertEqual(queue.next(10), [1, 2])
+        self.assertEqual(queue.overdue(self.now), [])
+
+        # Back to an entry still in the heap, which is then met twice.
+        queue.apply_change(self.tasks[0], replace(self.tasks[0], priority=None))
+        queue.apply_change(self.tasks[0], replace(self.tasks[0], priority=3))
+        self.assertEqual(queue.next(10), [1, 2])
+
+    def test_random_changes_match_a_sort(self):
+        generator = random.Random(7)
+        tasks = {}
+        queue = TaskQueue()
+        for step in range(3000):
+            task_id = generator.randint(1, 200)
+            before = tasks.get(task_id)
+            if before is not None and generator.random() < 0.2:
+                after = None
+            else:
+                after = Task(
+                    task_id,
+                    "Task",
+                    generator.choice(list(TaskStatus)),
+                    priority=generator.choice([None, 0, 1, 2]),
+                    due_at=generator.choice([None, self.now + datetime.timedelta(hours=generator.randint(-48, 48))]),
+                )
+            queue.apply_change(before, after)
+            if after is None:
+                del tasks[task_id]
+            else:
+                tasks[task_id] = after
+            if step % 100 == 0:
+                open_tasks = [task for task in tasks.values() if is_open(task)]
+                expected = [task.id for task in sorted(open_tasks, key=urgency)]
+                self.assertEqual(queue.next(10), expected[:10])
+                overdue = sorted((task.due_at, task.id) for task in open_tasks if task.due_at and task.due_at < self.now)
+                self.assertEqual(queue.overdue(self.now), [task_id for _, task_id in overdue])
+        # Stale entries are dropped once they outnumber the live ones.
+        self.assertLessEqual(len(queue._urgent), 2 * len(queue._keys) + 65)
@@ -0,0 +1,60 @@
+import datetime
+import unittest
+from dataclasses import replace
+from pathlib import Path
+from tempfile import TemporaryDirectory
+
+from commons.task import Task
+from commons.task_stats import TaskStats
+from commons.task_status import TaskStatus
+
+
+class TestTaskStats(unittest.TestCase):
+    def setUp(self):
+        self.day = datetime.datetime(2025, 3, 9, 9, 0)
+        self.tasks = [
+            Task(1, "Task 1", TaskStatus.TODO, self.day, self.day),
+            Task(2, "Task 2", TaskStatus.DONE, self.day, self.day + datetime.timedelta(hours=1)),
+            Task(3, "Task 3", TaskStatus.DONE, self.day, self.day + datetime.timedelta(days=1)),
+            Task(4, "Task 4", TaskStatus.DONE, self.day, self.day + datetime.timedelta(days=2)),
+        ]
+
+    def test_counts(self):
+        stats = TaskStats(self.tasks)
+
+        self.assertEqual(stats.status_counts, {TaskStatus.TODO: 1, TaskStatus.IN_PROGRESS: 0, TaskStatus.DONE: 3})
+        self.assertEqual(stats.created_per_day, {self.day.date(): 4})
+        self.assertEqual(
+            stats.done_per_day,
+            {self.day.date() + datetime.timedelta(days=offset): 1 for offset in range(3)}
+        )
+        median = stats.median_time_to_done()
+        self.assertAlmostEqual(median / datetime.timedelta(days=1), 1, delta=0.05)
+        self.assertIsNone(TaskStats(self.tasks[:1]).median_time_to_done())
+
+    def test_changes_match_a_recount(self):
+        stats = TaskStats(self.tasks)
+        done = replace(self.tasks[0], status=TaskStatus.DONE, updated_at=self.day + datetime.timedelta(days=5))
+        stats.apply_change(self.tasks[0], done)
+        stats.apply_change(self.tasks[3], None)
+        added = Task(5, "Task 5", TaskStatus.IN_PROGRESS, self.day, self.day)
+        stats.apply_change(None, added)
+
+        expected = TaskStats([done, *self.tasks[1:3], added])
+        self.assertEqual(stats.status_counts, expected.status_counts)
+        self.assertEqual(stats.created_per_day, expected.created_per_day)
+        self.assertEqual(stats.done_per_day, expected.done_per_day)
+        self.assertEqual(stats._durations, expected._durations)
+
+    def test_save_and_load(self):
+        with TemporaryDirectory() as directory:
+            path = Path(directory) / "tasks.json.stats"
+            stats = TaskStats(self.tasks, signature=[[1, 2, 3]])
+            stats.save(path)
+
+            loaded = TaskStats.load(path, [[1, 2, 3]])
+            self.assertEqual(loaded.status_counts, stats.status_counts)
+            self.assertEqual(loaded.done_per_day, stats.done_per_day)
+            self.assertEqual(loaded.median_time_to_done(), stats.median_time_to_done())
+            self.assertIsNone(TaskStats.load(path, [[1, 2, 4]]))
+            self.assertIsNone(TaskStats.load(Path(directory) / "missing", [[1, 2, 3]]))
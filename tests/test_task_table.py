@@ -0,0 +1,106 @@
+import unittest
+from dataclasses import replace
+from pathlib import Path
+from tempfile import TemporaryDirectory
+
+from commons.store import StoreJSON
+from commons.task import Task
+from commons.task_status import TaskStatus
+from commons.task_table import TaskTable
+from tracker import Tracker
+
+
+class TestTaskTable(unittest.TestCase):
+    def setUp(self):
+        self.tasks = [
+            Task(id=1, description="Task 1", status=TaskStatus.TODO),
+            Task(id=2, description="Task 2", status=TaskStatus.IN_PROGRESS),
+            Task(id=3, description="Task 3", status=TaskStatus.TODO)
+        ]
+        self.table = TaskTable(self.tasks)
+
+    def test_init_table(self):
+        self.assertEqual(list(self.table.iter_tasks()), self.tasks)
+        self.assertEqual(self.table.last_task_id(), 3)
+        self.assertEqual(TaskTable().last_task_id(), 0)
+
+    def test_get_task_materializes(self):
+        task = self.table.get_task(2)
+        self.assertEqual(task, self.tasks[1])
+        self.assertIsNot(task, self.tasks[1])
+        self.assertIsNone(self.table.get_task(99))
+
+    def test_iter_tasks_by_status(self):
+        self.assertEqual(list(self.table.iter_tasks(TaskStatus.TODO)), [self.tasks[0], self.tasks[2]])
+        self.assertEqual(list(self.table.iter_tasks(TaskStatus.DONE)), [])
+        self.assertEqual(self.table.count_tasks(TaskStatus.TODO), 2)
+
+    def test_apply_change(self):
+        before = self.table.get_task(1)
+        after = replace(before, description="Task 1 Updated", status=TaskStatus.DONE, done_at=before.updated_at)
+        self.table.apply_change(before, after)
+        self.table.apply_change(self.tasks[1], None)
+        new_task = Task(id=4, description="Task 4", status=TaskStatus.TODO)
+        self.table.apply_change(None, new_task)
+
+        self.assertEqual(list(self.table.iter_tasks()), [after, self.tasks[2], new_task])
+        self.assertEqual(list(self.table.iter_tasks(TaskStatus.DONE)), [after])
+        self.assertEqual(self.table.count_tasks(TaskStatus.IN_PROGRESS), 0)
+        self.assertEqual(self.table.count_tasks(), 3)
+
+    def test_reclaims_deleted_rows(self):
+        table = TaskTable(Task(id=task_id, description="Task", status=TaskStatus.TODO) for task_id in range(1, 201))
+        for task_id in range(1, 151):
+            table.apply_change(table.get_task(task_id), None)
+
+        self.assertLess(len(table._ids), 200)
+        self.assertEqual([task.id for task in table.iter_tasks(TaskStatus.TODO)], list(range(151, 201)))
+        self.assertEqual(table.get_task(200).id, 200)
+
+    def test_out_of_order_ids(self):
+        table = TaskTable(self.tasks)
+        late = Task(id=0, description="Task 0", status=TaskStatus.DONE)
+        table.apply_change(None, late)
+        table.apply_change(self.tasks[0], None)
+
+        self.assertEqual(table.get_task(0), late)
+        self.assertIsNone(table.get_task(1))
+        self.assertEqual(table.get_task(3), self.tasks[2])
+        self.assertEqual(table.last_task_id(), 3)
+
+    def test_intern_descriptions(self):
+        table = TaskTable(
+            [Task(id=1, description="".join(["sha", "red"]), status=TaskStatus.TODO),
+             Task(id=2, description="".join(["shar", "ed"]), status=TaskStatus.TODO)],
+            intern_descriptions=True
+        )
+        self.assertIs(table.get_task(1).description, table.get_task(2).description)
+
+
+class TestTrackerCompact(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.directory = TemporaryDirectory()
+        self.store = StoreJSON(Path(self.directory.name) / "tasks.json")
+        self.store.update_file([
+            Task(id=1, description="Task 1", status=TaskStatus.TODO),
+            Task(id=2, description="Task 2", status=TaskStatus.IN_PROGRESS)
+        ])
+        self.tracker = Tracker(self.store, compact=True)
+
+    async def asyncTearDown(self):
+        self.directory.cleanup()
+
+    async def test_mutations(self):
+        added = await self.tracker.add_task("Task 3")
+        await self.tracker.update_task(1, "Task 1 Updated")
+        await self.tracker.mark_done(2)
+        await self.tracker.delete_task(3)
+
+        self.assertIsInstance(self.tracker._index, TaskTable)
+        self.assertEqual(added.id, 3)
+        tasks = Tracker(self.store).tasks
+        self.assertEqual([(task.id, task.description, task.status) for task in tasks], [
+            (1, "Task 1 Updated", TaskStatus.TODO),
+            (2, "Task 2", TaskStatus.DONE),
+        ])
+        self.assertEqual(await self.tracker.list_tasks(TaskStatus.DONE), tasks[1:])
@@ -1,6 +1,14 @@
+import asyncio
+import datetime
+import multiprocessing
+import threading
 import unittest
 from pathlib import Path
+from tempfile import TemporaryDirectory
+from unittest.mock import call, patch
 
+from commons.archive import TaskArchive
+from commons.change_feed import ChangeFeed
 from commons.store import StoreJSON
 from commons.task import Task
 from commons.task_status import TaskStatus
@@ -19,8 +27,12 @@ class TestTracker(unittest.IsolatedAsyncioTestCase):
         self.tracker = Tracker(self.store)
 
     async def asyncTearDown(self):
-        self.store.file_path.unlink(True)
-        Path("test_store2.json").unlink(True)
+        for name in ("test_store.json", "test_store2.json"):
+            Path(name).unlink(True)
+            Path(f"{name}.lock").unlink(True)
+            Path(f"{name}.cache").unlink(True)
+            Path(f"{name}.search").unlink(True)
+            Path(f"{name}.tags").unlink(True)
 
     def test_init_tracker_without_tasks(self):
         store = StoreJSON(Path("test_store2.json"))
@@ -73,6 +85,45 @@ class TestTracker(unittest.IsolatedAsyncioTestCase):
         for done_task in done_tasks:
             self.assertEqual(done_task.status, TaskStatus.DONE)
 
+    async def test_list_tasks_sorted_and_paginated(self):
+        start = datetime.datetime(2025, 3, 9, 20, 0)
+        tasks = [
+            Task(id=task_id, description=f"Task {task_id}", status=TaskStatus.TODO,
+                 created_at=start + datetime.timedelta(minutes=task_id), updated_at=start)
+            for task_id in range(1, 6)
+        ]
+        self.store.update_file(tasks)
+        tracker = Tracker(self.store)
+        await tracker.update_task(2, "Task 2 Updated")
+        await tracker.mark_done(4)
+
+        async def ids(**options):
+            return [task.id for task in await tracker.list_tasks(**options)]
+
+        self.assertEqual(await ids(sort="updated_at", descending=True, limit=2), [4, 2])
+        self.assertEqual(await ids(status=TaskStatus.TODO, sort="updated_at", descending=True, limit=1), [2])
+        self.assertEqual(await ids(sort="id", descending=True, offset=1, limit=2), [4, 3])
+        self.assertEqual(await ids(offset=3), [4, 5])
+        since, until = start + datetime.timedelta(minutes=2), start + datetime.timedelta(minutes=4)
+        self.assertEqual(await ids(since=since, until=until), [2, 3, 4])
+        self.assertEqual(await ids(sort="id", descending=True, since=since, until=until, limit=2), [4, 3])
+        self.assertEqual(await ids(sort="updated_at", since=start + datetime.timedelta(seconds=1)), [2, 4])
+
+        # Built once, then maintained by every change.
+        await tracker.delete_task(3)
+        self.assertEqual(await ids(sort="created_at", descending=True, limit=2), [5, 4])
+        self.assertEqual(set(tracker._sort_indexes), {"updated_at", "id", "created_at"})
+
+    async def test_iter_tasks_streams_without_loading(self):
+        tracker = Tracker(self.store)
+        tasks = [task async for task in tracker.iter_tasks(TaskStatus.DONE)]
+        self.assertEqual(tasks, self.tasks[2:])
+        self.assertNotIn("_index", vars(tracker))
+
+        await tracker.mark_done(1)
+        tasks = [task async for task in tracker.iter_tasks(TaskStatus.DONE)]
+        self.assertEqual([task.id for task in tasks], [3, 1])
+
     async def test_change_status(self):
         task = await self.tracker.change_status(1, TaskStatus.IN_PROGRESS)
         self.assertEqual(task.status, TaskStatus.IN_PROGRESS)
@@ -90,3 +141,374 @@ class TestTracker(unittest.IsolatedAsyncioTestCase):
         self.assertEqual(task.status, TaskStatus.DONE)
         self.assertNotEqual(task.updated_at, task.created_at)
         self.assertGreater(task.updated_at, task.created_at)
+
+    async def test_apply_batch_writes_once(self):
+        with patch.object(self.store, "commit", wraps=self.store.commit) as commit:
+            results = await self.tracker.apply_batch([
+                {"action": "add", "description": "Task 4"},
+                {"action": "update", "task_id": 4, "description": "Task 4 Updated"},
+                {"action": "mark-done", "task_id": 1},
+                {"action": "delete", "task_id": 2},
+                {"action": "mark-in-progress", "task_id": 99},
+                {"action": "archive", "task_id": 3},
+                {"action": "update", "task_id": 3},
+            ])
+
+        commit.assert_called_once()
+        self.assertEqual(results[0].id, 4)
+        self.assertEqual(results[1].description, "Task 4 Updated")
+        self.assertEqual(results[2].status, TaskStatus.DONE)
+        for error in results[4:]:
+            self.assertIsInstance(error, ValueError)
+        self.assertEqual([task.id for task in Tracker(self.store).tasks], [1, 3, 4])
+
+    async def test_bulk_helpers(self):
+        added = await self.tracker.add_tasks(["Task 4", "Task 5"])
+        done = await self.tracker.mark_done_many([4, 5])
+        deleted = await self.tracker.delete_tasks([1, 99])
+
+        self.assertEqual([task.id for task in added], [4, 5])
+        self.assertTrue(all(task.status == TaskStatus.DONE for task in done))
+        self.assertEqual(deleted[0].id, 1)
+        self.assertIsInstance(deleted[1], ValueError)
+        self.assertEqual([task.id for task in Tracker(self.store).tasks], [2, 3, 4, 5])
+
+    async def test_concurrent_processes_do_not_lose_updates(self):
+        processes = [
+            multiprocessing.get_context("fork").Process(target=_add_and_complete, args=(self.store.file_path, worker))
+            for worker in range(4)
+        ]
+        for process in processes:
+            process.start()
+        for process in processes:
+            await asyncio.to_thread(process.join)
+
+        tasks = self.store.load()
+        self.assertEqual(len(tasks), 3 + 4 * 10)
+        self.assertEqual(len({task.id for task in tasks}), len(tasks))
+        self.assertEqual(sum(task.status == TaskStatus.DONE for task in tasks), 1 + 4 * 10)
+
+    async def test_write_behind_coalesces_concurrent_mutations(self):
+        tracker = Tracker(self.store, write_behind=0.05)
+        await asyncio.gather(*(tracker.add_task(f"Task {number}") for number in range(4, 14)))
+        await asyncio.gather(tracker.mark_done(1), tracker.delete_task(2))
+
+        self.assertEqual(tracker.write_count, 0)
+        self.assertEqual(len(self.store.load()), 3)
+        await asyncio.sleep(0.1)
+        self.assertEqual(tracker.write_count, 1)
+        self.assertEqual(self.store.load(), tracker.tasks)
+
+        await tracker.update_task(3, "Task 3 Updated")
+        await tracker.flush()
+        self.assertEqual(tracker.write_count, 2)
+        self.assertEqual(self.store.load()[1].description, "Task 3 Updated")
+
+    async def test_archive_tasks(self):
+        directory = TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        archive = TaskArchive(Path(directory.name) / "archive.gz")
+        self.tasks[2].updated_at -= datetime.timedelta(days=40)
+        self.store.update_file(self.tasks)
+        tracker = Tracker(self.store, archive=archive)
+        await tracker.mark_done(1)
+
+        archived = await tracker.archive_tasks(datetime.timedelta(days=30))
+        self.assertEqual([task.id for task in archived], [3])
+        self.assertEqual([task.id for task in self.store.load()], [1, 2])
+        self.assertEqual([task.id for task in archive.iter_tasks()], [3])
+
+        # Listings and lookups fall through to the archive.
+        tracker = Tracker(self.store, archive=archive)
+        self.assertEqual([task.id async for task in tracker.iter_tasks(TaskStatus.DONE)], [1, 3])
+        self.assertEqual([task.id for task in await tracker.list_tasks(TaskStatus.DONE)], [1, 3])
+        self.assertEqual([task.id for task in await tracker.list_tasks(sort="id", descending=True, limit=2)], [3, 2])
+        self.assertEqual([task.id for task in await tracker.list_tasks(TaskStatus.TODO)], [])
+        await tracker.delete_task(1)
+        self.assertEqual((await tracker.add_task("Task 4")).id, 4)
+
+        # A task that changes again is brought back from the archive.
+        await tracker.mark_in_progress(3)
+        self.assertEqual([task.id for task in self.store.load()], [2, 4, 3])
+        self.assertEqual(list(TaskArchive(archive.path).iter_tasks()), [])
+        self.assertEqual([task.id for task in await tracker.list_tasks()], [2, 4, 3])
+
+    async def test_archive_ages_tasks_from_when_they_were_done(self):
+        directory = TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        archive = TaskArchive(Path(directory.name) / "archive.gz")
+        self.tasks[2].done_at = self.tasks[2].updated_at - datetime.timedelta(days=40)
+        self.store.update_file(self.tasks)
+        tracker = Tracker(self.store, archive=archive)
+        await tracker.update_task(3, "Task 3 Updated")
+
+        archived = await tracker.archive_tasks(datetime.timedelta(days=30))
+        self.assertEqual([task.id for task in archived], [3])
+        self.assertEqual(await Tracker(self.store, archive=archive).archive_tasks(datetime.timedelta.max), [])
+
+    async def test_changes_made_during_a_write_are_not_written_by_it(self):
+        started, release, written = threading.Event(), threading.Event(), []
+        commit = StoreJSON.commit
+
+        def blocking_commit(store, upserts, deletes, created=(), tasks=None):
+            started.set()
+            release.wait(5)
+            written.append([task.description for task in tasks])
+            return commit(store, upserts, deletes, created, tasks)
+
+        tracker = Tracker(self.store, write_behind=60)
+        await tracker.update_task(1, "Task 1 Updated")
+        with patch.object(StoreJSON, "commit", autospec=True, side_effect=blocking_commit):
+            flushing = asyncio.create_task(tracker.flush())
+            await asyncio.to_thread(started.wait, 5)
+            # Changes the task the worker thread is writing, in place.
+            await tracker.update_task(2, "Task 2 Updated")
+            release.set()
+            await flushing
+            await tracker.flush()
+
+        self.assertEqual(written, [
+            ["Task 1 Updated", "Task 2", "Task 3"],
+            ["Task 1 Updated", "Task 2 Updated", "Task 3"],
+        ])
+
+    async def test_flush_archives_after_the_configured_age(self):
+        directory = TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        archive = TaskArchive(Path(directory.name) / "archive.xz")
+        tracker = Tracker(self.store, archive=archive, archive_after=datetime.timedelta(0))
+        await tracker.mark_done(2)
+        await tracker.flush()
+
+        self.assertEqual([task.id for task in self.store.load()], [1])
+        self.assertEqual([task.id for task in archive.iter_tasks()], [2, 3])
+
+    async def test_watch_follows_the_changes_written(self):
+        directory = TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        changes = ChangeFeed(Path(directory.name) / "changes")
+        archive = TaskArchive(Path(directory.name) / "archive.gz")
+        self.tasks[2].updated_at -= datetime.timedelta(days=40)
+        self.store.update_file(self.tasks)
+        tracker = Tracker(self.store, archive=archive, changes=changes)
+        self.assertEqual(tracker.sequence(), 0)
+
+        await tracker.add_task("Task 4")
+        await tracker.update_task(1, "Task 1 Updated")
+        async with tracker.batch():
+            await tracker.delete_task(2)
+            await tracker.mark_done(4)
+        await tracker.archive_tasks(datetime.timedelta(days=30))
+        await tracker.mark_in_progress(3)
+
+        self.assertEqual(tracker.sequence(), 7)
+        events = tracker.watch(0, interval=0.01)
+        seen = [await asyncio.wait_for(anext(events), 5) for _ in range(7)]
+        await events.aclose()
+        self.assertEqual([event["seq"] for event in seen], [1, 2, 3, 4, 5, 6, 7])
+        # Task 3 is brought back from the archive as it was, then changed.
+        self.assertEqual(
+            [(event["op"], event["id"]) for event in seen],
+            [("create", 4), ("update", 1), ("update", 4), ("delete", 2), ("archive", 3), ("update", 3), ("update", 3)]
+        )
+        self.assertEqual(seen[1]["task"]["description"], "Task 1 Updated")
+        self.assertEqual([event["task"]["status"] for event in seen[5:]], ["done", "in-progress"])
+        with self.assertRaises(ValueError):
+            Tracker(self.store).sequence()
+
+    async def test_stats_are_kept_up_to_date_and_saved(self):
+        directory = TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        archive = TaskArchive(Path(directory.name) / "archive.gz")
+        self.addCleanup(Path("test_store.json.stats").unlink, True)
+        self.tasks[2].updated_at -= datetime.timedelta(days=40)
+        self.store.update_file(self.tasks)
+        tracker = Tracker(self.store, archive=archive)
+        stats = await tracker.stats()
+        self.assertEqual(stats.status_counts[TaskStatus.DONE], 1)
+
+        async with tracker.batch():
+            await tracker.add_task("Task 4")
+            await tracker.mark_done(1)
+            await tracker.delete_task(2)
+        await tracker.archive_tasks(datetime.timedelta(days=30))
+        await tracker.flush()
+
+        # Reloaded from the saved stats, without scanning the tasks, and archived tasks still count.
+        tracker = Tracker(self.store, archive=archive)
+        with patch.object(Tracker, "iter_tasks", side_effect=AssertionError):
+            stats = await tracker.stats()
+        expected = {TaskStatus.TODO: 1, TaskStatus.IN_PROGRESS: 0, TaskStatus.DONE: 2}
+        self.assertEqual(stats.status_counts, expected)
+        self.assertEqual(sum(stats.created_per_day.values()), 3)
+        self.assertEqual(stats.done_per_day, {datetime.date.today(): 1, self.tasks[2].updated_at.date(): 1})
+
+        # A change made by a tracker that did not load them, then one made elsewhere.
+        tracker = Tracker(self.store, archive=archive)
+        await tracker.mark_in_progress(4)
+        await tracker.flush()
+        with patch.object(Tracker, "iter_tasks", side_effect=AssertionError):
+            stats = await Tracker(self.store, archive=archive).stats()
+        self.assertEqual(stats.status_counts[TaskStatus.IN_PROGRESS], 1)
+        self.store.update_file([])
+        stats = await Tracker(self.store, archive=archive).stats()
+        self.assertEqual(stats.status_counts, {TaskStatus.TODO: 0, TaskStatus.IN_PROGRESS: 0, TaskStatus.DONE: 1})
+
+    async def test_edits_do_not_move_the_stats_of_a_done_task(self):
+        self.addCleanup(Path("test_store.json.stats").unlink, True)
+        self.tasks[2].created_at -= datetime.timedelta(days=10)
+        self.tasks[2].updated_at = self.tasks[2].done_at = self.tasks[2].created_at + datetime.timedelta(days=3)
+        self.store.update_file(self.tasks)
+        tracker = Tracker(self.store)
+        before = await tracker.stats()
+        done_per_day, median = dict(before.done_per_day), before.median_time_to_done()
+
+        await tracker.update_task(3, "Task 3 Updated")
+        await tracker.tag_task(3, ["later"])
+        task = await tracker.mark_done(3)
+        stats = await tracker.stats()
+        self.assertEqual(stats.done_per_day, done_per_day)
+        self.assertEqual(stats.median_time_to_done(), median)
+        self.assertEqual(task.done_at, self.tasks[2].done_at)
+
+        self.assertIsNone((await tracker.mark_in_progress(3)).done_at)
+        task = await tracker.mark_done(3)
+        self.assertEqual(task.done_at, task.updated_at)
+        self.assertEqual((await tracker.stats()).done_per_day, {datetime.date.today(): 1})
+
+    async def test_search(self):
+        await self.tracker.update_task(2, "Write the quarterly report")
+        await self.tracker.add_task("Review report drafts")
+
+        self.assertEqual([task.id for task in await self.tracker.search("report")], [2, 4])
+        self.assertEqual([task.id for task in await self.tracker.search("rep", TaskStatus.TODO)], [4])
+        self.assertEqual([task.id for task in await self.tracker.search("report", limit=1)], [2])
+        self.assertEqual(await self.tracker.search("missing"), [])
+
+    async def test_search_index_is_saved_and_kept_up_to_date(self):
+        await self.tracker.search("task")
+        self.assertTrue(Path("test_store.json.search").exists())
+
+        # Another process changes a task through the saved index, then saves it on flush.
+        other = Tracker(StoreJSON(Path("test_store.json")))
+        await other.update_task(1, "Buy groceries")
+        await other.flush()
+        with patch("tracker.SearchIndex.apply_change") as apply_change:
+            tracker = Tracker(StoreJSON(Path("test_store.json")))
+            self.assertEqual([task.id for task in await tracker.search("groceries")], [1])
+        apply_change.assert_not_called()
+
+        # A write that did not maintain the index makes it stale, and it is rebuilt.
+        self.store.update_file([Task(id=1, description="Walk the dog", status=TaskStatus.TODO)])
+        tracker = Tracker(StoreJSON(Path("test_store.json")))
+        self.assertEqual(await tracker.search("groceries"), [])
+        self.assertEqual([task.id for task in await tracker.search("dog")], [1])
+
+    async def test_tags_filter_listings(self):
+        directory = TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        tracker = Tracker(self.store, archive=TaskArchive(Path(directory.name) / "archive.gz"))
+        await tracker.tag_task(1, ["bug", "ui"])
+        await tracker.tag_task(2, ["bug"])
+        await tracker.tag_task(3, ["ui"])
+        await tracker.add_task("Task 4", ["bug", "api", "bug"])
+        task = await tracker.untag_task(1, ["ui", "missing"])
+        self.assertEqual(task.tags, ("bug",))
+        with self.assertRaises(ValueError):
+            await tracker.tag_task(1, ["two words"])
+
+        async def ids(**filters):
+            return [task.id for task in await tracker.list_tasks(**filters)]
+
+        self.assertEqual(await ids(tags=["bug"]), [1, 2, 4])
+        self.assertEqual(await ids(tags=["bug", "api"]), [4])
+        self.assertEqual(await ids(any_tags=["api", "ui"]), [3, 4])
+        self.assertEqual(await ids(exclude_tags=["bug"]), [3])
+        self.assertEqual(await ids(status=TaskStatus.TODO, tags=["bug"], exclude_tags=["api"]), [1])
+        self.assertEqual(await ids(tags=["bug"], sort="id", descending=True, limit=2), [4, 2])
+        self.assertEqual(await ids(tags=["nothing"]), [])
+
+        # Archived tasks are filtered by their own tags, and keep them in the archive.
+        tracker.tasks[2].updated_at -= datetime.timedelta(days=40)
+        await tracker.archive_tasks(datetime.timedelta(days=30))
+        self.assertEqual(await ids(any_tags=["ui", "api"]), [4, 3])
+        self.assertEqual(await ids(status=TaskStatus.DONE, tags=["ui"]), [3])
+
+        restored = await tracker.tag_task(3, ["later"])
+        self.assertEqual(restored.tags, ("later", "ui"))
+        self.assertEqual(await ids(tags=["later"]), [3])
+        self.assertEqual(Tracker(self.store).tasks[-1].tags, ("later", "ui"))
+
+    async def test_tag_index_is_saved_and_kept_up_to_date(self):
+        await self.tracker.tag_task(1, ["bug"])
+        self.assertEqual([task.id for task in await self.tracker.list_tasks(tags=["bug"])], [1])
+        self.assertTrue(Path("test_store.json.tags").exists())
+
+        # Another process changes the tags through the saved index, then saves it on flush.
+        other = Tracker(StoreJSON(Path("test_store.json")))
+        await other.tag_task(2, ["bug"])
+        await other.mark_done(1)
+        await other.flush()
+        with patch("tracker.TagIndex.__post_init__") as build:
+            tracker = Tracker(StoreJSON(Path("test_store.json")))
+            self.assertEqual([task.id for task in await tracker.list_tasks(tags=["bug"])], [1, 2])
+            self.assertEqual([task.id for task in await tracker.list_tasks(TaskStatus.DONE, tags=["bug"])], [1])
+        # Only for the empty index load() fills in.
+        self.assertEqual(build.call_args_list, [call(())])
+
+        # A write that did not maintain the index makes it stale, and it is rebuilt.
+        self.store.update_file([Task(id=1, description="Task 1", status=TaskStatus.TODO, tags=("ui",))])
+        tracker = Tracker(StoreJSON(Path("test_store.json")))
+        self.assertEqual(await tracker.list_tasks(tags=["bug"]), [])
+        self.assertEqual([task.id for task in await tracker.list_tasks(tags=["ui"])], [1])
+
+
+    async def test_import_tasks_numbers_them_after_the_last_id(self):
+        day = datetime.datetime(2025, 3, 9, 9, 0)
+        imported = [
+            Task(0, "Imported 1", TaskStatus.DONE, day, day, ("bug",)),
+            Task(0, "Imported 2", TaskStatus.TODO, day, day, priority=1),
+        ]
+        tasks = await self.tracker.import_tasks(imported)
+
+        self.assertEqual([task.id for task in tasks], [4, 5])
+        self.assertEqual(self.tracker.write_count, 1)
+        self.assertEqual(Tracker(self.store).tasks, self.tasks + tasks)
+        self.assertEqual((await self.tracker.list_tasks(tags=["bug"]))[0].created_at, day)
+        self.assertEqual(await self.tracker.import_tasks([]), [])
+
+    async def test_next_and_overdue_tasks(self):
+        past = datetime.datetime.now() - datetime.timedelta(days=1)
+        await self.tracker.set_priority(1, 2)
+        await self.tracker.add_task("Task 4", priority=2, due_at=past)
+        await self.tracker.set_due(2, past - datetime.timedelta(days=1))
+        with self.assertRaises(ValueError):
+            await self.tracker.set_priority(1, "high")
+
+        self.assertEqual([task.id for task in await self.tracker.next_tasks(3)], [4, 1, 2])
+        self.assertEqual([task.id for task in await self.tracker.overdue_tasks()], [2, 4])
+
+        # Maintained by the changes, without sorting the tasks again.
+        with patch("tracker.TaskQueue.__post_init__", side_effect=AssertionError):
+            await self.tracker.mark_done(4)
+            await self.tracker.set_priority(1, None)
+            await self.tracker.delete_task(2)
+            await self.tracker.add_task("Task 5", priority=1)
+            self.assertEqual([task.id for task in await self.tracker.next_tasks(5)], [5, 1])
+            self.assertEqual(await self.tracker.overdue_tasks(), [])
+
+        tracker = Tracker(StoreJSON(Path("test_store.json")))
+        self.assertEqual([(task.id, task.priority) for task in await tracker.next_tasks(1)], [(5, 1)])
+        self.assertEqual((await tracker.list_tasks(status=TaskStatus.DONE))[-1].due_at, past)
+
+
+
+def _add_and_complete(file_path: Path, worker: int) -> None:
+    async def run():
+        for number in range(10):
+            # A fresh tracker per task, as a cron job invoking the command line would.
+            tracker = Tracker(StoreJSON(file_path))
+            task = await tracker.add_task(f"Worker {worker} task {number}")
+            await tracker.mark_done(task.id)
+
+    asyncio.run(run())
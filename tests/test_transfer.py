@@ -0,0 +1,89 @@
+import datetime
+import unittest
+from dataclasses import replace
+from io import BytesIO, StringIO
+
+from commons.task import Task
+from commons.task_status import TaskStatus
+from commons.transfer import TaskTransfer, detect_format
+
+
+class TestTaskTransfer(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        day = datetime.datetime(2025, 3, 9, 9, 0)
+        self.tasks = [
+            Task(1, 'Fix "login",\nthen deploy', TaskStatus.TODO, day, day, ("bug", "ui"), 2, day + datetime.timedelta(days=1)),
+            Task(2, "Write docs", TaskStatus.DONE, day, day + datetime.timedelta(hours=2), done_at=day + datetime.timedelta(hours=1)),
+            Task(3, "Ünïcode ✓", TaskStatus.IN_PROGRESS, day, day, priority=0),
+        ]
+
+    async def parse(self, transfer: TaskTransfer, data: bytes | str) -> tuple[list[Task], list[tuple[int, str]], int]:
+        tasks, errors, chunks = [], [], 0
+        async for chunk_tasks, chunk_errors, _ in transfer.parse(BytesIO(data) if isinstance(data, bytes) else StringIO(data)):
+            tasks += chunk_tasks
+            errors += chunk_errors
+            chunks += 1
+        return tasks, errors, chunks
+
+    async def test_round_trip_in_small_chunks(self):
+        for format in ("ndjson", "csv"):
+            with self.subTest(format=format):
+                transfer = TaskTransfer(format, chunk_size=16, max_workers=1)
+                text = transfer.header() + transfer.encode(self.tasks[:2]) + transfer.encode(self.tasks[2:])
+
+                tasks, errors, chunks = await self.parse(transfer, text.encode())
+
+                self.assertEqual(tasks, [replace(task, id=0) for task in self.tasks])
+                self.assertEqual(errors, [])
+                # A chunk per record: the line break quoted in the first one never ends a chunk.
+                self.assertEqual(chunks, 3)
+
+    async def test_invalid_records_are_reported_by_line(self):
+        ndjson = (
+            b'{"description": "Task 1", "tags": ["bug"]}\n'
+            b'\n'
+            b'{"description": \n'
+            b'{"status": "todo"}\n'
+            b'{"description": "Task 5", "status": "blocked"}\n'
+            b'{"description": "Task 6", "tags": ["two words"]}\n'
+            b'{"description": "Task 7", "priority": "high"}\n'
+            b'{"description": "\xff"}\n'
+            b'{"description": "Task 9", "due_at": "2025-03-10T17:00:00+00:00"}'
+        )
+        tasks, errors, _ = await self.parse(TaskTransfer("ndjson", chunk_size=64, max_workers=1), ndjson)
+
+        self.assertEqual([task.description for task in tasks], ["Task 1", "Task 9"])
+        self.assertEqual(tasks[0].status, TaskStatus.TODO)
+        self.assertEqual(tasks[0].updated_at, tasks[0].created_at)
+        self.assertEqual(tasks[1].due_at, datetime.datetime(2025, 3, 10, 17, 0, tzinfo=datetime.timezone.utc).astimezone().replace(tzinfo=None))
+        self.assertEqual([line for line, _ in errors], [3, 4, 5, 6, 7, 8])
+        self.assertTrue(errors[0][1].startswith("Invalid JSON"))
+        self.assertEqual(errors[1][1], "Missing field 'description'")
+        self.assertEqual(errors[5][1], "Invalid UTF-8")
+
+        csv = 'description,priority,extra\r\n"Two\r\nlines",1,x\r\nTask 2,high,\r\nTask 3,,,,\r\nTask 4\r\n'
+        tasks, errors, _ = await self.parse(TaskTransfer("csv", max_workers=1), csv)
+        self.assertEqual([(task.description, task.priority) for task in tasks], [("Two\r\nlines", 1), ("Task 4", None)])
+        self.assertEqual(errors, [(4, "Invalid priority 'high'"), (5, "Expected 3 fields, got 5")])
+
+        with self.assertRaises(ValueError):
+            await self.parse(TaskTransfer("csv", max_workers=1), "title\r\nTask 1\r\n")
+
+    async def test_parallel_parse_keeps_the_file_order(self):
+        tasks = [Task(task_id, f"Task {task_id}", TaskStatus.TODO) for task_id in range(1, 501)]
+        transfer = TaskTransfer("ndjson", chunk_size=1024, max_workers=2)
+        try:
+            parsed, errors, chunks = await self.parse(transfer, transfer.encode(tasks).encode())
+        finally:
+            transfer.close()
+
+        self.assertEqual([task.description for task in parsed], [task.description for task in tasks])
+        self.assertEqual(errors, [])
+        self.assertGreater(chunks, 10)
+
+    def test_detect_format(self):
+        self.assertEqual(detect_format("tasks.CSV"), "csv")
+        self.assertEqual(detect_format("tasks.ndjson"), "ndjson")
+        self.assertEqual(detect_format("-"), "ndjson")
+        with self.assertRaises(ValueError):
+            TaskTransfer("xml")
@@ -0,0 +1,84 @@
+import unittest
+from pathlib import Path
+from tempfile import TemporaryDirectory
+from unittest.mock import patch
+
+import workspace
+from commons.store import StoreJSON
+from commons.task import Task
+from commons.task_status import TaskStatus
+from workspace import Workspace
+
+
+class TestWorkspace(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.directory = TemporaryDirectory()
+        self.root = Path(self.directory.name)
+        self.workspace = Workspace(self.root)
+        await self.workspace.tracker().add_task("Default task")
+        for name, status in (("work", TaskStatus.TODO), ("home", TaskStatus.DONE), ("garden", TaskStatus.DONE)):
+            task = await self.workspace.tracker(name).add_task(f"{name.title()} task")
+            await self.workspace.tracker(name).change_status(task.id, status)
+        await self.workspace.close()
+
+    async def asyncTearDown(self):
+        self.directory.cleanup()
+
+    async def test_lists_are_recorded_in_the_manifest(self):
+        lists = Workspace(self.root).lists()
+
+        self.assertEqual(lists["default"]["path"], "tasks.json")
+        self.assertEqual(lists["work"]["path"], "lists/work.json")
+        self.assertEqual(lists["home"]["counts"], {"todo": 0, "in-progress": 0, "done": 1})
+        self.assertFalse(any(entry["stale"] for entry in lists.values()))
+        self.assertEqual([task.description for task in StoreJSON(self.root / "lists" / "work.json").load()], ["Work task"])
+        with self.assertRaises(ValueError):
+            Workspace(self.root).tracker("../elsewhere")
+
+    async def test_list_all_skips_lists_without_matches(self):
+        opened = []
+
+        def open_tracker(path, archive_after=None):
+            opened.append(path.name)
+            return tracker_of(path, archive_after)
+
+        tracker_of = workspace.open_tracker
+        with patch("workspace.open_tracker", side_effect=open_tracker):
+            listed = await Workspace(self.root).list_all(TaskStatus.TODO)
+            self.assertEqual({name: [task.description for task in tasks] for name, tasks in listed.items()}, {
+                "default": ["Default task"],
+                "work": ["Work task"],
+            })
+            self.assertEqual(sorted(opened), ["tasks.json", "work.json"])
+
+            # Changed by another process: the counts of the list no longer tell, so it is scanned.
+            StoreJSON(self.root / "lists" / "home.json").update_file([Task(1, "Home task", TaskStatus.TODO)])
+            opened.clear()
+            listed = await Workspace(self.root).list_all(TaskStatus.TODO, tags=["missing"])
+            self.assertEqual(listed, {})
+            self.assertEqual(sorted(opened), ["home.json", "tasks.json", "work.json"])
+
+        lists = Workspace(self.root).lists()
+        self.assertEqual(lists["home"]["counts"]["todo"], 1)
+        self.assertFalse(lists["home"]["stale"])
+
+    async def test_deleted_list_file_is_not_recreated(self):
+        path = self.root / "lists" / "home.json"
+        path.unlink()
+
+        lists = Workspace(self.root).lists()
+        listed = await Workspace(self.root).list_all(TaskStatus.DONE)
+
+        self.assertTrue(lists["home"]["stale"])
+        self.assertEqual(sorted(listed), ["garden"])
+        self.assertFalse(path.exists())
+
+    async def test_parallel_scan(self):
+        scanner = Workspace(self.root, max_workers=2, parallel_threshold=0)
+        try:
+            listed = await scanner.list_all(TaskStatus.DONE)
+        finally:
+            await scanner.close()
+
+        self.assertEqual(sorted(listed), ["garden", "home"])
+        self.assertEqual(listed["home"][0].description, "Home task")
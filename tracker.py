@@ -1,7 +1,86 @@
+import asyncio
 import datetime
-from dataclasses import dataclass, field
+import heapq
+from collections.abc import AsyncIterator, Callable, Iterable, Iterator, Sequence
+from contextlib import asynccontextmanager
+from copy import copy
+from dataclasses import dataclass, field, replace
+from functools import cached_property
+from itertools import chain, islice
+from operator import attrgetter
+from pathlib import Path
 
-from commons import StoreProtocol, Task, TaskStatus
+from commons import (
+    AsyncStoreProtocol,
+    ChangeFeed,
+    IncrementalStoreProtocol,
+    QueryStoreProtocol,
+    SearchIndex,
+    SortIndex,
+    StoreProtocol,
+    StreamStoreProtocol,
+    TagFilter,
+    TagIndex,
+    Task,
+    TaskArchive,
+    TaskIndex,
+    TaskQueue,
+    TaskStats,
+    TaskStatus,
+    TaskTable,
+    VersionedStoreProtocol,
+    metrics,
+)
+from commons.store import store_signature
+from commons.task import normalize_tags
+from commons.task_queue import urgency
+
+# The structures derived from the tasks that are saved next to the store, by attribute: their
+# class and the suffix of their file.
+_SAVED = {"_search_index": (SearchIndex, "search"), "_stats": (TaskStats, "stats"), "_tag_index": (TagIndex, "tags")}
+
+
+def _range_field(sort: str | None) -> str:
+    # The field bounded by since and until.
+    return "updated_at" if sort == "updated_at" else "created_at"
+
+
+def _in_range(
+    tasks: Iterable[Task],
+    range_field: str,
+    since: datetime.datetime | None,
+    until: datetime.datetime | None
+) -> Iterable[Task]:
+    if since is None and until is None:
+        return tasks
+    bounds = attrgetter(range_field)
+    return (task for task in tasks if (since is None or bounds(task) >= since) and (until is None or bounds(task) <= until))
+
+
+def _check_priority(priority: int | None) -> int | None:
+    if priority is not None and (not isinstance(priority, int) or isinstance(priority, bool)):
+        raise ValueError(f"Invalid priority {priority!r}")
+    return priority
+
+
+def _parse_due(text: str | None) -> datetime.datetime | None:
+    # Batch operations carry due times as ISO 8601 text, read as naive local times like the
+    # task timestamps.
+    if text is None:
+        return None
+    if not isinstance(text, str):
+        raise ValueError(f"Invalid due time {text!r}")
+    moment = datetime.datetime.fromisoformat(text)
+    return moment if moment.tzinfo is None else moment.astimezone().replace(tzinfo=None)
+
+
+def _top(items: Iterable, key: Callable | None, descending: bool, offset: int, stop: int | None) -> Iterator:
+    if stop is None:
+        ordered = sorted(items, key=key, reverse=descending)
+    else:
+        # Only the first offset + limit are kept, on a heap: O(N log k) for a scan of N.
+        ordered = heapq.nlargest(stop, items, key=key) if descending else heapq.nsmallest(stop, items, key=key)
+    return islice(ordered, offset, None)
 
 
 @dataclass
@@ -9,74 +88,714 @@ class Tracker:
     """
     A class for managing tasks using an asynchronous interface with a storage backend.
 
+    Tasks are loaded lazily into an index, or queried from stores that answer queries
+    themselves. Changes can be batched into a single store write, and the search index, tag
+    index and stats are saved next to the store as ``<file>.search``, ``.tags`` and ``.stats``.
+
     Attributes:
         store (StoreProtocol): The storage backend for managing task data.
+        compact (bool): Whether tasks are held in a TaskTable instead of a TaskIndex.
+        write_behind (float | None): The coalescing window in seconds, None to write on every change.
+        archive (TaskArchive | None): The archive receiving the tasks done long ago, if any.
+        archive_after (datetime.timedelta | None): How long after being done tasks are archived by flush(), None to only archive on request.
+        changes (ChangeFeed | None): The feed every change written to the store is appended to, if any.
+        write_count (int): The number of writes made to the store.
         tasks (list[Task]): A list of tasks currently managed by the tracker.
         _last_id (int): The ID of the last task added, used for generating new task IDs.
+        _index (TaskIndex | TaskTable | QueryStoreProtocol): The index answering lookups and filters.
+        _pending (dict[int, Task | None] | None): The changes of the running batch or write-behind window.
 
     Methods:
-        __post_init__(): Initializes the tracker by loading tasks from the store.
-        add_task(task_description: str) -> Task: Adds a new task with the given description.
+        reload() -> None: Drops the loaded tasks so they are read again from the store on next use.
+        flush() -> None: Writes the pending write-behind changes and waits until they are stored.
+        iter_tasks(status: TaskStatus | None = None) -> AsyncIterator[Task]: Yields tasks, streaming them from the store when possible.
+        add_task(task_description: str, tags=(), priority=None, due_at=None) -> Task: Adds a new task.
         update_task(task_id: int, description: str) -> Task: Updates the description of an existing task.
+        tag_task(task_id: int, tags: Iterable[str]) -> Task: Adds tags to a task.
+        untag_task(task_id: int, tags: Iterable[str]) -> Task: Removes tags from a task.
+        set_priority(task_id: int, priority: int | None) -> Task: Sets or clears the priority of a task.
+        set_due(task_id: int, due_at: datetime.datetime | None) -> Task: Sets or clears the due time of a task.
         delete_task(task_id: int) -> Task: Deletes a task by its ID.
-        list_tasks(status: TaskStatus | None = None) -> list[Task]: Lists tasks, optionally filtered by status.
+        list_tasks(status=None, sort=None, descending=False, since=None, until=None, offset=0, limit=None, tags=(), any_tags=(), exclude_tags=()) -> list[Task]: Lists tasks, optionally filtered, sorted and paginated.
+        search(query: str, status: TaskStatus | None = None, limit: int | None = None) -> list[Task]: Returns the tasks matching a query, best first.
+        next_tasks(count: int = 1) -> list[Task]: Returns the most urgent open tasks, most urgent first.
+        overdue_tasks(now: datetime.datetime | None = None, limit: int | None = None) -> list[Task]: Returns the open tasks past due, longest overdue first.
+        archive_tasks(older_than: datetime.timedelta) -> list[Task]: Moves the tasks done before the given age to the archive.
+        stats() -> TaskStats: Returns the counters over every task, archived ones included.
+        sequence() -> int: Returns the sequence number of the last change written.
+        watch(since: int | None = None, interval: float = 0.5) -> AsyncIterator[dict]: Yields the change events after a sequence number.
         change_status(task_id: int, status: TaskStatus) -> Task: Changes the status of a task.
         mark_in_progress(task_id: int) -> Task: Marks a task as in progress.
         mark_done(task_id: int) -> Task: Marks a task as done.
+        batch() -> AsyncIterator[None]: Defers persisting every change made inside it to a single store write.
+        apply_batch(operations: Iterable[dict]) -> list[Task | ValueError]: Applies operations with a single store write.
+        add_tasks(descriptions: Iterable[str]) -> list[Task]: Adds many tasks with a single store write.
+        import_tasks(tasks: Iterable[Task]) -> list[Task]: Adds tasks with their fields but new IDs, with a single store write.
+        delete_tasks(task_ids: Iterable[int]) -> list[Task | ValueError]: Deletes many tasks with a single store write.
+        mark_in_progress_many(task_ids: Iterable[int]) -> list[Task | ValueError]: Marks many tasks as in progress.
+        mark_done_many(task_ids: Iterable[int]) -> list[Task | ValueError]: Marks many tasks as done.
     """
     store: StoreProtocol
-    tasks: list[Task] = field(default_factory=list)
-    _last_id: int = field(init=False, repr=False)
+    compact: bool = False
+    write_behind: float | None = None
+    archive: TaskArchive | None = None
+    archive_after: datetime.timedelta | None = None
+    changes: ChangeFeed | None = None
+    write_count: int = field(init=False, default=0)
+    _pending: dict[int, Task | None] | None = field(init=False, repr=False, default=None)
+    _created: set[int] = field(init=False, repr=False, default_factory=set)
+    _flush_timer: asyncio.Task | None = field(init=False, repr=False, default=None)
+    _flush_error: Exception | None = field(init=False, repr=False, default=None)
+    _write_lock: asyncio.Lock = field(init=False, repr=False, default_factory=asyncio.Lock)
+    _sort_indexes: dict[str, SortIndex] = field(init=False, repr=False, default_factory=dict)
+    _restored: set[int] = field(init=False, repr=False, default_factory=set)
+    _archived: set[int] = field(init=False, repr=False, default_factory=set)
+    _unsaved: set[str] = field(init=False, repr=False, default_factory=set)
+    _checked: set[str] = field(init=False, repr=False, default_factory=set)
+
+    @cached_property
+    def _index(self) -> TaskIndex | TaskTable | QueryStoreProtocol:
+        return self._build_index()
+
+    @metrics.measure("tracker.build_index")
+    def _build_index(self, tasks: Iterable[Task] | None = None) -> TaskIndex | TaskTable | QueryStoreProtocol:
+        if isinstance(self.store, QueryStoreProtocol):
+            return self.store
+        if self.compact:
+            if tasks is None:
+                # Streaming keeps the full list of Task objects from ever being materialized.
+                tasks = self.store.iter_tasks() if isinstance(self.store, StreamStoreProtocol) else self.store.load()
+            return TaskTable(tasks, intern_descriptions=True)
+        return TaskIndex(self.store.load() if tasks is None else tasks)
+
+    @metrics.measure("tracker.load")
+    async def _load(self) -> None:
+        # A compact index is built by streaming the store, which aload() cannot do.
+        if "_index" in vars(self) or self.compact or isinstance(self.store, QueryStoreProtocol):
+            return
+        if not isinstance(self.store, AsyncStoreProtocol):
+            return
+        tasks = await self.store.aload()
+        if "_index" not in vars(self):
+            self._index = self._build_index(tasks)
+
+    @cached_property
+    def _last_id(self) -> int:
+        # IDs of archived tasks are not given out again.
+        return max(self._index.last_task_id(), self.archive.last_task_id() if self.archive is not None else 0)
+
+    @cached_property
+    def _search_index(self) -> SearchIndex:
+        index = self._load_saved("_search_index")
+        if index is None:
+            index = SearchIndex(self._index.iter_tasks(), signature=self._signature())
+            self._keep("_search_index", index)
+        return index
 
-    def __post_init__(self):
-        self.tasks = self.store.load()
-        self._last_id = max((task.id for task in self.tasks), default=0)
+    @cached_property
+    def _task_queue(self) -> TaskQueue:
+        return TaskQueue(self._index.iter_tasks())
 
-    async def add_task(self, task_description: str) -> Task:
+    @cached_property
+    def _tag_index(self) -> TagIndex:
+        index = self._load_saved("_tag_index")
+        if index is None:
+            index = TagIndex(self._index.iter_tasks(), signature=self._signature())
+            self._keep("_tag_index", index)
+        return index
+
+    def reload(self) -> None:
+        for name in ("_index", "_last_id", "_task_queue", *_SAVED):
+            vars(self).pop(name, None)
+        self._sort_indexes.clear()
+        self._unsaved.clear()
+        self._checked.clear()
+
+    @property
+    def tasks(self) -> list[Task]:
+        return list(self._index.iter_tasks())
+
+    @metrics.measure("tracker.flush")
+    async def flush(self) -> None:
+        timer, self._flush_timer = self._flush_timer, None
+        if timer is not None:
+            timer.cancel()
+        if self._pending is not None and timer is None and not self._write_lock.locked():
+            # An explicit batch is running, it writes its changes itself when it ends.
+            return
+        await self._write_pending()
+        error, self._flush_error = self._flush_error, None
+        if error is not None:
+            raise error
+        if self.archive_after is not None and self.archive is not None and "_index" in vars(self):
+            # Only done tasks are looked at, and only those held in memory already.
+            if self._index is not self.store:
+                await self.archive_tasks(self.archive_after)
+        self._save_structures()
+
+    @metrics.measure("tracker.add_task")
+    async def add_task(
+        self,
+        task_description: str,
+        tags: Iterable[str] = (),
+        priority: int | None = None,
+        due_at: datetime.datetime | None = None
+    ) -> Task:
+        await self._load()
         new_id = self._last_id + 1
         new_task = Task(
             id=new_id,
             description=task_description,
-            status=TaskStatus.TODO
+            status=TaskStatus.TODO,
+            tags=normalize_tags(tags),
+            priority=_check_priority(priority),
+            due_at=due_at
         )
-        self.tasks.append(new_task)
-        self.store.update_file(self.tasks)
         self._last_id = new_id
+        await self._commit(None, new_task)
         return new_task
 
+    @metrics.measure("tracker.update_task")
     async def update_task(self, task_id: int, description: str) -> Task:
-        for task in self.tasks:
-            if task.id == task_id:
-                task.description = description
-                task.updated_at = datetime.datetime.now()
-                self.store.update_file(self.tasks)
-                return task
-        raise ValueError(f"Task with ID {task_id} not found")
+        await self._load()
+        task = await self._find_task(task_id)
+        before = replace(task)
+        task.description = description
+        task.updated_at = datetime.datetime.now()
+        await self._commit(before, task)
+        return task
 
-    async def delete_task(self, task_id: int) -> Task:
-        task_eliminated = next((task for task in self.tasks if task.id == task_id), None)
+    @metrics.measure("tracker.tag_task")
+    async def tag_task(self, task_id: int, tags: Iterable[str]) -> Task:
+        return await self._retag(task_id, tags)
 
-        if not task_eliminated:
-            raise ValueError(f"Task with ID {task_id} not found")
-        self.tasks.remove(task_eliminated)
-        self.store.update_file(self.tasks)
+    @metrics.measure("tracker.untag_task")
+    async def untag_task(self, task_id: int, tags: Iterable[str]) -> Task:
+        return await self._retag(task_id, (), tags)
+
+    @metrics.measure("tracker.set_priority")
+    async def set_priority(self, task_id: int, priority: int | None) -> Task:
+        return await self._reschedule(task_id, priority=_check_priority(priority))
+
+    @metrics.measure("tracker.set_due")
+    async def set_due(self, task_id: int, due_at: datetime.datetime | None) -> Task:
+        return await self._reschedule(task_id, due_at=due_at)
+
+    @metrics.measure("tracker.delete_task")
+    async def delete_task(self, task_id: int) -> Task:
+        await self._load()
+        task_eliminated = await self._find_task(task_id)
+        await self._commit(task_eliminated, None)
         return task_eliminated
 
-    async def list_tasks(self, status: TaskStatus | None = None) -> list[Task]:
-        if status is None:
-            return self.tasks
-        return [task for task in self.tasks if task.status == status]
+    @metrics.measure("tracker.list_tasks")
+    async def list_tasks(
+        self,
+        status: TaskStatus | None = None,
+        sort: str | None = None,
+        descending: bool = False,
+        since: datetime.datetime | None = None,
+        until: datetime.datetime | None = None,
+        offset: int = 0,
+        limit: int | None = None,
+        tags: Iterable[str] = (),
+        any_tags: Iterable[str] = (),
+        exclude_tags: Iterable[str] = ()
+    ) -> list[Task]:
+        # Insertion order unless sorted. since and until (inclusive) bound updated_at when sorting
+        # by it and created_at otherwise, and a bounded listing is sorted by that field.
+        await self._load()
+        await self._settle()
+        tag_filter = TagFilter(tuple(tags), tuple(any_tags), tuple(exclude_tags))
+        if not self._lists_archive(status):
+            return list(self._select(status, sort, descending, since, until, offset, limit, tag_filter))
+        # The archived tasks come after the others, or are merged with them in sort order.
+        stop = None if limit is None else offset + limit
+        tasks = self._select(status, sort, descending, since, until, 0, stop, tag_filter)
+        archived = self._select_archived(status, sort, descending, since, until, stop, tag_filter)
+        if sort is None and since is None and until is None:
+            tasks = chain(tasks, archived)
+        else:
+            tasks = heapq.merge(tasks, archived, key=attrgetter(sort or _range_field(sort), "id"), reverse=descending)
+        return list(islice(tasks, offset, stop))
+
+    @metrics.measure("tracker.search")
+    async def search(self, query: str, status: TaskStatus | None = None, limit: int | None = None) -> list[Task]:
+        await self._load()
+        await self._settle()
+        index = self._search_index
+        results = []
+        for task_id in index.search(query):
+            if limit is not None and len(results) >= limit:
+                break
+            task = self._index.get_task(task_id)
+            # A saved index can lag behind a write another process made since, so every hit is
+            # checked against the task itself.
+            if task is None or not index.matches(query, task.description):
+                continue
+            if status is None or task.status == status:
+                results.append(task)
+        return results
+
+    @metrics.measure("tracker.next_tasks")
+    async def next_tasks(self, count: int = 1) -> list[Task]:
+        await self._load()
+        await self._settle()
+        if self._index is self.store:
+            # Scanned once, keeping the first k on a heap.
+            return heapq.nsmallest(count, self._open_tasks(), key=urgency)
+        return list(map(self._index.get_task, self._task_queue.next(count)))
+
+    @metrics.measure("tracker.overdue_tasks")
+    async def overdue_tasks(self, now: datetime.datetime | None = None, limit: int | None = None) -> list[Task]:
+        await self._load()
+        await self._settle()
+        now = datetime.datetime.now() if now is None else now
+        if self._index is self.store:
+            tasks = (task for task in self._open_tasks() if task.due_at is not None and task.due_at < now)
+            return list(_top(tasks, attrgetter("due_at", "id"), False, 0, limit))
+        return list(map(self._index.get_task, self._task_queue.overdue(now, limit)))
+
+    async def iter_tasks(self, status: TaskStatus | None = None) -> AsyncIterator[Task]:
+        if "_index" not in vars(self) and isinstance(self.store, StreamStoreProtocol):
+            tasks = self.store.iter_tasks(status)
+        else:
+            await self._settle()
+            tasks = self._index.iter_tasks(status)
+        for task in tasks:
+            yield task
+        if self._lists_archive(status):
+            for task in self.archive.iter_tasks(status):
+                if "_index" not in vars(self) or self._index.get_task(task.id) is None:
+                    yield task
+
+    @metrics.measure("tracker.archive_tasks")
+    async def archive_tasks(self, older_than: datetime.timedelta) -> list[Task]:
+        if self.archive is None:
+            raise ValueError("No archive is configured")
+        await self._load()
+        await self._settle()
+        try:
+            cutoff = datetime.datetime.now() - older_than
+        except OverflowError:
+            # Older than any time a task can have been done at.
+            return []
+        # Aged from completion, so editing a done task does not keep it out of the archive.
+        tasks = [
+            task for task in self._index.iter_tasks(TaskStatus.DONE) if (task.done_at or task.updated_at) <= cutoff
+        ]
+        if not tasks:
+            return []
+        # Archived first: if the store write fails, the tasks are in both, and the store wins.
+        self.archive.append(tasks)
+        self._archived.update(task.id for task in tasks)
+        async with self.batch():
+            for task in tasks:
+                await self._commit(task, None)
+        return tasks
+
+    @metrics.measure("tracker.stats")
+    async def stats(self) -> TaskStats:
+        await self._settle()
+        if "_stats" not in vars(self):
+            stats = self._load_saved("_stats")
+            if stats is None:
+                stats = TaskStats(signature=self._signature())
+                async for task in self.iter_tasks():
+                    stats.apply_change(None, task)
+                self._keep("_stats", stats)
+            self._stats = stats
+        return self._stats
+
+    def sequence(self) -> int:
+        if self.changes is None:
+            raise ValueError("No change feed is configured")
+        return self.changes.last_sequence()
 
+    async def watch(self, since: int | None = None, interval: float = 0.5) -> AsyncIterator[dict]:
+        if self.changes is None:
+            raise ValueError("No change feed is configured")
+        async for event in self.changes.follow(since, interval):
+            yield event
+
+    @metrics.measure("tracker.change_status")
     async def change_status(self, task_id: int, status: TaskStatus) -> Task:
-        for task in self.tasks:
-            if task.id == task_id:
-                task.status = status
-                task.updated_at = datetime.datetime.now()
-                self.store.update_file(self.tasks)
-                return task
+        await self._load()
+        task = await self._find_task(task_id)
+        before = replace(task)
+        task.status = status
+        task.updated_at = datetime.datetime.now()
+        # Kept when a done task is marked done again, so later edits never move its completion.
+        if status != TaskStatus.DONE:
+            task.done_at = None
+        elif before.status != TaskStatus.DONE or task.done_at is None:
+            task.done_at = task.updated_at
+        await self._commit(before, task)
+        return task
 
     async def mark_in_progress(self, task_id: int) -> Task:
         return await self.change_status(task_id, TaskStatus.IN_PROGRESS)
 
     async def mark_done(self, task_id: int) -> Task:
         return await self.change_status(task_id, TaskStatus.DONE)
+
+    @asynccontextmanager
+    async def batch(self) -> AsyncIterator[None]:
+        if self._pending is not None:
+            yield
+            return
+        self._pending = {}
+        try:
+            yield
+        finally:
+            await self._write_pending()
+
+    @metrics.measure("tracker.apply_batch")
+    async def apply_batch(self, operations: Iterable[dict]) -> list[Task | ValueError]:
+        results = []
+        async with self.batch():
+            for operation in operations:
+                try:
+                    results.append(await self._apply_operation(operation))
+                except ValueError as error:
+                    results.append(error)
+        return results
+
+    async def add_tasks(self, descriptions: Iterable[str]) -> list[Task]:
+        return await self.apply_batch({"action": "add", "description": description} for description in descriptions)
+
+    @metrics.measure("tracker.import_tasks")
+    async def import_tasks(self, tasks: Iterable[Task]) -> list[Task]:
+        await self._load()
+        imported = []
+        async with self.batch():
+            for task in tasks:
+                task.id = self._last_id + 1
+                self._last_id = task.id
+                await self._commit(None, task)
+                imported.append(task)
+        return imported
+
+    async def delete_tasks(self, task_ids: Iterable[int]) -> list[Task | ValueError]:
+        return await self.apply_batch({"action": "delete", "task_id": task_id} for task_id in task_ids)
+
+    async def mark_in_progress_many(self, task_ids: Iterable[int]) -> list[Task | ValueError]:
+        return await self.apply_batch({"action": "mark-in-progress", "task_id": task_id} for task_id in task_ids)
+
+    async def mark_done_many(self, task_ids: Iterable[int]) -> list[Task | ValueError]:
+        return await self.apply_batch({"action": "mark-done", "task_id": task_id} for task_id in task_ids)
+
+    async def _apply_operation(self, operation: dict) -> Task:
+        if not isinstance(operation, dict):
+            raise ValueError("Operation must be a JSON object")
+        try:
+            match operation["action"]:
+                case "add":
+                    return await self.add_task(
+                        operation["description"],
+                        operation.get("tags", ()),
+                        operation.get("priority"),
+                        _parse_due(operation.get("due_at"))
+                    )
+                case "update":
+                    return await self.update_task(operation["task_id"], operation["description"])
+                case "tag":
+                    return await self.tag_task(operation["task_id"], operation["tags"])
+                case "untag":
+                    return await self.untag_task(operation["task_id"], operation["tags"])
+                case "priority":
+                    return await self.set_priority(operation["task_id"], operation["priority"])
+                case "due":
+                    return await self.set_due(operation["task_id"], _parse_due(operation["due_at"]))
+                case "delete":
+                    return await self.delete_task(operation["task_id"])
+                case "mark-in-progress":
+                    return await self.mark_in_progress(operation["task_id"])
+                case "mark-done":
+                    return await self.mark_done(operation["task_id"])
+                case action:
+                    raise ValueError(f"Unknown action {action!r}")
+        except KeyError as error:
+            raise ValueError(f"Missing field {error.args[0]!r}") from None
+
+    def _sort_index(self, sort_field: str) -> SortIndex:
+        index = self._sort_indexes.get(sort_field)
+        if index is None:
+            index = self._sort_indexes[sort_field] = SortIndex(self._index.iter_tasks(), sort_field)
+        return index
+
+    def _select(
+        self,
+        status: TaskStatus | None,
+        sort: str | None,
+        descending: bool,
+        since: datetime.datetime | None,
+        until: datetime.datetime | None,
+        offset: int,
+        limit: int | None,
+        tag_filter: TagFilter = TagFilter()
+    ) -> Iterator[Task]:
+        stop = None if limit is None else offset + limit
+        if tag_filter:
+            return self._select_tagged(status, sort, descending, since, until, offset, stop, tag_filter)
+        if sort is None and since is None and until is None:
+            return islice(self._index.iter_tasks(status), offset, stop)
+        range_field = _range_field(sort)
+        sort = sort or range_field
+        if self._index is not self.store and (sort == range_field or (since is None and until is None)):
+            task_ids = self._sort_index(sort).select(status, since, until, descending)
+            return map(self._index.get_task, islice(task_ids, offset, stop))
+        if self._index is not self.store:
+            # Sorted by ID within a time range: the range comes from its index, and only the IDs
+            # in it are ordered.
+            task_ids = self._sort_index(range_field).select(status, since, until)
+            return map(self._index.get_task, _top(task_ids, None, descending, offset, stop))
+        tasks = _in_range(self._index.iter_tasks(status), range_field, since, until)
+        return _top(tasks, attrgetter(sort, "id"), descending, offset, stop)
+
+    def _select_tagged(
+        self,
+        status: TaskStatus | None,
+        sort: str | None,
+        descending: bool,
+        since: datetime.datetime | None,
+        until: datetime.datetime | None,
+        offset: int,
+        stop: int | None,
+        tag_filter: TagFilter
+    ) -> Iterator[Task]:
+        # Only the m matching tasks are looked at, and the first k cost O(m log k). A store
+        # answering queries itself may have lost some of them to another process meanwhile.
+        task_ids = self._tag_index.select(status, tag_filter)
+        if sort is None and since is None and until is None:
+            return filter(None, map(self._index.get_task, _top(task_ids, None, False, offset, stop)))
+        range_field = _range_field(sort)
+        tasks = _in_range(filter(None, map(self._index.get_task, task_ids)), range_field, since, until)
+        return _top(tasks, attrgetter(sort or range_field, "id"), descending, offset, stop)
+
+    def _select_archived(
+        self,
+        status: TaskStatus | None,
+        sort: str | None,
+        descending: bool,
+        since: datetime.datetime | None,
+        until: datetime.datetime | None,
+        stop: int | None,
+        tag_filter: TagFilter = TagFilter()
+    ) -> Iterator[Task]:
+        # A restored task is only dropped from the archive once it is written to the store.
+        tasks = (
+            task for task in self.archive.iter_tasks(status)
+            if (not tag_filter or tag_filter.matches(task.tags)) and self._index.get_task(task.id) is None
+        )
+        if sort is None and since is None and until is None:
+            return islice(tasks, stop)
+        range_field = _range_field(sort)
+        tasks = _in_range(tasks, range_field, since, until)
+        return _top(tasks, attrgetter(sort or range_field, "id"), descending, 0, stop)
+
+    async def _find_task(self, task_id: int) -> Task:
+        if self._pending is not None and task_id in self._pending:
+            task = self._pending[task_id]
+        else:
+            task = self._index.get_task(task_id)
+            if task is None and self.archive is not None:
+                task = self.archive.get_task(task_id)
+                if task is not None:
+                    # Brought back to the store, where it is changed like any other task.
+                    task = replace(task)
+                    self._restored.add(task_id)
+                    await self._commit(None, task)
+        if task is None:
+            raise ValueError(f"Task with ID {task_id} not found")
+        return task
+
+    def _lists_archive(self, status: TaskStatus | None) -> bool:
+        return self.archive is not None and (status is None or TaskStatus(status) == TaskStatus.DONE)
+
+    async def _settle(self) -> None:
+        if self._flush_timer is not None and self._index is self.store:
+            await self.flush()
+
+    async def _retag(self, task_id: int, tags: Iterable[str], removed: Iterable[str] = ()) -> Task:
+        await self._load()
+        tags, removed = normalize_tags(tags), normalize_tags(removed)
+        task = await self._find_task(task_id)
+        before = replace(task)
+        task.tags = tuple(sorted(set(task.tags).union(tags).difference(removed)))
+        task.updated_at = datetime.datetime.now()
+        await self._commit(before, task)
+        return task
+
+    async def _reschedule(self, task_id: int, **changes) -> Task:
+        await self._load()
+        task = await self._find_task(task_id)
+        before = replace(task)
+        for name, value in changes.items():
+            setattr(task, name, value)
+        task.updated_at = datetime.datetime.now()
+        await self._commit(before, task)
+        return task
+
+    def _open_tasks(self) -> Iterator[Task]:
+        return chain(self._index.iter_tasks(TaskStatus.TODO), self._index.iter_tasks(TaskStatus.IN_PROGRESS))
+
+    def _saved_path(self, name: str) -> Path:
+        return self.store.file_path.with_name(f"{self.store.file_path.name}.{_SAVED[name][1]}")
+
+    def _signature(self) -> list | None:
+        # Changes not written yet would not match the signature of the store files.
+        return None if self._pending else store_signature(self.store)
+
+    def _load_saved(self, name: str) -> SearchIndex | TaskStats | TagIndex | None:
+        # Only used while the store files still have the signature it was saved with.
+        if self._pending:
+            return None
+        return _SAVED[name][0].load(self._saved_path(name), store_signature(self.store))
+
+    def _keep(self, name: str, saved: SearchIndex | TaskStats | TagIndex) -> None:
+        if saved.signature is None:
+            self._unsaved.add(name)
+        else:
+            saved.save(self._saved_path(name))
+
+    def _tracked(self, name: str) -> SearchIndex | TaskStats | TagIndex | None:
+        # Changes keep a loaded or up-to-date saved structure current; a stale one is left for
+        # its next use to rebuild.
+        if name not in vars(self):
+            if name in self._checked:
+                return None
+            self._checked.add(name)
+            saved = self._load_saved(name)
+            if saved is None:
+                return None
+            setattr(self, name, saved)
+        return vars(self)[name]
+
+    def _save_structures(self) -> None:
+        for name in list(self._unsaved):
+            saved = vars(self).get(name)
+            if saved is not None and saved.signature is not None:
+                saved.save(self._saved_path(name))
+                self._unsaved.discard(name)
+
+    async def _commit(self, before: Task | None, after: Task | None) -> None:
+        if self._index is not self.store:
+            self._index.apply_change(before, after)
+            for sort_index in self._sort_indexes.values():
+                sort_index.apply_change(before, after)
+            if "_task_queue" in vars(self):
+                self._task_queue.apply_change(before, after)
+        # Archived tasks still count in the stats.
+        moved = after is None and before.id in self._archived or before is None and after.id in self._restored
+        for name in _SAVED:
+            saved = self._tracked(name)
+            if saved is not None:
+                if not (moved and name == "_stats"):
+                    saved.apply_change(before, after)
+                saved.signature = None
+                self._unsaved.add(name)
+        if self._pending is None and self.write_behind is not None:
+            self._pending = {}
+            self._flush_timer = asyncio.create_task(self._flush_later())
+        if self._pending is not None:
+            if after is None and before.id in self._created:
+                # Created and deleted before ever being written.
+                self._created.discard(before.id)
+                del self._pending[before.id]
+            elif after is None:
+                self._pending[before.id] = None
+            else:
+                if before is None:
+                    self._created.add(after.id)
+                self._pending[after.id] = after
+        elif after is None:
+            await self._persist(deletes=[before.id])
+        else:
+            await self._persist(upserts=[after], created=[after.id] if before is None else [])
+
+    async def _flush_later(self) -> None:
+        await asyncio.sleep(self.write_behind)
+        # From here on the write must not be cancelled, flush() waits for it instead.
+        self._flush_timer = None
+        try:
+            await self._write_pending()
+        except Exception as error:
+            self._flush_error = error
+
+    async def _write_pending(self) -> None:
+        async with self._write_lock:
+            pending, self._pending = self._pending, None
+            created, self._created = self._created, set()
+            if pending:
+                await self._persist(
+                    upserts=[task for task in pending.values() if task is not None],
+                    deletes=[task_id for task_id, task in pending.items() if task is None],
+                    created=list(created)
+                )
+
+    @metrics.measure("tracker.persist")
+    async def _persist(
+        self,
+        upserts: Sequence[Task] = (),
+        deletes: Sequence[int] = (),
+        created: Sequence[int] = ()
+    ) -> None:
+        self.write_count += 1
+        restored, self._restored = self._restored, set()
+        archived, self._archived = self._archived, set()
+        new_ids = None
+        if isinstance(self.store, VersionedStoreProtocol):
+            # Incremental stores write the changes alone, the others rewrite every task.
+            tasks = None if isinstance(self.store, IncrementalStoreProtocol) else self.tasks
+            if isinstance(self.store, AsyncStoreProtocol):
+                if tasks is not None:
+                    tasks = self._snapshot(tasks)
+                new_ids = await self.store.acommit([replace(task) for task in upserts], list(deletes), set(created), tasks)
+            else:
+                new_ids = self.store.commit(list(upserts), list(deletes), set(created), tasks)
+            if new_ids is not None:
+                self._rebase(upserts, new_ids)
+        elif isinstance(self.store, IncrementalStoreProtocol):
+            if isinstance(self.store, AsyncStoreProtocol):
+                # Copies, the tasks may change again while the worker thread encodes them.
+                await self.store.aapply_changes([replace(task) for task in upserts], list(deletes))
+            else:
+                self.store.apply_changes(list(upserts), list(deletes))
+        elif isinstance(self.store, AsyncStoreProtocol):
+            await self.store.aupdate_file(self._snapshot(self.tasks))
+        else:
+            self.store.update_file(self.tasks)
+        loaded = [vars(self)[name] for name in _SAVED if name in vars(self)]
+        if not self._pending and loaded:
+            # Every change the saved structures hold is written now.
+            signature = store_signature(self.store)
+            for saved in loaded:
+                saved.signature = signature
+        if restored:
+            self.archive.remove(restored)
+        if self.changes is not None:
+            created = {(new_ids or {}).get(task_id, task_id) for task_id in created} - restored
+            self.changes.append(chain(
+                (("create" if task.id in created else "update", task.id, task) for task in upserts),
+                (("archive" if task_id in archived else "delete", task_id, None) for task_id in deletes),
+            ))
+
+    def _snapshot(self, tasks: list[Task]) -> list[Task]:
+        # The worker thread encodes the tasks while the event loop may change them again, as a
+        # write-behind window or another daemon client does. A TaskTable materializes copies.
+        return tasks if isinstance(self._index, TaskTable) else list(map(copy, tasks))
+
+    def _rebase(self, upserts: Sequence[Task], new_ids: dict[int, int]) -> None:
+        # Another process wrote meanwhile: the tasks created here whose ID it took are renumbered
+        # and the loaded tasks are read again.
+        for task in upserts:
+            if task.id in new_ids:
+                task.id = new_ids[task.id]
+        self.reload()
+        if self._pending and self._index is not self.store:
+            # Changes made while the write was running are not in the store yet.
+            for task_id, task in self._pending.items():
+                before = self._index.get_task(task_id)
+                if before is not None or task is not None:
+                    self._index.apply_change(before, task)
@@ -0,0 +1,251 @@
+import asyncio
+import datetime
+import json
+import os
+import re
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from pathlib import Path
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - not available on Windows, updates are then not locked
+    fcntl = None
+
+from commons import ChangeFeed, StoreJSON, Task, TaskArchive, TaskStatus
+from commons.processes import process_pool
+from commons.store import files_signature, store_signature
+from tracker import Tracker
+
+DEFAULT_LIST = "default"
+_LIST_NAME = re.compile(r"[A-Za-z0-9][A-Za-z0-9_.-]*")
+
+
+def open_tracker(path: Path, archive_after: datetime.timedelta | None = None) -> Tracker:
+    """Returns a Tracker of the tasks stored at path, with its archive and change feed next to it."""
+    return Tracker(
+        StoreJSON(path),
+        archive=TaskArchive(path.with_name(f"{path.name}.archive.gz")),
+        archive_after=archive_after,
+        changes=ChangeFeed(path.with_name(f"{path.name}.changes"))
+    )
+
+
+async def _scan(tracker: Tracker, status: TaskStatus | None, options: dict) -> tuple[list[Task], dict, list]:
+    # The signature is taken first: a change made during the scan leaves the entry stale.
+    signature = store_signature(tracker.store)
+    tasks = await tracker.list_tasks(status, **options)
+    stats = await tracker.stats()
+    return tasks, {status.value: count for status, count in stats.status_counts.items()}, signature
+
+
+def _scan_list(path: str, status: TaskStatus | None, options: dict) -> tuple[list[Task], dict, list]:
+    # Runs in a worker process, on a tracker of its own.
+    async def scan() -> tuple[list[Task], dict, list]:
+        tracker = open_tracker(Path(path))
+        try:
+            return await _scan(tracker, status, options)
+        finally:
+            await tracker.flush()
+    return asyncio.run(scan())
+
+
+@dataclass
+class ListManifest:
+    """
+    The small JSON file recording every list of a workspace by name: where its store is, how
+    many tasks it holds per status, the signature of its store files when they were counted and
+    when they were last modified. Updates are made under an advisory lock and replace the file
+    atomically, so several processes can record the lists they touched.
+
+    Attributes:
+        path (Path): The path to the manifest file.
+
+    Methods:
+        entries() -> dict[str, dict]: Returns the entry of every list, by name.
+        update(changes: dict[str, dict]) -> dict[str, dict]: Merges fields into the entries of lists and returns every entry.
+    """
+    path: Path
+
+    @property
+    def _lock_path(self) -> Path:
+        return self.path.with_name(f"{self.path.name}.lock")
+
+    def entries(self) -> dict[str, dict]:
+        try:
+            with self.path.open(encoding="utf-8") as file:
+                return json.load(file)["lists"]
+        except FileNotFoundError:
+            return {}
+        except (ValueError, KeyError, TypeError):
+            raise ValueError(f"{self.path} is not a list manifest") from None
+
+    def update(self, changes: dict[str, dict]) -> dict[str, dict]:
+        with self._locked():
+            entries = self.entries()
+            for name, entry in changes.items():
+                entries[name] = {**entries.get(name, {}), **entry}
+            temporary_path = self.path.with_name(f"{self.path.name}.{os.getpid()}.tmp")
+            # Written compactly: the C encoder takes a fraction of the time with hundreds of lists.
+            temporary_path.write_text(json.dumps({"lists": entries}), encoding="utf-8")
+            os.replace(temporary_path, self.path)
+        return entries
+
+    @contextmanager
+    def _locked(self):
+        descriptor = os.open(self._lock_path, os.O_RDWR | os.O_CREAT, 0o644)
+        with open(descriptor, "r+", encoding="utf-8") as lock_file:
+            if fcntl is not None:
+                # Released when the file is closed.
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+            yield
+
+
+@dataclass
+class Workspace:
+    """
+    Many task lists in one directory, each with its own store, archive and change feed, known by
+    name through a ListManifest in ``lists.json``.
+
+    The default list keeps ``tasks.json``, so a directory used before workspaces existed is the
+    default list of its workspace; the others are stored as ``lists/<name>.json``. A Tracker is
+    only built for a list when a command first touches it, and ``sync()`` then records its
+    counts per status and the signature of its store files in the manifest.
+
+    ``list_all()`` lists tasks across lists. An entry whose signature still matches the store
+    files tells without opening the list whether it holds tasks with the status asked for, so
+    lists with none are skipped. The others are scanned concurrently: in worker processes, each
+    on a tracker of its own, once their files add up to ``parallel_threshold`` bytes and more
+    than one CPU is available, and in this process otherwise. Every scan records the counts it
+    found, so the next listing skips what it can.
+
+    Attributes:
+        root (Path): The directory of the workspace.
+        archive_after (datetime.timedelta | None): Passed to the Tracker of every list.
+        write_behind (float | None): Passed to the Tracker of every list.
+        max_workers (int | None): The most worker processes scanning lists, defaults to the CPU count.
+        parallel_threshold (int): The total size in bytes of the lists scanned above which they are scanned in parallel.
+        manifest (ListManifest): The manifest of the lists.
+        _trackers (dict[str, Tracker]): The trackers built so far, by list name.
+        _processes (ProcessPoolExecutor | None): The worker processes, started by the first parallel scan.
+
+    Methods:
+        location(name: str) -> Path: Returns the path of the store of a list, recording it in the manifest.
+        tracker(name: str = DEFAULT_LIST) -> Tracker: Returns the tracker of a list, building it on first use.
+        lists() -> dict[str, dict]: Returns the manifest entry of every list, with "stale" telling whether its counts are out of date or its file is missing.
+        list_all(status: TaskStatus | None = None, **options) -> dict[str, list[Task]]: Lists the tasks of every list holding matching tasks.
+        sync() -> None: Records the counts of the lists whose store changed since their entry was written.
+        close() -> None: Flushes every tracker, syncs the manifest and stops the worker processes.
+    """
+    root: Path = Path(".")
+    archive_after: datetime.timedelta | None = None
+    write_behind: float | None = None
+    max_workers: int | None = None
+    parallel_threshold: int = 8 * 1024 * 1024
+    manifest: ListManifest = field(init=False)
+    _trackers: dict[str, Tracker] = field(init=False, repr=False, default_factory=dict)
+    _processes: ProcessPoolExecutor | None = field(init=False, repr=False, default=None)
+
+    def __post_init__(self):
+        self.manifest = ListManifest(self.root / "lists.json")
+
+    def location(self, name: str) -> Path:
+        entry = self.manifest.entries().get(name)
+        if entry is not None:
+            return self.root / entry["path"]
+        if not _LIST_NAME.fullmatch(name):
+            raise ValueError(f"Invalid list name {name!r}")
+        path = Path("tasks.json") if name == DEFAULT_LIST else Path("lists", f"{name}.json")
+        (self.root / path).parent.mkdir(parents=True, exist_ok=True)
+        self.manifest.update({name: {"path": path.as_posix()}})
+        return self.root / path
+
+    def tracker(self, name: str = DEFAULT_LIST) -> Tracker:
+        tracker = self._trackers.get(name)
+        if tracker is None:
+            tracker = self._trackers[name] = open_tracker(self.location(name), self.archive_after)
+        tracker.write_behind = self.write_behind
+        return tracker
+
+    def lists(self) -> dict[str, dict]:
+        entries = self.manifest.entries()
+        if DEFAULT_LIST not in entries and (self.root / "tasks.json").exists():
+            entries = self.manifest.update({DEFAULT_LIST: {"path": "tasks.json"}})
+        for entry in entries.values():
+            entry["stale"] = self._stale(entry)
+        return entries
+
+    async def list_all(self, status: TaskStatus | None = None, **options) -> dict[str, list[Task]]:
+        status = None if status is None else TaskStatus(status)
+        entries = self.lists()
+        names = [
+            name for name, entry in entries.items()
+            # A list whose file is gone has nothing to list, and is not recreated by scanning it.
+            if (self.root / entry["path"]).exists() and (entry["stale"] or self._matches(entry, status))
+        ]
+        # Changes held by the trackers of this process are written first, for other processes to see.
+        for name in names:
+            if name in self._trackers:
+                await self._trackers[name].flush()
+        paths = [self.root / entries[name]["path"] for name in names]
+        size = sum(path.stat().st_size for path in paths if path.exists())
+        workers = min(len(names), self.max_workers or os.cpu_count() or 1)
+        if workers < 2 or size < self.parallel_threshold:
+            scans = await asyncio.gather(*(_scan(self.tracker(name), status, options) for name in names))
+        else:
+            loop = asyncio.get_running_loop()
+            pool = self._pool(workers)
+            scans = await asyncio.gather(*(
+                loop.run_in_executor(pool, _scan_list, str(path), status, options) for path in paths
+            ))
+            for name in names:
+                # Their trackers here may hold tasks the workers changed, such as a stats rebuild.
+                if name in self._trackers:
+                    self._trackers[name].reload()
+        if scans:
+            self.manifest.update({name: self._entry(counts, signature) for name, (_, counts, signature) in zip(names, scans)})
+        return {name: tasks for name, (tasks, _, _) in zip(names, scans) if tasks}
+
+    async def sync(self) -> None:
+        entries, changes = self.manifest.entries(), {}
+        for name, tracker in self._trackers.items():
+            signature = store_signature(tracker.store)
+            if entries.get(name, {}).get("signature") != signature:
+                stats = await tracker.stats()
+                counts = {status.value: count for status, count in stats.status_counts.items()}
+                changes[name] = self._entry(counts, signature)
+        if changes:
+            self.manifest.update(changes)
+
+    async def close(self) -> None:
+        try:
+            for tracker in self._trackers.values():
+                await tracker.flush()
+            await self.sync()
+        finally:
+            processes, self._processes = self._processes, None
+            if processes is not None:
+                processes.shutdown()
+
+    def _entry(self, counts: dict, signature: list) -> dict:
+        modified = max((stat[1] for stat in signature if stat), default=None)
+        return {
+            "counts": counts,
+            "signature": signature,
+            "modified": None if modified is None else datetime.datetime.fromtimestamp(modified / 1e9).isoformat(),
+        }
+
+    def _stale(self, entry: dict) -> bool:
+        # Computed from the path: opening the store would create a list file deleted meanwhile.
+        signature = files_signature([self.root / entry["path"]])
+        return signature == [None] or signature != entry.get("signature")
+
+    def _matches(self, entry: dict, status: TaskStatus | None) -> bool:
+        counts = entry["counts"]
+        return bool(counts.get(status.value) if status is not None else any(counts.values()))
+
+    def _pool(self, workers: int) -> ProcessPoolExecutor:
+        if self._processes is None:
+            self._processes = process_pool(workers)
+        return self._processes